@@ -0,0 +1,86 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Recipe
+from api.services.file_io import CSV_CHUNK_ROWS
+from api.services.recipes import RecipeError, apply_recipe_file, collect_inputs, compile_recipe, normalize_steps
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply a saved recipe to files or directories of .csv/.xlsx/.xls and write "
+        "cleaned CSVs, without the web server or the LLM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("recipe", help="Recipe name")
+        parser.add_argument("paths", nargs="+", type=Path, help="Input files or directories")
+        parser.add_argument("--out", type=Path, required=True, help="Output directory")
+        parser.add_argument("--workers", type=int, default=settings.RECIPE_WORKERS,
+                            help="Files processed in parallel (separate processes)")
+        parser.add_argument("--chunk-rows", type=int, default=CSV_CHUNK_ROWS, help="Rows per streamed chunk")
+        parser.add_argument("--sheet", default=None, help="Worksheet name or 0-based index for Excel inputs")
+        parser.add_argument("--no-recursive", action="store_true", help="Do not descend into subdirectories")
+        parser.add_argument("--overwrite", action="store_true", help="Replace existing output files")
+
+    def handle(self, *args, **opts):
+        recipe = Recipe.objects.filter(name=opts["recipe"]).first()
+        if recipe is None:
+            raise CommandError(f"recipe '{opts['recipe']}' not found")
+
+        limits = (settings.REGEX_CELL_TIMEOUT, settings.REGEX_COLUMN_TIMEOUT, settings.REGEX_CELL_BUDGET_US)
+        try:
+            steps = normalize_steps(recipe.steps)
+            compile_recipe(steps, *limits)  # fail fast before any worker starts
+            inputs = collect_inputs(opts["paths"], recursive=not opts["no_recursive"])
+        except RecipeError as e:
+            raise CommandError(str(e)) from e
+        if not inputs:
+            raise CommandError("no input files found")
+
+        sheet = opts["sheet"]
+        if sheet is not None and sheet.isdigit():
+            sheet = int(sheet)
+
+        out_dir = opts["out"]
+        jobs = []
+        for source, relative in inputs:
+            output = (out_dir / relative).with_suffix(".csv")
+            if output.resolve() == source.resolve():
+                raise CommandError(f"output would overwrite its input: {source}")
+            if output.exists() and not opts["overwrite"]:
+                self.stderr.write(f"skip {source}: {output} exists (use --overwrite)")
+                continue
+            jobs.append((source, output))
+
+        args = (steps, limits, opts["chunk_rows"], sheet)
+        workers = max(1, min(opts["workers"], len(jobs)))
+        failed = 0
+        if workers == 1:
+            results = (apply_recipe_file(src, dst, *args) for src, dst in jobs)
+            failed = self._report(results)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(apply_recipe_file, src, dst, *args) for src, dst in jobs]
+                failed = self._report(f.result() for f in futures)
+
+        summary = f"{len(jobs) - failed}/{len(jobs)} files written with recipe '{recipe.name}'"
+        if failed:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def _report(self, results) -> int:
+        failed = 0
+        for r in results:
+            if r.error:
+                failed += 1
+                self.stderr.write(f"FAIL {r.source}: {r.error}")
+            else:
+                self.stdout.write(
+                    f"ok   {r.source} -> {r.output}: {r.rows} rows, "
+                    f"{r.updated_cells} cells in {r.updated_rows} rows changed ({r.seconds}s)"
+                )
+        return failed
@@ -0,0 +1,71 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.cases import build_cases
+from benchmarks.runner import BASELINE_PATH, DEFAULT_THRESHOLD, compare, load_baseline, run_cases, save_baseline
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the benchmark suite on synthetic data and compare median latencies "
+        "with the stored baseline; fails if any case regressed past --threshold."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("cases", nargs="*", help="Case names or name prefixes (default: all)")
+        parser.add_argument("--list", action="store_true", help="List the cases and exit")
+        parser.add_argument("--scale", type=float, default=1.0, help="Multiply every case's row count")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+        parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help="Allowed median slowdown against the baseline (0.25 = 25%%)")
+        parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline JSON file")
+        parser.add_argument("--update-baseline", action="store_true", help="Write these results as the baseline")
+        parser.add_argument("--json", type=Path, default=None, help="Also write the results to this file")
+        parser.add_argument("--in-process", action="store_true",
+                            help="Run every case in this process (faster; peak RSS is then cumulative)")
+
+    def handle(self, *args, **opts):
+        available = list(build_cases(opts["scale"]))
+        if opts["list"]:
+            self.stdout.write("\n".join(available))
+            return
+        names = [n for n in available if not opts["cases"] or any(n.startswith(p) for p in opts["cases"])]
+        if not names:
+            raise CommandError(f"no case matches {opts['cases']}; see --list")
+        if opts["in_process"]:
+            from benchmarks.runner import prepare_environment
+            prepare_environment()
+
+        baseline = load_baseline(opts["baseline"])
+        self.stdout.write(f"{'case':<28}{'rows':>10}{'p50 ms':>11}{'p95 ms':>11}{'rows/s':>13}{'peak MB':>9}  vs baseline")
+        results = []
+        for r in run_cases(names, opts["scale"], opts["repeat"], isolated=not opts["in_process"]):
+            results.append(r)
+            (cmp,) = compare([r], baseline, opts["scale"], opts["threshold"])
+            self.stdout.write(
+                f"{r.name:<28}{r.rows:>10}{r.p50_ms:>11.1f}{r.p95_ms:>11.1f}{r.rows_per_s:>13,.0f}"
+                f"{r.peak_rss_mb if r.peak_rss_mb is not None else '-':>9}  {self._change(cmp)}"
+            )
+
+        if opts["json"]:
+            report = {"scale": opts["scale"], "results": [vars(r) for r in results],
+                      "comparison": compare(results, baseline, opts["scale"], opts["threshold"])}
+            opts["json"].write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        if opts["update_baseline"]:
+            save_baseline(results, opts["scale"], opts["baseline"])
+            self.stdout.write(self.style.SUCCESS(f"baseline written to {opts['baseline']}"))
+            return
+
+        regressed = [c["name"] for c in compare(results, baseline, opts["scale"], opts["threshold"]) if c["regressed"]]
+        if regressed:
+            raise CommandError(f"{len(regressed)} case(s) slower than baseline by more than "
+                               f"{opts['threshold']:.0%}: {', '.join(regressed)}")
+        self.stdout.write(self.style.SUCCESS(f"{len(results)} case(s) within {opts['threshold']:.0%} of baseline"))
+
+    def _change(self, cmp: dict) -> str:
+        if cmp["change"] is None:
+            return "no baseline"
+        text = f"{cmp['change']:+.0%}"
+        return self.style.ERROR(text + " REGRESSION") if cmp["regressed"] else text
@@ -0,0 +1,65 @@
+# Generated by Django 5.0.6 on 2026-10-18 20:22
+
+import api.models
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('plan', models.JSONField()),
+                ('model_name', models.CharField(blank=True, default='', max_length=128)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-last_used_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UploadedDataset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to=api.models.upload_to)),
+                ('original_name', models.CharField(max_length=255)),
+                ('extension', models.CharField(blank=True, default='', max_length=16)),
+                ('columns', models.JSONField(blank=True, default=list)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-uploaded_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Transformation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('natural_language', models.TextField()),
+                ('pattern', models.TextField()),
+                ('replacement', models.TextField(blank=True, default='')),
+                ('target_columns', models.JSONField(blank=True, default=list)),
+                ('apply_phone_normalization', models.BooleanField(default=False)),
+                ('apply_date_normalization', models.BooleanField(default=False)),
+                ('result_preview', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transforms', to='api.uploadeddataset')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
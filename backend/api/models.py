@@ -15,6 +15,15 @@ class UploadedDataset(models.Model):
     row_count = models.PositiveIntegerField(default=0)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # Id handed to clients; the parsed frame lives in the dataset store as an
+    # Arrow IPC file at `columnar_path` (relative to MEDIA_ROOT).
+    public_id = models.CharField(max_length=32, unique=True, null=True, blank=True)
+    columnar_path = models.CharField(max_length=512, blank=True, default="")
+
+    # SHA-256 of the uploaded bytes. Files are stored by this hash (see
+    # services.uploads), so identical uploads share one file.
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+
     class Meta:
         ordering = ["-uploaded_at"]
 
@@ -25,10 +34,16 @@ class UploadedDataset(models.Model):
 class Transformation(models.Model):
     dataset = models.ForeignKey(UploadedDataset, on_delete=models.CASCADE, related_name="transforms")
     natural_language = models.TextField()
+    intent = models.CharField(max_length=16, blank=True, default="")
     pattern = models.TextField()
+    flags = models.JSONField(default=list, blank=True)
     replacement = models.TextField(blank=True, default="")
+    format = models.TextField(blank=True, default="")
     target_columns = models.JSONField(default=list, blank=True)
 
+    updated_rows = models.PositiveIntegerField(default=0)
+    updated_cells = models.PositiveIntegerField(default=0)
+
     apply_phone_normalization = models.BooleanField(default=False)
     apply_date_normalization = models.BooleanField(default=False)
 
@@ -40,3 +55,84 @@ class Transformation(models.Model):
 
     def __str__(self) -> str:
         return f"Transform on {self.dataset_id} @ {self.created_at:%Y-%m-%d %H:%M:%S}"
+
+    def as_step(self) -> dict:
+        """The chosen plan as a compiled recipe/pipeline step."""
+        return {
+            "prompt": self.natural_language,
+            "intent": self.intent or "replace",
+            "pattern": self.pattern,
+            "flags": list(self.flags or []),
+            "replacement": self.replacement or None,
+            "format": self.format or None,
+            "columns": list(self.target_columns or []),
+        }
+
+
+class Recipe(models.Model):
+    """
+    A named, ordered list of compiled steps (see Transformation.as_step),
+    replayed without the LLM by /api/recipes/<name>/apply and the
+    `apply_recipe` management command.
+    """
+    name = models.CharField(max_length=128, unique=True)
+    description = models.TextField(blank=True, default="")
+    steps = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self) -> str:
+        return f"Recipe {self.name} ({len(self.steps)} steps)"
+
+
+class PlanCacheEntry(models.Model):
+    key = models.CharField(max_length=64, unique=True)
+    plan = models.JSONField()
+    model_name = models.CharField(max_length=128, blank=True, default="")
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ["-last_used_at"]
+
+    def __str__(self) -> str:
+        return f"{self.model_name} plan {self.key[:12]} ({self.hits} hits)"
+
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+        ("cancelled", "Cancelled"),
+    ]
+
+    job_id = models.CharField(max_length=32, unique=True)
+    kind = models.CharField(max_length=16)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="queued", db_index=True)
+    dataset_id = models.CharField(max_length=32, blank=True, default="")
+
+    # Progress of the current stage, e.g. rows parsed or cells evaluated.
+    stage = models.CharField(max_length=32, blank=True, default="")
+    done = models.BigIntegerField(default=0)
+    total = models.BigIntegerField(null=True, blank=True)
+    cancel_requested = models.BooleanField(default=False)
+
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"{self.kind} job {self.job_id} ({self.status})"
@@ -0,0 +1,50 @@
+import pyarrow as pa
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+from .services import metrics
+
+try:
+    import orjson
+except ImportError:  # falls back to DRF's json-based renderer
+    orjson = None
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """
+    DRF's JSON renderer, timed as the "serialize" stage. Compact bodies go
+    through orjson when it is installed; anything orjson does not know
+    (lazy strings, Decimal, ...) is handed to DRF's encoder. Indented
+    output (`Accept: application/json; indent=2`) keeps the stdlib path.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with metrics.span("serialize"):
+            if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+                return super().render(data, accepted_media_type, renderer_context)
+            return orjson.dumps(data, default=JSONEncoder().default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class ArrowStreamRenderer(renderers.BaseRenderer):
+    """
+    Arrow IPC stream bodies for views that return a `pyarrow.Table` when
+    this renderer was negotiated (`Accept: application/vnd.apache.arrow.stream`).
+    Anything else, such as an error payload, is sent as JSON instead.
+    """
+
+    media_type = "application/vnd.apache.arrow.stream"
+    format = "arrow"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, pa.Table):
+            response = (renderer_context or {}).get("response")
+            if response is not None:
+                response["Content-Type"] = "application/json"
+            return JSONRenderer().render(data, "application/json", renderer_context)
+        with metrics.span("serialize"):
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, data.schema) as writer:
+                writer.write_table(data)
+            return sink.getvalue().to_pybytes()
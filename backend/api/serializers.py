@@ -2,6 +2,14 @@ from rest_framework import serializers
 
 
 class UploadResponse(serializers.Serializer):
+    dataset_id = serializers.CharField()
     columns = serializers.ListField(child=serializers.CharField())
     data = serializers.ListField()
-    filename = serializers.CharField()
\ No newline at end of file
+    filename = serializers.CharField()
+    encoding = serializers.CharField(allow_null=True, required=False)
+    encoding_confidence = serializers.FloatField(allow_null=True, required=False)
+    delimiter = serializers.CharField(allow_null=True, required=False, trim_whitespace=False)
+    sheet = serializers.CharField(allow_null=True, required=False)
+    dtypes = serializers.DictField(child=serializers.CharField(), allow_null=True, required=False)
+    # True when the same bytes had been parsed before and the cached frame was used.
+    cached = serializers.BooleanField(required=False, default=False)
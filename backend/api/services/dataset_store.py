@@ -0,0 +1,426 @@
+# services/dataset_store.py
+from __future__ import annotations
+import json
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from threading import RLock
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from ..models import UploadedDataset
+from . import metrics
+from .parse_cache import ParseCache, link_or_copy
+from .profile import matches_columns, profile_frame
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# A read refreshes a dataset's last-used time at most this often per process.
+TOUCH_INTERVAL = 60.0
+
+
+@dataclass
+class StoredDataset:
+    dataset_id: str
+    df: pd.DataFrame
+    name: str
+    version: tuple[int, int]
+    nbytes: int
+
+
+def estimate_nbytes(df: pd.DataFrame, sample: int = 1000) -> int:
+    """
+    Approximate resident size without a deep scan: object-backed string
+    columns are extrapolated from the first `sample` values.
+    """
+    total = 0
+    for col in df.columns:
+        s = df[col]
+        if s.dtype == object or (isinstance(s.dtype, pd.StringDtype) and s.dtype.storage == "python"):
+            head = s.iloc[:sample]
+            per_value = head.memory_usage(deep=True, index=False) / max(1, len(head))
+            total += int(per_value * len(s))
+        else:
+            total += int(s.memory_usage(deep=False, index=False))
+    return total
+
+
+_ARROW_STRINGS = {pa.string(): pd.StringDtype("pyarrow"), pa.large_string(): pd.StringDtype("pyarrow")}
+
+def read_columnar(path: Path) -> pd.DataFrame:
+    """
+    Open a stored frame through a memory map. Text columns stay Arrow-backed
+    (string[pyarrow]) so their buffers are the mapped pages themselves:
+    opening is near-instant regardless of size and the OS shares those pages
+    between every worker process reading the same file.
+    """
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(types_mapper=_ARROW_STRINGS.get, split_blocks=True)
+
+
+def _lock_file(fh, blocking: bool) -> bool:
+    """Take an exclusive lock on the open file `fh`; False if `blocking` is off and it is held."""
+    if fcntl is not None:
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+    while True:
+        try:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.05)
+
+def _unlock_file(fh) -> None:
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    else:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _is_current(fh, path: Path) -> bool:
+    """Whether the open file `fh` is still the one at `path` (not unlinked or replaced)."""
+    try:
+        return os.fstat(fh.fileno()).st_ino == path.stat().st_ino
+    except FileNotFoundError:
+        return False
+
+
+class DatasetStore:
+    """
+    Datasets keyed by an opaque id, shared by every worker process that
+    points at the same directory.
+
+    Each `put` writes the frame through to `<root>/<id>.arrow` (Feather v2,
+    i.e. uncompressed Arrow IPC) and keeps it in an in-process LRU bounded by
+    `memory_budget` bytes; evicted frames are simply dropped from memory
+    and reloaded from disk on the next `get`. The file's (mtime, inode)
+    pair is the version: a frame cached here is reloaded whenever another
+    worker has replaced it.
+
+    Parsed uploads are kept alongside in `parsed` (see ParseCache), whose
+    entries share their files with the datasets created from them.
+
+    Updates are read-modify-write: callers hold `lock(dataset_id)`, a file
+    lock shared with every process, from reading a version to storing the
+    next. Datasets unused for `retention` seconds (by the metadata file's
+    mtime, refreshed by reads and writes) are deleted with their history
+    whenever a new one is created; None or 0 keeps them forever.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        memory_budget: int,
+        parse_cache_budget: Optional[int] = None,
+        retention: Optional[float] = None,
+    ):
+        self.root = Path(root)
+        self.memory_budget = memory_budget
+        if parse_cache_budget is None:
+            parse_cache_budget = settings.PARSE_CACHE_BYTES
+        if retention is None:
+            retention = settings.DATASET_RETENTION_SECONDS
+        self.retention = retention
+        self.parsed = ParseCache(self.root / "parsed", parse_cache_budget)
+        self._memory: OrderedDict[str, StoredDataset] = OrderedDict()
+        self._resident = 0
+        self._touched: dict[str, float] = {}
+        self._lock = RLock()
+
+    # -----------------------
+    # Paths
+    # -----------------------
+    def path_for(self, dataset_id: str) -> Path:
+        return self._data_path(dataset_id)
+
+    def _data_path(self, dataset_id: str) -> Path:
+        if not _ID_RE.match(dataset_id or ""):
+            raise KeyError(dataset_id)
+        return self.root / f"{dataset_id}.arrow"
+
+    def _meta_path(self, dataset_id: str) -> Path:
+        return self.root / f"{dataset_id}.json"
+
+    def _changed_path(self, dataset_id: str) -> Path:
+        return self.root / f"{dataset_id}.changed.npy"
+
+    def _lock_path(self, dataset_id: str) -> Path:
+        return self.root / f"{dataset_id}.lock"
+
+    @staticmethod
+    def _version(path: Path) -> tuple[int, int]:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_ino
+
+    # -----------------------
+    # Memory tier
+    # -----------------------
+    def _remember(self, entry: StoredDataset) -> None:
+        with self._lock:
+            old = self._memory.pop(entry.dataset_id, None)
+            if old is not None:
+                self._resident -= old.nbytes
+            self._memory[entry.dataset_id] = entry
+            self._resident += entry.nbytes
+            # Always keep the newest entry, even if it alone exceeds the budget.
+            while self._resident > self.memory_budget and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._resident -= evicted.nbytes
+
+    def _forget(self, dataset_id: str) -> None:
+        with self._lock:
+            old = self._memory.pop(dataset_id, None)
+            if old is not None:
+                self._resident -= old.nbytes
+
+    # -----------------------
+    # Public API
+    # -----------------------
+    @contextmanager
+    def lock(self, dataset_id: str) -> Iterator[None]:
+        """Hold the exclusive update lock of `dataset_id`, across threads and processes."""
+        path = self._lock_path(dataset_id)
+        self._data_path(dataset_id)  # validates the id
+        self.root.mkdir(parents=True, exist_ok=True)
+        while True:
+            with path.open("a+b") as fh:
+                _lock_file(fh, blocking=True)
+                try:
+                    # prune() unlinks the lock file of a dataset it deletes;
+                    # a lock taken on the unlinked file would exclude no one.
+                    if _is_current(fh, path):
+                        yield
+                        return
+                finally:
+                    _unlock_file(fh)
+
+    def create(self, df: pd.DataFrame, name: str, profile: Optional[list[dict]] = None) -> StoredDataset:
+        self.prune()
+        return self.put(uuid.uuid4().hex, df, name, profile=profile)
+
+    def put(
+        self,
+        dataset_id: str,
+        df: pd.DataFrame,
+        name: Optional[str] = None,
+        changed_rows: Optional[np.ndarray] = None,
+        profile: Optional[list[dict]] = None,
+    ) -> StoredDataset:
+        """
+        Store a new version of `dataset_id`. `changed_rows` are the row
+        positions the producing transform touched; they are kept next to the
+        frame until the next put. The column profile (see `profile`) is
+        replaced by `profile` if given, and otherwise carried over while the
+        columns stay the same.
+        """
+        path = self._data_path(dataset_id)
+        self.root.mkdir(parents=True, exist_ok=True)
+        old_meta = self._read_meta(dataset_id)
+        if name is None:
+            name = old_meta.get("name", "")
+
+        if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+            df = df.reset_index(drop=True)
+
+        # Write-then-rename so readers (and memory maps) in other processes
+        # never observe a half-written file; a failed write changes nothing.
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with metrics.span("store.write"):
+            try:
+                feather.write_feather(df, tmp, compression="uncompressed")
+                os.replace(tmp, path)
+            finally:
+                tmp.unlink(missing_ok=True)
+
+        changed_path = self._changed_path(dataset_id)
+        if changed_rows is None:
+            changed_path.unlink(missing_ok=True)
+        else:
+            changed_tmp = changed_path.with_suffix(".tmp")
+            with changed_tmp.open("wb") as fh:
+                np.save(fh, np.asarray(changed_rows, dtype=np.int64))
+            os.replace(changed_tmp, changed_path)
+        meta = {"name": name}
+        if profile is None and matches_columns(old_meta.get("profile"), df):
+            profile = old_meta["profile"]
+        if profile is not None:
+            meta["profile"] = profile
+        self._write_meta(dataset_id, meta)
+
+        entry = StoredDataset(dataset_id, df, name, self._version(path), estimate_nbytes(df))
+        self._remember(entry)
+        return entry
+
+    def adopt(
+        self, source: Path, name: str, profile: Optional[list[dict]] = None, dataset_id: Optional[str] = None
+    ) -> StoredDataset:
+        """
+        Create a dataset (a new id unless `dataset_id` is given) whose first
+        version is the stored frame at `source`, hard-linked rather than
+        rewritten where the filesystem allows.
+        """
+        self.prune()
+        dataset_id = dataset_id or uuid.uuid4().hex
+        path = self._data_path(dataset_id)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._changed_path(dataset_id).unlink(missing_ok=True)
+        with metrics.span("store.write"):
+            link_or_copy(source, path)
+        meta = {"name": name}
+        if profile is not None:
+            meta["profile"] = profile
+        self._write_meta(dataset_id, meta)
+
+        with metrics.span("store.read"):
+            df = read_columnar(path)
+        entry = StoredDataset(dataset_id, df, name, self._version(path), estimate_nbytes(df))
+        self._remember(entry)
+        return entry
+
+    def _read_meta(self, dataset_id: str) -> dict:
+        try:
+            return json.loads(self._meta_path(dataset_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, dataset_id: str, meta: dict) -> None:
+        meta_tmp = self._meta_path(dataset_id).with_suffix(f".{uuid.uuid4().hex}.tmp")
+        meta_tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        os.replace(meta_tmp, self._meta_path(dataset_id))
+        self._touched[dataset_id] = time.monotonic()
+
+    def _touch(self, dataset_id: str) -> None:
+        # The data file's mtime is its version, so last use lives on the metadata file.
+        now = time.monotonic()
+        if now - self._touched.get(dataset_id, float("-inf")) < TOUCH_INTERVAL:
+            return
+        self._touched[dataset_id] = now
+        try:
+            os.utime(self._meta_path(dataset_id))
+        except OSError:
+            pass
+
+    def profile(self, entry: StoredDataset) -> list[dict]:
+        """
+        Column profile of `entry` for the planner. Written at upload and
+        kept in the metadata file; rebuilt here only if it is missing or
+        the columns have changed since.
+        """
+        meta = self._read_meta(entry.dataset_id)
+        if matches_columns(meta.get("profile"), entry.df):
+            return meta["profile"]
+        meta["profile"] = profile_frame(entry.df)
+        meta.setdefault("name", entry.name)
+        self._write_meta(entry.dataset_id, meta)
+        return meta["profile"]
+
+    def get(self, dataset_id: str) -> Optional[StoredDataset]:
+        try:
+            path = self._data_path(dataset_id)
+            version = self._version(path)
+        except (KeyError, FileNotFoundError):
+            self._forget(dataset_id or "")
+            return None
+
+        self._touch(dataset_id)
+        with self._lock:
+            entry = self._memory.get(dataset_id)
+            if entry is not None and entry.version == version:
+                self._memory.move_to_end(dataset_id)
+                return entry
+
+        with metrics.span("store.read"):
+            df = read_columnar(path)
+        entry = StoredDataset(dataset_id, df, self._read_meta(dataset_id).get("name", ""), version, estimate_nbytes(df))
+        self._remember(entry)
+        return entry
+
+    def changed_rows(self, dataset_id: str) -> Optional[np.ndarray]:
+        """Row positions changed by the transform that produced the current version."""
+        try:
+            self._data_path(dataset_id)
+            return np.load(self._changed_path(dataset_id), mmap_mode="r")
+        except (KeyError, OSError, ValueError):
+            return None
+
+    def delete(self, dataset_id: str) -> None:
+        self._forget(dataset_id)
+        self._touched.pop(dataset_id, None)
+        for p in (self._data_path(dataset_id), self._meta_path(dataset_id), self._changed_path(dataset_id)):
+            p.unlink(missing_ok=True)
+        for p in self.root.glob(f"{dataset_id}.step*.arrow"):
+            p.unlink(missing_ok=True)
+        (self.root / f"{dataset_id}.history.json").unlink(missing_ok=True)
+
+    def _last_used(self, dataset_id: str) -> float:
+        last_used = 0.0
+        for p in (self._data_path(dataset_id), self._meta_path(dataset_id)):
+            try:
+                last_used = max(last_used, p.stat().st_mtime)
+            except FileNotFoundError:
+                pass
+        return last_used
+
+    def prune(self) -> list[str]:
+        """
+        Delete datasets unused for longer than `retention` (see the class
+        docstring), with their UploadedDataset rows and so their
+        transformations. Datasets locked for an update are skipped. Returns
+        the deleted ids.
+        """
+        if not self.retention:
+            return []
+        cutoff = time.time() - self.retention
+        deleted = []
+        for path in self.root.glob("*.arrow"):
+            dataset_id = path.stem
+            if not _ID_RE.match(dataset_id) or self._last_used(dataset_id) >= cutoff:
+                continue
+            lock_path = self._lock_path(dataset_id)
+            with lock_path.open("a+b") as fh:
+                if not _lock_file(fh, blocking=False):
+                    continue
+                try:
+                    # Re-check under the lock: it may have been used or pruned since.
+                    if not _is_current(fh, lock_path) or self._last_used(dataset_id) >= cutoff:
+                        continue
+                    self.delete(dataset_id)
+                    try:
+                        lock_path.unlink()
+                    except OSError:  # open files cannot be unlinked on Windows
+                        pass
+                finally:
+                    _unlock_file(fh)
+            deleted.append(dataset_id)
+        if deleted:
+            UploadedDataset.objects.filter(public_id__in=deleted).delete()
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"resident_bytes": self._resident, "resident_datasets": len(self._memory), "budget_bytes": self.memory_budget}
+
+
+store = DatasetStore(settings.DATASET_STORE_DIR, settings.DATASET_STORE_MEMORY_BYTES)
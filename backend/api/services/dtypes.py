@@ -0,0 +1,161 @@
+# services/dtypes.py
+from __future__ import annotations
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+TYPED_SAMPLE_ROWS = 10_000
+# Text columns with at most this share of distinct values (and enough rows
+# for the codes to pay off) are stored as categoricals.
+CATEGORY_MAX_RATIO = 0.1
+CATEGORY_MIN_ROWS = 1_000
+# Formats the loaders produce for dates (see xlsx_reader._number).
+_DATETIME_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S")
+
+TEXT = "text"
+
+
+def string_view(s: pd.Series) -> pd.Series:
+    """The column as text, exactly as it was loaded; missing stays missing."""
+    if isinstance(s.dtype, pd.StringDtype):
+        return s
+    return s.astype("string")
+
+
+def text_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """`df` with every typed column replaced by its string view."""
+    typed = [c for c in df.columns if not isinstance(df[c].dtype, pd.StringDtype)]
+    if not typed:
+        return df
+    return df.assign(**{c: string_view(df[c]) for c in typed})
+
+
+def display_columns(df: pd.DataFrame) -> list[list]:
+    """Column-major preview cells: one list per column, string views with missing cells as ""."""
+    text = text_frame(df)
+    return [text.iloc[:, i].to_numpy(dtype=object, na_value="").tolist() for i in range(text.shape[1])]
+
+
+def display_rows(df: pd.DataFrame) -> list[list]:
+    """Rows for JSON previews: string views with missing cells as ""."""
+    if not df.shape[1]:
+        return [[] for _ in range(len(df))]
+    # Transposing per-column lists is several times faster than a row-major
+    # object frame for wide or long windows.
+    return [list(row) for row in zip(*display_columns(df))]
+
+
+def dtype_kind(s: pd.Series) -> str:
+    """The inference kind (see `infer_column`) a stored column's dtype stands for."""
+    dtype = s.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "category"
+    if pd.api.types.is_bool_dtype(dtype):
+        return "boolean"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "integer"
+    if pd.api.types.is_float_dtype(dtype):
+        return "float"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    return TEXT
+
+
+# -----------------------
+# Inference
+# -----------------------
+def _to_integer(s: pd.Series) -> Optional[pd.Series]:
+    num = pd.to_numeric(s, errors="coerce")
+    if num.isna().sum() != s.isna().sum():
+        return None
+    try:
+        return num.astype("Int64")
+    except (TypeError, ValueError):
+        return None
+
+def _to_float(s: pd.Series) -> Optional[pd.Series]:
+    num = pd.to_numeric(s, errors="coerce")
+    if num.isna().sum() != s.isna().sum():
+        return None
+    return num.astype("Float64")
+
+def _to_boolean(s: pd.Series) -> Optional[pd.Series]:
+    known = s.isin(["True", "False"]) | s.isna()
+    if not known.all():
+        return None
+    return (s == "True").astype("boolean").mask(s.isna())
+
+def _to_datetime(s: pd.Series) -> Optional[pd.Series]:
+    for fmt in _DATETIME_FORMATS:
+        out = pd.to_datetime(s, format=fmt, errors="coerce")
+        if out.isna().sum() == s.isna().sum():
+            return out
+    return None
+
+_CONVERTERS: tuple[tuple[str, Callable[[pd.Series], Optional[pd.Series]]], ...] = (
+    ("integer", _to_integer),
+    ("float", _to_float),
+    ("boolean", _to_boolean),
+    ("datetime", _to_datetime),
+)
+
+
+def _lossless(original: pd.Series, converted: pd.Series) -> bool:
+    """True if the converted column's string view reproduces every value."""
+    present = original.notna().to_numpy()
+    view = string_view(converted).to_numpy(dtype=object, na_value=None)
+    return bool((view[present] == original.to_numpy(dtype=object)[present]).all())
+
+
+def spread(s: pd.Series, n: int) -> pd.Series:
+    """At most `n` values of `s`, evenly spaced from first to last, for sampling."""
+    if len(s) <= n:
+        return s
+    return s.iloc[np.linspace(0, len(s) - 1, n).astype(np.int64)]
+
+
+def infer_column(s: pd.Series, sample_rows: int = TYPED_SAMPLE_ROWS) -> tuple[pd.Series, str]:
+    """
+    Pick the most compact dtype that loses nothing for one text column.
+
+    Empty strings count as missing. Each candidate conversion is tried on
+    a spread-out sample first and only then on the whole column, and is
+    kept only if the string view of the result gives back every original
+    value (so "007", "1.50" or mixed date formats stay text). Otherwise
+    low-cardinality columns become categoricals and the rest Arrow-backed
+    strings.
+
+    Text and categorical columns keep empty strings as "", exactly as an
+    untyped load does, so transforms that fill blanks (`^$`) still reach
+    them. Integer, float, boolean and datetime columns cannot hold "" and
+    store blanks as missing; transforms never rewrite missing cells, so
+    those blanks are left alone.
+    """
+    text = string_view(s)
+    values = text.mask(text == "")
+    present = values.dropna()
+    if len(present):
+        sample = spread(present, sample_rows)
+        for kind, convert in _CONVERTERS:
+            probe = convert(sample)
+            if probe is None or not _lossless(sample, probe):
+                continue
+            full = convert(values)
+            if full is not None and _lossless(values, full):
+                return full.rename(s.name), kind
+
+    if len(s) >= CATEGORY_MIN_ROWS and text.nunique(dropna=True) <= CATEGORY_MAX_RATIO * max(1, text.notna().sum()):
+        # Plain object categories: that is what a feather round trip gives back.
+        values = pd.Series(text.to_numpy(dtype=object, na_value=None), index=s.index, name=s.name)
+        return values.astype("category"), "category"
+    return text.astype("string[pyarrow]"), TEXT
+
+
+def infer_types(df: pd.DataFrame, sample_rows: int = TYPED_SAMPLE_ROWS) -> tuple[pd.DataFrame, dict[str, str]]:
+    """Apply `infer_column` to every column; returns the frame and column -> kind."""
+    kinds = {}
+    columns = {}
+    for col in df.columns:
+        columns[col], kinds[col] = infer_column(df[col], sample_rows)
+    return pd.DataFrame(columns, index=df.index), kinds
@@ -0,0 +1,216 @@
+# services/export.py
+from __future__ import annotations
+import zipfile
+import zlib
+from typing import Callable, Iterator, Optional
+from xml.sax.saxutils import escape
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from . import metrics
+from .dtypes import string_view, text_frame
+
+EXPORT_CHUNK_ROWS = 50_000
+XLSX_MAX_ROWS = 1_048_576  # including the header row
+
+# format -> (content type, file extension)
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", ".csv"),
+    "jsonl": ("application/x-ndjson; charset=utf-8", ".jsonl"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".xlsx"),
+}
+
+
+class _Spool:
+    """
+    Write-only file object that hands out what has been written so far.
+    Writers that expect a file (ParquetWriter, ZipFile) write into it and
+    the generator drains it after each chunk, so nothing accumulates.
+    """
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        b = bytes(data)
+        self._parts.append(b)
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    @property
+    def closed(self) -> bool:
+        return False
+
+    def drain(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+
+def _slices(df: pd.DataFrame, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for lo in range(0, len(df), chunk_rows):
+        yield df.iloc[lo:lo + chunk_rows]
+
+
+# -----------------------
+# Formats
+# -----------------------
+def _csv(df: pd.DataFrame, chunk_rows: int) -> Iterator[bytes]:
+    yield df.iloc[0:0].to_csv(index=False).encode("utf-8")
+    for part in _slices(df, chunk_rows):
+        yield part.to_csv(index=False, header=False).encode("utf-8")
+
+
+def _jsonl(df: pd.DataFrame, chunk_rows: int) -> Iterator[bytes]:
+    # Numbers and booleans stay typed; dates are written as loaded.
+    dates = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+    for part in _slices(df, chunk_rows):
+        if dates:
+            part = part.assign(**{c: string_view(part[c]) for c in dates})
+        text = part.to_json(orient="records", lines=True, force_ascii=False)
+        yield (text if text.endswith("\n") else text + "\n").encode("utf-8")
+
+
+def _parquet(df: pd.DataFrame, chunk_rows: int) -> Iterator[bytes]:
+    # One row group per chunk; the footer is written on close.
+    spool = _Spool()
+    schema = pa.Schema.from_pandas(df.iloc[0:0], preserve_index=False)
+    with pq.ParquetWriter(spool, schema) as writer:
+        for part in _slices(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(part, schema=schema, preserve_index=False))
+            yield spool.drain()
+    yield spool.drain()
+
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{sheet}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+_XML_ILLEGAL = "[\x00-\x08\x0b\x0c\x0e-\x1f]"
+_CELL_OPEN = '<c t="inlineStr"><is><t xml:space="preserve">'
+_CELL_CLOSE = "</t></is></c>"
+
+
+def _xlsx_cells(values: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Inline-string <c> elements for a column; missing values become <c/>."""
+    text = pc.cast(values, pa.string())
+    text = pc.replace_substring(text, "&", "&amp;")
+    text = pc.replace_substring(text, "<", "&lt;")
+    text = pc.replace_substring(text, ">", "&gt;")
+    text = pc.replace_substring_regex(text, _XML_ILLEGAL, "")
+    cells = pc.binary_join_element_wise(_CELL_OPEN, text, _CELL_CLOSE, "")
+    return pc.fill_null(cells, "<c/>")
+
+
+def _xlsx_rows(part: pd.DataFrame) -> str:
+    # Cells and rows carry no r="A1" references: they are positional, which
+    # lets a whole chunk be assembled with Arrow kernels instead of per cell.
+    table = pa.Table.from_pandas(text_frame(part), preserve_index=False)
+    cells = [_xlsx_cells(col) for col in table.columns]
+    rows = pc.binary_join_element_wise("<row>", *cells, "</row>", "")
+    return "".join(rows.to_pylist())
+
+
+def _xlsx(df: pd.DataFrame, chunk_rows: int, sheet: str = "Sheet1") -> Iterator[bytes]:
+    """
+    A minimal single-sheet workbook written straight into a streamed zip:
+    every cell is an inline string (the text the table holds), so no
+    shared-string table has to be built up front.
+    """
+    spool = _Spool()
+    header = pd.DataFrame([list(map(str, df.columns))], dtype="string")
+    with zipfile.ZipFile(spool, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in _XLSX_PARTS.items():
+            zf.writestr(name, xml.replace("{sheet}", escape(sheet, {'"': "&quot;"})))
+        yield spool.drain()
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as fh:
+            fh.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            fh.write(_xlsx_rows(header).encode("utf-8"))
+            for part in _slices(df, chunk_rows):
+                fh.write(_xlsx_rows(part).encode("utf-8"))
+                yield spool.drain()
+            fh.write(b"</sheetData></worksheet>")
+    yield spool.drain()
+
+
+_WRITERS: dict[str, Callable[[pd.DataFrame, int], Iterator[bytes]]] = {
+    "csv": _csv,
+    "jsonl": _jsonl,
+    "parquet": _parquet,
+    "xlsx": _xlsx,
+}
+
+
+def _gzip(chunks: Iterator[bytes], level: int = 6) -> Iterator[bytes]:
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def check_exportable(df: pd.DataFrame, fmt: str) -> Optional[str]:
+    """An error message if `df` cannot be written as `fmt`, else None."""
+    if fmt not in FORMATS:
+        return f"format must be one of {', '.join(FORMATS)}"
+    if fmt == "xlsx" and len(df) + 1 > XLSX_MAX_ROWS:
+        return f"{len(df)} rows exceed the xlsx limit of {XLSX_MAX_ROWS - 1}; use csv, jsonl or parquet"
+    return None
+
+
+def stream_export(df: pd.DataFrame, fmt: str, compress: bool = False, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Serialize `df` as `fmt` one slice of `chunk_rows` rows at a time.
+    Memory stays bounded by one slice (plus a compression window with
+    `compress`), whatever the table size. Empty chunks are skipped.
+    """
+    metrics.ROWS.inc(len(df), stage="export")
+    chunks = _WRITERS[fmt](df, chunk_rows)
+    if compress:
+        chunks = _gzip(chunks)
+    return (c for c in chunks if c)
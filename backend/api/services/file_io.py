@@ -1,40 +1,237 @@
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Sequence, Union
 import pandas as pd
+import zipfile
+import codecs
 import csv
+import io
+import unicodedata
+
+from . import metrics
+from .dtypes import infer_types
+from .xlsx_reader import XlsxWorkbook
 
 @dataclass
 class LoadedFrame:
     df: pd.DataFrame
     name: str
     ext: str
+    encoding: Optional[str] = None
+    encoding_confidence: Optional[float] = None
+    delimiter: Optional[str] = None
+    sheet: Optional[str] = None
+    # Column -> inferred kind, when loaded with typed=True.
+    dtypes: Optional[dict[str, str]] = None
+
+# Called after each chunk with (rows loaded so far, expected total or None).
+Progress = Callable[[int, Optional[int]], None]
 
 SUPPORTED = {".csv", ".xlsx", ".xls"}
 
+CSV_SNIFF_BYTES = 256 * 1024
+CSV_CHUNK_ROWS = 50_000
+
 # -----------------------
 # Decoding & newline
 # -----------------------
 def _read_bytes(filepath: Path) -> bytes:
     return filepath.read_bytes()
 
-def _decode_best_effort(raw: bytes) -> str:
-    try:
-        return raw.decode("utf-8-sig")
-    except UnicodeDecodeError:
-        pass
+_FALLBACK_ENCODINGS = ("utf-8-sig", "gb18030", "big5", "shift_jis", "utf-16", "utf-32", "cp1252")
 
-    try:
-        return raw.decode("gb18030")
-    except UnicodeDecodeError:
-        pass
+# Encodings that fail the UTF-8 check are ranked by how plausible their
+# decoding of the sample looks; ties keep this order.
+_LEGACY_ENCODINGS = ("gb18030", "big5", "shift_jis", "cp1252")
+_ASCII_COMPATIBLE = {"utf-8-sig", *_LEGACY_ENCODINGS, "latin-1"}
+
+DECODE_BLOCK_BYTES = 1024 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# Very frequent Han characters (simplified and traditional forms). A legacy
+# CJK decoding of the wrong encoding rarely lands on them.
+_COMMON_HAN = set("的一是不了在人有我他这這中大来來上国國个個到说說们們为為子和你地出道也时時年会會")
 
-    for enc in ("big5", "shift_jis", "utf-16", "utf-32", "cp1252"):
+@dataclass
+class EncodingGuess:
+    encoding: str
+    confidence: float
+
+def _nul_layout(sample: bytes) -> Optional[str]:
+    """BOM-less UTF-16/32: mostly-ASCII text leaves NULs in fixed byte lanes."""
+    n = len(sample) - len(sample) % 4
+    if n < 8:
+        return None
+    lanes = [sample[i:n:4].count(0) / (n // 4) for i in range(4)]
+    if lanes[3] > 0.9 and lanes[2] > 0.5 and lanes[0] < 0.1:
+        return "utf-32-le"
+    if lanes[0] > 0.9 and lanes[1] > 0.5 and lanes[3] < 0.1:
+        return "utf-32-be"
+    even, odd = (lanes[0] + lanes[2]) / 2, (lanes[1] + lanes[3]) / 2
+    if odd > 0.6 and even < 0.1:
+        return "utf-16-le"
+    if even > 0.6 and odd < 0.1:
+        return "utf-16-be"
+    return None
+
+def _plausibility(text: str) -> float:
+    """
+    Average per non-ASCII character of how likely it is to occur in real
+    text: letters, ideographs and typographic punctuation score up; control,
+    private-use and stray symbols score down, as do the patterns wrong
+    decodings produce (a lone ideograph inside a Latin word, accented
+    letters with no ASCII around them).
+    """
+    total = 0.0
+    count = 0
+    last = len(text) - 1
+    for i, c in enumerate(text):
+        if c < "\x80":
+            continue
+        count += 1
+        prev_ascii = i > 0 and text[i - 1] < "\x80"
+        next_ascii = i < last and text[i + 1] < "\x80"
+        if "\u4e00" <= c <= "\u9fff":
+            if prev_ascii and next_ascii and text[i - 1].isalpha() and text[i + 1].isalpha():
+                total -= 2
+            else:
+                total += 2 if c in _COMMON_HAN else 1
+        elif "\u3040" <= c <= "\u30ff" or "\u3000" <= c <= "\u303f" or "\uff00" <= c <= "\uffef":
+            total += 1
+        elif "\u00c0" <= c <= "\u024f":
+            total += 1 if (prev_ascii or next_ascii) else -1
+        elif "\u2010" <= c <= "\u206f" or c in "\u20ac\u00a0\u00b0\u00a3\u00a9\u00ae\u00ab\u00bb":
+            total += 1
+        elif unicodedata.category(c) in ("Cc", "Co", "Cn", "Cs", "So", "Sk"):
+            total -= 2
+    return total / count if count else 0.0
+
+def detect_encoding(sample: bytes, final: bool, candidates: Sequence[str] = _FALLBACK_ENCODINGS) -> EncodingGuess:
+    """
+    Guess the encoding of a byte sample without decoding anything else.
+
+    Order of evidence: a BOM; NUL-byte lanes (BOM-less UTF-16/32); a strict
+    UTF-8 decode (pure ASCII is reported as UTF-8 with full confidence,
+    since every candidate reads it the same way); finally the legacy code
+    pages that decode the sample, ranked by `_plausibility`. `final` says
+    whether the sample is the whole input, i.e. whether a trailing partial
+    character is an error.
+    """
+    for bom, enc in _BOMS:
+        if sample.startswith(bom) and enc in candidates:
+            return EncodingGuess(enc, 1.0)
+
+    nul = _nul_layout(sample)
+    if nul is not None and nul.rsplit("-", 1)[0] in candidates:
+        return EncodingGuess(nul, 0.9)
+
+    if "utf-8-sig" in candidates:
         try:
-            return raw.decode(enc)
+            codecs.getincrementaldecoder("utf-8")().decode(sample, final=final)
+            return EncodingGuess("utf-8-sig", 1.0 if sample.isascii() else 0.99)
         except UnicodeDecodeError:
+            pass
+
+    scored = []
+    for enc in _LEGACY_ENCODINGS:
+        if enc not in candidates:
             continue
+        try:
+            text = codecs.getincrementaldecoder(enc)().decode(sample, final=final)
+        except UnicodeDecodeError:
+            continue
+        scored.append((_plausibility(text), enc))
+    if not scored:
+        # Last resorts, in the order the old trial decode used them.
+        for enc in ("utf-16", "utf-32"):
+            if enc in candidates:
+                try:
+                    codecs.getincrementaldecoder(enc)().decode(sample, final=final)
+                    return EncodingGuess(enc, 0.3)
+                except UnicodeError:
+                    pass
+        return EncodingGuess("latin-1", 0.0)
+
+    best_score, best = max(scored, key=lambda t: t[0])  # first wins ties
+    runner_up = max((sc for sc, enc in scored if enc != best), default=None)
+    confidence = max(0.0, min(1.0, best_score / 2 + 0.5))
+    if runner_up is not None:
+        confidence *= min(1.0, 0.5 + (best_score - runner_up) / 2)
+    return EncodingGuess(best, round(confidence, 2))
+
+def _read_blocks(fh: BinaryIO, block_bytes: int = DECODE_BLOCK_BYTES) -> Iterator[tuple[bytes, bool]]:
+    block = fh.read(block_bytes)
+    while True:
+        following = fh.read(block_bytes)
+        yield block, not following
+        if not following:
+            return
+        block = following
 
-    return raw.decode("latin-1", errors="replace")
+def _decode_blocks(blocks: Iterable[tuple[bytes, bool]], dialect: "CsvDialect") -> Iterator[str]:
+    """
+    Decode a byte stream exactly once, block by block, using
+    `dialect.encoding`.
+
+    The sniffed prefix can be pure ASCII while later bytes are not valid in
+    the guessed encoding. If nothing but ASCII has been decoded so far, the
+    encoding is re-detected from the offending bytes and decoding carries on
+    from there (the ASCII already produced reads the same in every
+    ASCII-compatible encoding). Otherwise the bad bytes are replaced. Either
+    way `dialect` is updated to describe what was actually used.
+    """
+    decoder = codecs.getincrementaldecoder(dialect.encoding)(
+        errors="replace" if dialect.encoding == "latin-1" else "strict"
+    )
+    ascii_so_far = True
+    for block, final in blocks:
+        # Bytes the decoder still holds from the previous block (the start
+        # of a multi-byte sequence); error offsets count from them.
+        pending = decoder.getstate()[0]
+        try:
+            text = decoder.decode(block, final)
+        except UnicodeDecodeError as e:
+            if ascii_so_far and dialect.encoding in _ASCII_COMPATIBLE and dialect.encoding != "latin-1":
+                data = pending + block
+                window = data[e.start:e.start + CSV_SNIFF_BYTES]
+                guess = detect_encoding(
+                    window, final and e.start + CSV_SNIFF_BYTES >= len(data), candidates=_LEGACY_ENCODINGS
+                )
+                decoder = codecs.getincrementaldecoder(guess.encoding)(errors="replace")
+                dialect.encoding, dialect.confidence = guess.encoding, guess.confidence
+                text = decoder.decode(data, final)
+            else:
+                dialect.confidence = 0.0
+                decoder.errors = "replace"
+                text = decoder.decode(block, final)
+        ascii_so_far = ascii_so_far and text.isascii()
+        yield text
+
+def _iter_lines(texts: Iterable[str]) -> Iterator[str]:
+    """Re-split decoded blocks into lines, keeping endings as csv expects."""
+    carry = ""
+    for text in texts:
+        buf = carry + text
+        # A trailing "\r" may be the first half of a "\r\n" split across blocks.
+        end = len(buf) - 1 if buf.endswith("\r") else len(buf)
+        cut = max(buf.rfind("\n", 0, end), buf.rfind("\r", 0, end)) + 1
+        yield from io.StringIO(buf[:cut], newline="")
+        carry = buf[cut:]
+    if carry:
+        yield from io.StringIO(carry, newline="")
+
+def _decode_best_effort(raw: bytes) -> str:
+    guess = detect_encoding(raw[:CSV_SNIFF_BYTES], final=len(raw) <= CSV_SNIFF_BYTES)
+    dialect = CsvDialect(guess.encoding, ",", guess.confidence)
+    return "".join(_decode_blocks([(raw, True)], dialect))
 
 def _normalize_newlines(text: str) -> str:
     return text.replace("\r\n", "\n").replace("\r", "\n")
@@ -69,60 +266,248 @@ def _dedupe_and_fill_headers(headers: list[str]) -> list[str]:
         cleaned.append(name)
     return cleaned
 
+def _extend_header(raw_header: list[str], base_len: int, width: int) -> list[str]:
+    if width <= len(raw_header):
+        return raw_header
+    start = len(raw_header) - base_len + 1
+    extras = [f"Extra_{i}" for i in range(start, width - base_len + 1)]
+    return raw_header + extras
+
+def _rows_to_frame(rows: list[list[str]], header: list[str], fill: Optional[str] = "") -> pd.DataFrame:
+    header_len = len(header)
+    norm_rows = []
+    for r in rows:
+        if len(r) < header_len:
+            r = r + [fill] * (header_len - len(r))
+        else:
+            r = r[:header_len]
+        norm_rows.append(r)
+
+    df = pd.DataFrame(norm_rows, columns=header)
+    for c in df.columns:
+        df[c] = df[c].astype("string")
+    return df
+
+def _iter_frames(reader: Iterator[list[str]], chunk_rows: int, fill: Optional[str] = "") -> Iterator[pd.DataFrame]:
+    """
+    Turn a csv.reader into DataFrames of at most `chunk_rows` rows.
+
+    The first row is the header. A chunk containing rows wider than anything
+    seen so far grows the header with Extra_N columns; earlier chunks are not
+    revisited, so callers stitching chunks together must fill the missing
+    trailing columns (see `_concat_frames`). Short rows are padded with
+    `fill`: "" for CSV, missing (None) for spreadsheets.
+    """
+    raw_header = next(reader, None)
+    if raw_header is None:
+        return
+    base_len = len(raw_header)
+
+    emitted = False
+    while True:
+        rows = list(islice(reader, chunk_rows))
+        if not rows and emitted:
+            return
+        width = max((len(r) for r in rows), default=0)
+        raw_header = _extend_header(raw_header, base_len, width)
+        yield _rows_to_frame(rows, _dedupe_and_fill_headers(raw_header), fill)
+        emitted = True
+        if len(rows) < chunk_rows:
+            return
+
+def _concat_frames(frames: list[pd.DataFrame], fill: Optional[str] = "") -> pd.DataFrame:
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+
+    header = list(frames[-1].columns)
+    for i, f in enumerate(frames):
+        if len(f.columns) < len(header):
+            missing = header[len(f.columns):]
+            pad = {c: pd.array([fill] * len(f), dtype="string") for c in missing}
+            frames[i] = f.assign(**pad)
+    df = pd.concat(frames, ignore_index=True, copy=False)
+    frames.clear()
+    return df
+
 def _parse_csv_with_header(text: str) -> pd.DataFrame:
     lines = text.splitlines()
     if not lines:
         return pd.DataFrame()
 
     delim = _detect_delimiter(lines)
-
     reader = csv.reader(lines, delimiter=delim)
-    rows = [list(r) for r in reader]
-    if not rows:
-        return pd.DataFrame()
+    return _concat_frames(list(_iter_frames(reader, CSV_CHUNK_ROWS)))
 
-    raw_header = rows[0]
-    data_rows = rows[1:]
+# -----------------------
+# Streaming CSV ingestion
+# -----------------------
+@dataclass
+class CsvDialect:
+    encoding: str
+    delimiter: str
+    confidence: float = 1.0
 
-    max_data_cols = max((len(r) for r in data_rows), default=0)
-    header_len = len(raw_header)
+def sniff_csv(filepath: Path, sample_bytes: int = CSV_SNIFF_BYTES) -> CsvDialect:
+    """Detect encoding and delimiter from a bounded prefix of the file."""
+    with filepath.open("rb") as fh:
+        sample = fh.read(sample_bytes)
+        final = not fh.read(1)
 
-    if max_data_cols > header_len:
-        extras = [f"Extra_{i}" for i in range(1, max_data_cols - header_len + 1)]
-        raw_header = raw_header + extras
-        header_len = len(raw_header)
+    with metrics.span("sniff.encoding"):
+        guess = detect_encoding(sample, final)
+    with metrics.span("sniff.delimiter"):
+        decoder = codecs.getincrementaldecoder(guess.encoding)(errors="replace")
+        text = _normalize_newlines(decoder.decode(sample, final=final))
+        lines = text.splitlines()
+        if not final and len(lines) > 1:
+            lines = lines[:-1]  # last line may be cut mid-record
+        delimiter = _detect_delimiter(lines)
+    return CsvDialect(encoding=guess.encoding, delimiter=delimiter, confidence=guess.confidence)
 
-    header = _dedupe_and_fill_headers(raw_header)
+def iter_csv_chunks(
+    filepath: Path,
+    chunk_rows: int = CSV_CHUNK_ROWS,
+    dialect: Optional[CsvDialect] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Parse a CSV file incrementally, yielding DataFrames of `chunk_rows` rows.
 
-    norm_rows = []
-    for r in data_rows:
-        if len(r) < header_len:
-            r = r + [""] * (header_len - len(r))
-        else:
-            r = r[:header_len]
-        norm_rows.append(r)
+    Peak memory is bounded by the chunk size, not the file size, and the
+    file is decoded once (see `_decode_blocks`; `dialect` is updated if the
+    encoding has to change mid-file). Header cleaning matches
+    `_parse_csv_with_header`; see `_iter_frames` for how late Extra_N
+    columns are surfaced.
+    """
+    dialect = dialect or sniff_csv(filepath)
+    with filepath.open("rb") as fh:
+        lines = _iter_lines(_decode_blocks(_read_blocks(fh), dialect))
+        reader = csv.reader(lines, delimiter=dialect.delimiter)
+        yield from _iter_frames(reader, chunk_rows)
 
-    df = pd.DataFrame(norm_rows, columns=header)
+def _collect(
+    frames: Iterator[pd.DataFrame],
+    progress: Optional[Progress],
+    total: Optional[int] = None,
+    fill: Optional[str] = "",
+) -> pd.DataFrame:
+    collected = []
+    done = 0
+    for frame in frames:
+        collected.append(frame)
+        done += len(frame)
+        if progress is not None:
+            progress(done, total)
+    return _concat_frames(collected, fill)
 
-    for c in df.columns:
-        df[c] = df[c].astype("string")
+# -----------------------
+# Streaming Excel ingestion
+# -----------------------
+def _excel_text(value) -> Optional[str]:
+    # Same text pandas' read_excel(dtype="string") produces: integral floats
+    # lose their ".0", blanks stay missing.
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if value != value:
+            return None
+        if value.is_integer():
+            return str(int(value))
+    return str(value)
 
-    return df
+def _excel_row(values: Iterable) -> list[Optional[str]]:
+    row = [_excel_text(v) for v in values]
+    while row and row[-1] is None:
+        row.pop()
+    return row
+
+def iter_excel_chunks(
+    filepath: Path,
+    chunk_rows: int = CSV_CHUNK_ROWS,
+    sheet: Union[str, int, None] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream an .xlsx worksheet row by row and yield DataFrames of
+    `chunk_rows` rows, so only one chunk of cells is ever materialised.
+    `sheet` is a sheet name or 0-based index (default: the first sheet).
+    Blank rows before the header and after the last data row are dropped;
+    blank rows in between are kept as all-missing rows, as read_excel
+    keeps them (so does the legacy .xls path). Headers are cleaned and
+    widened exactly like CSV headers.
+    """
+    wb = XlsxWorkbook(filepath)
+    try:
+        _, part = wb.sheet(sheet)
+        yield from _iter_frames(wb.iter_rows(part), chunk_rows, fill=None)
+    finally:
+        wb.close()
+
+def _load_xlsx(
+    filepath: Path, chunk_rows: int, sheet: Union[str, int, None], progress: Optional[Progress]
+) -> tuple[pd.DataFrame, str]:
+    try:
+        wb = XlsxWorkbook(filepath)
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ValueError(f"Not a readable .xlsx workbook: {e}") from e
+    try:
+        title, part = wb.sheet(sheet)
+        declared = wb.declared_rows(part)
+        total = declared - 1 if declared else None
+        frames = _iter_frames(wb.iter_rows(part), chunk_rows, fill=None)
+        return _collect(frames, progress, total, fill=None), title
+    finally:
+        wb.close()
+
+def _load_xls(filepath: Path, chunk_rows: int, sheet: Union[str, int, None]) -> Iterator[pd.DataFrame]:
+    # Legacy .xls has no streaming reader; parse it whole, then shape it
+    # through the same header and chunking path as everything else.
+    raw = pd.read_excel(filepath, sheet_name=sheet if sheet is not None else 0, header=None, dtype=object)
+    rows = [_excel_row(r) for r in raw.itertuples(index=False, name=None)]
+    while rows and not rows[-1]:
+        rows.pop()
+    first = next((i for i, r in enumerate(rows) if r), len(rows))
+    return _iter_frames(iter(rows[first:]), chunk_rows, fill=None)
 
 # -----------------------
 # Public API
 # -----------------------
-def load_to_df(filepath: Path) -> LoadedFrame:
+def load_to_df(
+    filepath: Path,
+    chunk_rows: int = CSV_CHUNK_ROWS,
+    sheet: Union[str, int, None] = None,
+    progress: Optional[Progress] = None,
+    typed: bool = False,
+) -> LoadedFrame:
+    """
+    Load a supported file as text columns. With `typed`, columns are then
+    narrowed to the most compact dtype that round-trips their text
+    (services.dtypes.infer_types) and the chosen kinds are reported.
+    """
     ext = filepath.suffix.lower()
     if ext not in SUPPORTED:
         raise ValueError(f"Unsupported file type: {ext}")
 
     if ext == ".csv":
-        raw = _read_bytes(filepath)
-        text = _decode_best_effort(raw)
-        text = _normalize_newlines(text)
-        df = _parse_csv_with_header(text)
-        return LoadedFrame(df=df, name=filepath.name, ext=ext)
-
-    df = pd.read_excel(filepath, dtype="string")
-    return LoadedFrame(df=df, name=filepath.name, ext=ext)
+        dialect = sniff_csv(filepath)
+        # Decoding is streamed into the CSV reader, so it is part of "parse".
+        with metrics.span("parse"):
+            df = _collect(iter_csv_chunks(filepath, chunk_rows, dialect), progress)
+        loaded = LoadedFrame(
+            df=df, name=filepath.name, ext=ext,
+            encoding=dialect.encoding, encoding_confidence=dialect.confidence, delimiter=dialect.delimiter,
+        )
+    elif ext == ".xls":
+        with metrics.span("parse"):
+            df = _collect(_load_xls(filepath, chunk_rows, sheet), progress, fill=None)
+        loaded = LoadedFrame(df=df, name=filepath.name, ext=ext)
+    else:
+        with metrics.span("parse"):
+            df, title = _load_xlsx(filepath, chunk_rows, sheet, progress)
+        loaded = LoadedFrame(df=df, name=filepath.name, ext=ext, sheet=title)
+    metrics.ROWS.inc(len(loaded.df), stage="load")
+
+    if typed:
+        with metrics.span("infer_types"):
+            loaded.df, loaded.dtypes = infer_types(loaded.df)
+    return loaded
@@ -0,0 +1,280 @@
+# services/history.py
+from __future__ import annotations
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from django.utils import timezone
+
+from .dtypes import string_view
+from .regex_engine import Evaluation
+
+_lock = Lock()
+
+
+@dataclass
+class Delta:
+    """
+    Cell-level changes of one step: per column, positions and both sides.
+    Columns the step added (extract/split) map to the column they follow;
+    undoing the step drops them.
+    """
+    columns: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]]
+    dtypes: dict[str, tuple[str, str]]
+    added: dict[str, str] = field(default_factory=dict)
+
+
+class HistoryError(Exception): ...
+
+
+def delta_from_evaluation(df_before: pd.DataFrame, df_after: pd.DataFrame, evaluation: Evaluation) -> Delta:
+    """Old values are taken from the string view, so typed columns are stored as the text the engine saw."""
+    columns = {}
+    dtypes = {}
+    for col, (positions, new_values) in evaluation.changes.items():
+        old_values = string_view(df_before[col]).iloc[positions].to_numpy(dtype=object, na_value=None)
+        columns[col] = (positions, old_values, new_values)
+        dtypes[col] = (str(df_before[col].dtype), str(df_after[col].dtype))
+    added = {}
+    for col, (_source, positions, new_values) in evaluation.added.items():
+        columns[col] = (positions, np.full(len(positions), None, dtype=object), new_values)
+        dtypes[col] = ("", str(df_after[col].dtype))
+        added[col] = df_after.columns[df_after.columns.get_loc(col) - 1]
+    return Delta(columns=columns, dtypes=dtypes, added=added)
+
+
+def _apply(df: pd.DataFrame, delta: Delta, forward: bool) -> tuple[pd.DataFrame, np.ndarray]:
+    new_df = df.copy(deep=False)
+    touched = []
+    for col, (positions, old_values, new_values) in delta.columns.items():
+        if col in delta.added:
+            if not forward:
+                del new_df[col]
+                touched.append(positions)
+                continue
+            empty = pd.Series(pd.array([None] * len(df), dtype=delta.dtypes[col][1]), index=df.index)
+            new_df.insert(new_df.columns.get_loc(delta.added[col]) + 1, col, empty)
+        values = new_values if forward else old_values
+        target_dtype = delta.dtypes[col][1 if forward else 0]
+        current = new_df[col]
+        base = current if isinstance(current.dtype, pd.StringDtype) else current.astype("string")
+        arr = base.array.copy()
+        arr[positions] = values
+        s = pd.Series(arr, index=df.index, name=col)
+        if str(s.dtype) != target_dtype:
+            try:
+                s = s.astype(target_dtype)
+            except (TypeError, ValueError):
+                pass
+        new_df[col] = s
+        touched.append(positions)
+    rows = np.unique(np.concatenate(touched)) if touched else np.empty(0, dtype=np.int64)
+    return new_df, rows
+
+
+def _text_array(values: list[np.ndarray]) -> pa.Array:
+    """Cell values as an Arrow string array; anything that is not already text is stringified, nulls stay null."""
+    values = np.concatenate(values) if values else np.empty(0, dtype=object)
+    try:
+        return pa.array(values, type=pa.string(), from_pandas=True)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        return pa.array([None if pd.isna(v) else str(v) for v in values], type=pa.string())
+
+
+class HistoryLog:
+    """
+    Undo/redo log for one dataset, stored next to it in the dataset store.
+
+    Each step is an Arrow file holding only the changed cells (column,
+    position, old, new), so undoing or redoing a step costs time in the
+    number of cells it changed, not the size of the table. `<id>.history.json`
+    records the steps still available and the cursor (the id of the last
+    applied step; 0 is the upload). When the files exceed `budget` bytes the
+    oldest steps are dropped and can no longer be undone.
+    """
+
+    def __init__(self, root: Path, dataset_id: str, budget: int):
+        self.root = Path(root)
+        self.dataset_id = dataset_id
+        self.budget = budget
+        self.index_path = self.root / f"{dataset_id}.history.json"
+
+    # -----------------------
+    # Index
+    # -----------------------
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"cursor": 0, "floor": 0, "steps": []}
+
+    def _save(self, index: dict) -> None:
+        tmp = self.index_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(index), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+    def _step_path(self, step_id: int) -> Path:
+        return self.root / f"{self.dataset_id}.step{step_id}.arrow"
+
+    def state(self) -> dict:
+        index = self._load()
+        steps = index["steps"]
+        return {
+            "cursor": index["cursor"],
+            "can_undo": index["cursor"] > index["floor"],
+            "can_redo": any(s["id"] > index["cursor"] for s in steps),
+            "floor": index["floor"],
+            "steps": steps,
+        }
+
+    # -----------------------
+    # Step files
+    # -----------------------
+    def _write_step(self, path: Path, delta: Delta) -> int:
+        cols, positions, old, new = [], [], [], []
+        for col, (pos, o, n) in delta.columns.items():
+            cols.append(np.full(len(pos), col, dtype=object))
+            positions.append(pos)
+            old.append(o)
+            new.append(n)
+        table = pa.table({
+            "column": pa.array(np.concatenate(cols) if cols else [], type=pa.string()).dictionary_encode(),
+            "position": pa.array(np.concatenate(positions) if positions else [], type=pa.int64()),
+            "old": _text_array(old),
+            "new": _text_array(new),
+        })
+        table = table.replace_schema_metadata({"dtypes": json.dumps(delta.dtypes), "added": json.dumps(delta.added)})
+        feather.write_feather(table, path, compression="uncompressed")
+        return path.stat().st_size
+
+    def _read_step(self, step_id: int) -> Delta:
+        table = feather.read_table(self._step_path(step_id), memory_map=True)
+        dtypes = json.loads(table.schema.metadata[b"dtypes"])
+        added = json.loads(table.schema.metadata.get(b"added", b"{}"))
+        frame = table.to_pandas()
+        columns = {}
+        for col, part in frame.groupby("column", observed=True, sort=False):
+            columns[str(col)] = (
+                part["position"].to_numpy(),
+                part["old"].to_numpy(dtype=object),
+                part["new"].to_numpy(dtype=object),
+            )
+        return Delta(columns=columns, dtypes={k: tuple(v) for k, v in dtypes.items()}, added=added)
+
+    # -----------------------
+    # Operations
+    # -----------------------
+    def record(self, label: str, delta: Delta) -> dict:
+        """
+        Append a step after the cursor, discarding any redo branch. The step
+        file is written before anything is discarded, so a failed write
+        leaves the log as it was.
+        """
+        with _lock:
+            index = self._load()
+            step_id = index["cursor"] + 1
+            path = self._step_path(step_id)
+            tmp = path.with_suffix(".arrow.tmp")
+            try:
+                nbytes = self._write_step(tmp, delta)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+
+            for s in [s for s in index["steps"] if s["id"] > index["cursor"]]:
+                self._step_path(s["id"]).unlink(missing_ok=True)
+            index["steps"] = [s for s in index["steps"] if s["id"] <= index["cursor"]]
+            os.replace(tmp, path)
+            index["steps"].append({
+                "id": step_id,
+                "label": label,
+                "cells": int(sum(len(p) for p, _, _ in delta.columns.values())),
+                "nbytes": nbytes,
+                "created_at": timezone.now().isoformat(),
+            })
+            index["cursor"] = step_id
+
+            while len(index["steps"]) > 1 and sum(s["nbytes"] for s in index["steps"]) > self.budget:
+                dropped = index["steps"].pop(0)
+                self._step_path(dropped["id"]).unlink(missing_ok=True)
+                index["floor"] = dropped["id"]
+            self._save(index)
+        return self.state()
+
+    def rollback(self, step_id: int) -> None:
+        """
+        Forget step `step_id` just recorded, when the dataset version it
+        describes could not be stored. A redo branch it replaced stays gone.
+        """
+        with _lock:
+            index = self._load()
+            if index["cursor"] != step_id:
+                return
+            index["steps"] = [s for s in index["steps"] if s["id"] != step_id]
+            index["cursor"] = step_id - 1
+            index["floor"] = min(index["floor"], index["cursor"])
+            self._step_path(step_id).unlink(missing_ok=True)
+            self._save(index)
+
+    def restore_cursor(self, cursor: int) -> None:
+        """
+        Put the cursor back at `cursor` after a jump whose dataset version
+        could not be stored. The steps themselves are untouched.
+        """
+        with _lock:
+            index = self._load()
+            if cursor >= index["floor"]:
+                index["cursor"] = cursor
+                self._save(index)
+
+    def jump(self, df: pd.DataFrame, target: int) -> tuple[pd.DataFrame, np.ndarray]:
+        """
+        Move to step `target` by undoing or redoing the steps in between.
+        Returns the new frame and the rows that changed along the way.
+        """
+        with _lock:
+            index = self._load()
+            available = {s["id"] for s in index["steps"]}
+            top = max(available, default=index["cursor"])
+            if target < index["floor"] or target > top:
+                raise HistoryError(f"step {target} is not available (range {index['floor']}..{top})")
+
+            touched = []
+            cursor = index["cursor"]
+            while cursor > target:
+                df, rows = _apply(df, self._read_step(cursor), forward=False)
+                touched.append(rows)
+                cursor -= 1
+            while cursor < target:
+                cursor += 1
+                df, rows = _apply(df, self._read_step(cursor), forward=True)
+                touched.append(rows)
+
+            index["cursor"] = cursor
+            self._save(index)
+        rows = np.unique(np.concatenate(touched)) if touched else np.empty(0, dtype=np.int64)
+        return df, rows
+
+    def undo(self, df: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray]:
+        state = self.state()
+        if not state["can_undo"]:
+            raise HistoryError("nothing to undo")
+        return self.jump(df, state["cursor"] - 1)
+
+    def redo(self, df: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray]:
+        state = self.state()
+        if not state["can_redo"]:
+            raise HistoryError("nothing to redo")
+        return self.jump(df, state["cursor"] + 1)
+
+    def clear(self) -> None:
+        with _lock:
+            for s in self._load()["steps"]:
+                self._step_path(s["id"]).unlink(missing_ok=True)
+            self.index_path.unlink(missing_ok=True)
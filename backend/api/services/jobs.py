@@ -0,0 +1,146 @@
+# services/jobs.py
+from __future__ import annotations
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from ..models import Job
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between progress writes; the cancel flag is checked on each.
+FLUSH_INTERVAL = 0.5
+
+
+class JobCancelled(Exception): ...
+
+
+class JobContext:
+    """
+    Handed to a job function. `progress` records how far the current stage
+    has got and is also the cancellation point: once the job's cancel flag
+    is set, the next flush raises JobCancelled inside the job.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.stage = ""
+        self.done = 0
+        self.total: Optional[int] = None
+        self._flushed_at = 0.0
+
+    def set_stage(self, stage: str, total: Optional[int] = None) -> None:
+        self.stage, self.done, self.total = stage, 0, total
+        self.flush()
+
+    def progress(self, done: int, total: Optional[int] = None) -> None:
+        self.done = int(done)
+        if total is not None:
+            self.total = int(total)
+        if time.monotonic() - self._flushed_at >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self) -> None:
+        self._flushed_at = time.monotonic()
+        updated = Job.objects.filter(job_id=self.job_id, cancel_requested=False).update(
+            stage=self.stage, done=self.done, total=self.total
+        )
+        if not updated:
+            raise JobCancelled(self.job_id)
+
+
+# Job function: (ctx, *args) -> (payload, http status), like `_run_transform`.
+JobFn = Callable[..., tuple[dict, int]]
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = Lock()
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=settings.JOB_WORKERS, thread_name_prefix="job")
+        return _pool
+
+
+def _finish(job_id: str, **fields) -> None:
+    Job.objects.filter(job_id=job_id).update(finished_at=timezone.now(), **fields)
+
+def _run(job_id: str, fn: JobFn, args: tuple) -> None:
+    try:
+        started = Job.objects.filter(job_id=job_id, status="queued", cancel_requested=False).update(
+            status="running", started_at=timezone.now()
+        )
+        if not started:
+            return
+        ctx = JobContext(job_id)
+        try:
+            payload, code = fn(ctx, *args)
+        except JobCancelled:
+            _finish(job_id, status="cancelled")
+        except Exception as e:
+            _finish(job_id, status="failed", status_code=500, error=f"{type(e).__name__}: {e}")
+        else:
+            if code < 400:
+                _finish(job_id, status="succeeded", status_code=code, result=payload, done=ctx.done)
+            else:
+                _finish(job_id, status="failed", status_code=code, result=payload, error=str(payload.get("error", "")))
+    finally:
+        if not settings.JOB_EAGER:
+            connection.close()
+
+def submit(kind: str, fn: JobFn, *args: Any, dataset_id: str = "") -> Job:
+    """
+    Queue `fn(ctx, *args)` on the local worker pool and return its Job row.
+    With JOB_EAGER the job runs inline before this returns (tests, scripts).
+    """
+    job = Job.objects.create(job_id=uuid.uuid4().hex, kind=kind, dataset_id=dataset_id)
+    if settings.JOB_EAGER:
+        _run(job.job_id, fn, args)
+        job.refresh_from_db()
+    else:
+        _executor().submit(_with_fresh_connection, job.job_id, fn, args)
+    return job
+
+def _with_fresh_connection(job_id: str, fn: JobFn, args: tuple) -> None:
+    # A pooled job outlives its request, so it gets its own trace and log line.
+    close_old_connections()
+    started = time.perf_counter()
+    with metrics.tracing() as trace:
+        _run(job_id, fn, args)
+    stages = " ".join(f"{stage}={total:.3f}s" for stage, total, _n in metrics.summarize(trace))
+    logger.info("job %s %.3fs %s", job_id, time.perf_counter() - started, stages)
+
+def cancel(job_id: str) -> Optional[Job]:
+    """Ask a job to stop. Queued jobs are cancelled at once; running ones at their next progress flush."""
+    Job.objects.filter(job_id=job_id, status="queued").update(
+        status="cancelled", cancel_requested=True, finished_at=timezone.now()
+    )
+    Job.objects.filter(job_id=job_id, status="running").update(cancel_requested=True)
+    return Job.objects.filter(job_id=job_id).first()
+
+def describe(job: Job) -> dict:
+    out = {
+        "job_id": job.job_id,
+        "kind": job.kind,
+        "status": job.status,
+        "dataset_id": job.dataset_id or None,
+        "progress": {"stage": job.stage, "done": job.done, "total": job.total},
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status in ("succeeded", "failed"):
+        out["status_code"] = job.status_code
+        out["result"] = job.result
+        out["error"] = job.error or None
+    return out
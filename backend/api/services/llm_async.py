@@ -0,0 +1,121 @@
+# services/llm_async.py
+from __future__ import annotations
+import asyncio
+import os
+import weakref
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+from asgiref.sync import sync_to_async
+from tenacity import retry
+
+from . import llm_client, metrics, plan_cache
+from .llm_client import SYSTEM, CompilePlan, LLMCallError, build_prompt, count_attempt, parse_plan
+
+# === Set Up ===
+MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "8"))
+MAX_KEEPALIVE = int(os.getenv("OLLAMA_MAX_KEEPALIVE", "8"))
+TIMEOUT_SECONDS = float(os.getenv("OLLAMA_TIMEOUT", "60"))
+
+
+@dataclass
+class _LoopState:
+    client: httpx.AsyncClient
+    limiter: asyncio.Semaphore
+    inflight: dict[str, asyncio.Future] = field(default_factory=dict)
+
+
+# httpx pools and asyncio primitives are bound to the loop that created them.
+_states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+
+def _state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    st = _states.get(loop)
+    if st is None:
+        client = httpx.AsyncClient(
+            base_url=llm_client.OLLAMA_HOST,
+            headers={"Authorization": f"Bearer {llm_client.OLLAMA_API_KEY}"},
+            limits=httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=MAX_KEEPALIVE),
+            timeout=TIMEOUT_SECONDS,
+        )
+        st = _states[loop] = _LoopState(client=client, limiter=asyncio.Semaphore(MAX_CONCURRENCY))
+    return st
+
+async def aclose() -> None:
+    """Close the connection pool of the running loop, if one was opened."""
+    st = _states.pop(asyncio.get_running_loop(), None)
+    if st is not None:
+        await st.client.aclose()
+
+async def _achat_once(prompt: str) -> str:
+    st = _state()
+    body = {
+        "model": llm_client.MODEL_NAME,
+        "messages": [
+            {"role": "system", "content": SYSTEM},
+            {"role": "user", "content": prompt}
+        ],
+        "stream": False,
+        "options": {"temperature": llm_client.TEMPERATURE}
+    }
+    async with st.limiter:
+        try:
+            res = await st.client.post("/api/chat", json=body)
+            res.raise_for_status()
+            data = res.json()
+        except (httpx.HTTPError, ValueError) as e:
+            raise LLMCallError(str(e))
+    text = (data.get("message") or {}).get("content", "")
+    if not text:
+        raise LLMCallError("empty response from model")
+    return text
+
+@retry(**llm_client.RETRY_POLICY)
+async def _acompile_regex_plan_uncached(
+    nl: str, columns: Optional[list[str]], k: int, profile: Optional[list[dict]] = None
+) -> CompilePlan:
+    with count_attempt():
+        return parse_plan(await _achat_once(build_prompt(nl, columns, k, profile)))
+
+async def _plan_and_cache(
+    key: str, nl: str, columns: Optional[list[str]], k: int, use_cache: bool, profile: Optional[list[dict]] = None
+) -> dict:
+    if use_cache:
+        cached = await sync_to_async(plan_cache.cache.get, thread_sensitive=False)(key)
+        if cached is not None:
+            return cached
+    with metrics.span("llm"):  # including retries
+        plan = (await _acompile_regex_plan_uncached(nl, columns, k, profile)).model_dump()
+    if use_cache:
+        await sync_to_async(plan_cache.cache.put, thread_sensitive=False)(key, plan, llm_client.MODEL_NAME)
+    return plan
+
+async def acompile_regex_plan(
+    nl: str,
+    columns: Optional[list[str]] = None,
+    k: int = 3,
+    use_cache: bool = True,
+    profile: Optional[list[dict]] = None,
+) -> CompilePlan:
+    """
+    Async counterpart of `llm_client.compile_regex_plan`.
+
+    Requests share one pooled HTTP client per event loop, at most
+    OLLAMA_MAX_CONCURRENCY calls are in flight toward the model host, and
+    identical concurrent prompts (same cache key) are coalesced into a
+    single model call whose result every waiter receives.
+    """
+    k = max(1, min(int(k or 1), 3))
+    use_cache = use_cache and plan_cache.cache.ttl_seconds > 0
+    key = plan_cache.make_key(nl, columns or [], llm_client.MODEL_NAME, llm_client.TEMPERATURE, k, profile)
+
+    st = _state()
+    fut = st.inflight.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(_plan_and_cache(key, nl, columns, k, use_cache, profile))
+        st.inflight[key] = fut
+        fut.add_done_callback(lambda _f: st.inflight.pop(key, None))
+    # Shielded so one caller disconnecting does not cancel the others' call.
+    plan = await asyncio.shield(fut)
+    return CompilePlan.model_validate(plan)
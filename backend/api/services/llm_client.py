@@ -2,11 +2,14 @@
 from __future__ import annotations
 import json
 import os
+from contextlib import contextmanager
 from typing import List, Optional
 from pydantic import BaseModel, Field, ValidationError
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from ollama import Client
 
+from . import metrics, plan_cache
+
 # === Set Up ===
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "https://ollama.com")
 OLLAMA_API_KEY = os.getenv(
@@ -50,10 +53,14 @@ Rules:
 - Decide intent yourself. If not a table/text-column task, set is_table_op=false, intent="none", reason, candidates=[].
 - Avoid catastrophic backtracking ((.+)+, (.*)+, nested star/plus).
 - Prefer Unicode-aware classes; Python 'regex' supports \\p{...}.
-- If user didn't specify columns, set columns=[] (caller may decide).
+- Set "columns" to the known columns the instruction applies to, judging by their names, kinds and
+  example values. Use columns=[] only when it genuinely applies to every column.
 - Replacement/format policy:
   * For replace/mask: provide a literal "replacement". It may contain backreferences like $1, $2...
   * For normalize: provide a "format" string that uses captured groups (e.g., "+61 $1 $2 $3").
+  * For extract: capture each part to pull out in its own group; every group becomes a new column
+    (named groups, e.g. (?P<domain>...), name it). No replacement/format.
+  * For split: the pattern matches the delimiter; the pieces become new columns. No replacement/format.
 - Provide 1–3 candidates that meaningfully differ.
 """
 
@@ -62,7 +69,7 @@ USER_TEMPLATE = """Natural language intent:
 
 Known column names:
 {columns}
-
+{profile}
 Constraints:
 - Return 1 to {k} candidates.
 - Ensure "replacement" is present for replace/mask, or "format" is present for normalize.
@@ -107,18 +114,26 @@ def _chat_once(prompt: str) -> str:
         raise LLMCallError("empty response from model")
     return text
 
-@retry(
-    retry=retry_if_exception_type((LLMBadJSON, ValidationError, LLMCallError)),
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=1, max=6)
-)
-def compile_regex_plan(nl: str, columns: Optional[list[str]] = None, k: int = 3) -> CompilePlan:
-    prompt = USER_TEMPLATE.format(
+def describe_profile(profile: Optional[list[dict]]) -> str:
+    """One line per column: name, kind, fill rate and a few example values."""
+    if not profile:
+        return ""
+    lines = ["", "Column profiles (name | kind | filled | examples):"]
+    for col in profile:
+        examples = ", ".join(json.dumps(v, ensure_ascii=False) for v in col["examples"])
+        lines.append(f"- {json.dumps(col['name'], ensure_ascii=False)} | {col['kind']} | {col['filled']:.0%} | {examples}")
+    return "\n".join(lines) + "\n"
+
+def build_prompt(nl: str, columns: Optional[list[str]] = None, k: int = 3, profile: Optional[list[dict]] = None) -> str:
+    return USER_TEMPLATE.format(
         nl=nl.strip(),
         columns=json.dumps(columns or [], ensure_ascii=False),
+        profile=describe_profile(profile),
         k=max(1, min(int(k or 1), 3))
     )
-    raw = _chat_once(prompt).strip()
+
+def parse_plan(raw: str) -> CompilePlan:
+    raw = raw.strip()
     try:
         obj = json.loads(raw)
     except json.JSONDecodeError:
@@ -139,3 +154,61 @@ def compile_regex_plan(nl: str, columns: Optional[list[str]] = None, k: int = 3)
             if plan.intent == "normalize" and not c.format:
                 raise LLMBadJSON("format is required for normalize")
     return plan
+
+@contextmanager
+def count_attempt():
+    """Count one model call (each retry is another) in LLM_CALLS by outcome."""
+    try:
+        yield
+    except LLMCallError:
+        metrics.LLM_CALLS.inc(outcome="error")
+        raise
+    except (LLMBadJSON, ValidationError):
+        metrics.LLM_CALLS.inc(outcome="invalid")
+        raise
+    metrics.LLM_CALLS.inc(outcome="ok")
+
+RETRY_POLICY = dict(
+    retry=retry_if_exception_type((LLMBadJSON, ValidationError, LLMCallError)),
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=1, max=6)
+)
+
+@retry(**RETRY_POLICY)
+def _compile_regex_plan_uncached(
+    nl: str, columns: Optional[list[str]] = None, k: int = 3, profile: Optional[list[dict]] = None
+) -> CompilePlan:
+    with count_attempt():
+        return parse_plan(_chat_once(build_prompt(nl, columns, k, profile)))
+
+
+def compile_regex_plan(
+    nl: str,
+    columns: Optional[list[str]] = None,
+    k: int = 3,
+    use_cache: bool = True,
+    profile: Optional[list[dict]] = None,
+) -> CompilePlan:
+    """
+    Plan `nl` against `columns`, serving repeated requests from the plan
+    cache. `profile` (see services.profile) gives the model each column's
+    kind and example values so it can name the columns to touch. The cache
+    key (see plan_cache.make_key) covers the normalized prompt, the column
+    list, each profiled column's name and kind, `k`, the model and its
+    temperature; example values are left out, so the same instruction on
+    another file with the same columns is served from the cache.
+    """
+    k = max(1, min(int(k or 1), 3))
+    if not use_cache or plan_cache.cache.ttl_seconds <= 0:
+        with metrics.span("llm"):
+            return _compile_regex_plan_uncached(nl, columns, k, profile)
+
+    key = plan_cache.make_key(nl, columns or [], MODEL_NAME, TEMPERATURE, k, profile)
+    cached = plan_cache.cache.get(key)
+    if cached is not None:
+        return CompilePlan.model_validate(cached)
+
+    with metrics.span("llm"):  # including retries
+        plan = _compile_regex_plan_uncached(nl, columns, k, profile)
+    plan_cache.cache.put(key, plan.model_dump(), model_name=MODEL_NAME)
+    return plan
@@ -0,0 +1,241 @@
+# services/metrics.py
+from __future__ import annotations
+import contextvars
+import math
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Iterable, Iterator, Optional
+
+# Seconds; Prometheus' defaults plus room for slow model calls.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+Sample = tuple[dict, float]
+
+
+def _labels(names: tuple[str, ...], values: dict) -> tuple[str, ...]:
+    return tuple(str(values.get(n, "")) for n in names)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _fmt_labels(pairs: Iterable[tuple[str, str]]) -> str:
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}" if body else ""
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, value: float = 1, **labels) -> None:
+        key = _labels(self.labels, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def get(self, **labels) -> float:
+        return self._values.get(_labels(self.labels, labels), 0)
+
+    def expose(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_fmt_labels(zip(self.labels, key))} {_fmt_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, sum, count)
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels(self.labels, labels)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(_labels(self.labels, labels))
+        return series[2] if series else 0
+
+    def expose(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for key, (counts, total, n) in items:
+            pairs = list(zip(self.labels, key))
+            for bound, c in zip(self.buckets, counts):
+                yield f"{self.name}_bucket{_fmt_labels(pairs + [('le', _fmt_value(bound))])} {c}"
+            yield f"{self.name}_bucket{_fmt_labels(pairs + [('le', '+Inf')])} {n}"
+            yield f"{self.name}_sum{_fmt_labels(pairs)} {_fmt_value(total)}"
+            yield f"{self.name}_count{_fmt_labels(pairs)} {n}"
+
+
+class Registry:
+    """
+    Process-local metrics in Prometheus text format. Each worker process
+    exposes its own numbers; Prometheus sums them per instance. Collectors
+    are called at scrape time for values owned by other components.
+    """
+
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: list[Callable[[], Iterable[tuple[str, str, str, list[Sample]]]]] = []
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn: Callable[[], Iterable[tuple[str, str, str, list[Sample]]]]):
+        """Register `fn() -> [(name, type, help, [(labels, value)])]`; usable as a decorator."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        for fn in self._collectors:
+            for name, kind, help, samples in fn():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_fmt_labels((k, str(v)) for k, v in labels.items())} {_fmt_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "rhombus_stage_seconds", "Time spent in each processing stage.", ("stage",),
+)
+REQUESTS = registry.counter(
+    "rhombus_http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status"),
+)
+REQUEST_SECONDS = registry.histogram(
+    "rhombus_http_request_seconds", "HTTP request latency by route.", ("route",),
+)
+ROWS = registry.counter(
+    "rhombus_rows_total", "Rows loaded or written, by stage.", ("stage",),
+)
+CELLS = registry.counter(
+    "rhombus_cells_evaluated_total", "Cells a regex plan was evaluated on, by stage.", ("stage",),
+)
+CELLS_CHANGED = registry.counter(
+    "rhombus_cells_changed_total", "Cells changed by applied transforms.", (),
+)
+UPLOADS = registry.counter(
+    "rhombus_uploads_total", "Uploads by parse result: parsed, or served from the parse cache.", ("result",),
+)
+LLM_CALLS = registry.counter(
+    "rhombus_llm_calls_total", "Model calls, one per attempt (retries included), by outcome.", ("outcome",),
+)
+
+
+# -----------------------
+# Per-request traces
+# -----------------------
+_trace: contextvars.ContextVar[Optional[list[tuple[str, float]]]] = contextvars.ContextVar("metrics_trace", default=None)
+
+def record(stage: str, seconds: float) -> None:
+    """Account `seconds` to `stage`: into STAGE_SECONDS and the current trace, if any."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _trace.get()
+    if trace is not None:
+        trace.append((stage, seconds))
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block as `stage` (see `record`)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+@contextmanager
+def tracing() -> Iterator[list[tuple[str, float]]]:
+    """
+    Collect the spans of the enclosed block. Threads do not inherit the
+    trace: wrap work handed to a pool with `carry_context` to include it.
+    """
+    trace: list[tuple[str, float]] = []
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+
+def carry_context(fn: Callable) -> Callable:
+    """
+    `fn`, run in a copy of the calling thread's context (and so its trace)
+    wherever it is called; each call gets its own copy, so the result can
+    be mapped over a thread pool.
+    """
+    ctx = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return ctx.copy().run(fn, *args, **kwargs)
+    return run
+
+def summarize(trace: list[tuple[str, float]]) -> list[tuple[str, float, int]]:
+    """(stage, total seconds, occurrences) in first-seen order."""
+    totals: dict[str, list] = {}
+    for stage, elapsed in trace:
+        entry = totals.setdefault(stage, [0.0, 0])
+        entry[0] += elapsed
+        entry[1] += 1
+    return [(stage, total, n) for stage, (total, n) in totals.items()]
+
+def server_timing(trace: list[tuple[str, float]]) -> str:
+    """A Server-Timing header value, so browser dev tools show the stages."""
+    parts = []
+    for stage, total, n in summarize(trace):
+        part = f"{stage.replace('.', '-')};dur={total * 1000:.1f}"
+        parts.append(part + (f';desc="x{n}"' if n > 1 else ""))
+    return ", ".join(parts)
+
+
+# -----------------------
+# Collected at scrape time
+# -----------------------
+@registry.collector
+def _plan_cache_metrics():
+    from . import plan_cache
+    counters = dict(plan_cache.cache.counters)
+    yield (
+        "rhombus_plan_cache_events_total", "counter", "Plan cache lookups and evictions.",
+        [({"event": k}, v) for k, v in sorted(counters.items())],
+    )
+
+@registry.collector
+def _dataset_store_metrics():
+    from . import dataset_store
+    stats = dataset_store.store.stats()
+    yield ("rhombus_dataset_store_resident_bytes", "gauge", "Bytes of datasets held in memory.",
+           [({}, stats["resident_bytes"])])
+    yield ("rhombus_dataset_store_resident_datasets", "gauge", "Datasets held in memory.",
+           [({}, stats["resident_datasets"])])
@@ -0,0 +1,99 @@
+# services/parse_cache.py
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Optional, Union
+
+# Bump when loading changes what a given file parses to.
+PARSE_CACHE_VERSION = 1
+
+
+@dataclass
+class ParsedUpload:
+    # Arrow file of the parsed frame (the first version of a dataset).
+    path: Path
+    # What the upload response reports besides the frame: encoding,
+    # encoding_confidence, delimiter, sheet, dtypes and the column profile.
+    details: dict
+
+
+def link_or_copy(source: Path, target: Path) -> None:
+    """Atomically make `target` a hard link to `source`, or a copy where links are unsupported."""
+    tmp = target.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copyfile(source, tmp)
+    os.replace(tmp, target)
+
+
+class ParseCache:
+    """
+    Parsed uploads keyed by content hash and load options, so a re-upload
+    of the same bytes skips decoding and parsing entirely.
+
+    Entries are `<key>.arrow` plus `<key>.json` under `root`. The Arrow
+    file is a hard link to the dataset file written for the first upload;
+    datasets only ever replace their files (write-then-rename), so the
+    cached bytes never change underneath. Recency is the metadata file's
+    mtime, and the least recently used entries are dropped once the Arrow
+    files exceed `budget` bytes.
+    """
+
+    def __init__(self, root: Path, budget: int):
+        self.root = Path(root)
+        self.budget = budget
+        self._lock = Lock()
+
+    @staticmethod
+    def key(sha256: str, sheet: Union[str, int, None], typed: bool) -> str:
+        raw = json.dumps([PARSE_CACHE_VERSION, sha256, sheet, bool(typed)], separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.root / f"{key}.arrow", self.root / f"{key}.json"
+
+    def get(self, key: str) -> Optional[ParsedUpload]:
+        data, meta = self._paths(key)
+        try:
+            details = json.loads(meta.read_text(encoding="utf-8"))
+            if not data.is_file():
+                return None
+            os.utime(meta)
+        except (OSError, ValueError):
+            return None
+        return ParsedUpload(data, details)
+
+    def put(self, key: str, source: Path, details: dict) -> None:
+        """Cache the Arrow file `source` (linked, not copied) with `details`."""
+        data, meta = self._paths(key)
+        self.root.mkdir(parents=True, exist_ok=True)
+        link_or_copy(source, data)
+        tmp = meta.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(details, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, meta)
+        self.prune()
+
+    def prune(self) -> None:
+        with self._lock:
+            entries = []
+            for meta in self.root.glob("*.json"):
+                data = meta.with_suffix(".arrow")
+                try:
+                    entries.append((meta.stat().st_mtime_ns, data.stat().st_size, data, meta))
+                except OSError:
+                    continue
+            total = sum(e[1] for e in entries)
+            # The newest entry stays, even if it alone exceeds the budget.
+            for _mtime, size, data, meta in sorted(entries, key=lambda e: e[0])[:-1]:
+                if total <= self.budget:
+                    break
+                meta.unlink(missing_ok=True)
+                data.unlink(missing_ok=True)
+                total -= size
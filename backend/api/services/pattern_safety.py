@@ -0,0 +1,352 @@
+# services/pattern_safety.py
+from __future__ import annotations
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+import regex as re
+
+from .regex_engine import CompiledPlan
+
+try:
+    from re import _constants as sre_c, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants as sre_c
+    import sre_parse
+
+# A repeat allowing more than this many iterations counts as unbounded
+# when it wraps another repeat.
+_WIDE_REPEAT = 10
+
+# Characters used to decide whether two pieces of a pattern can match the
+# same input. Printable ASCII plus a few representative non-ASCII cases.
+_UNIVERSE = frozenset([chr(i) for i in range(32, 127)] + ["\t", "\n", " ", "é", "中"])
+
+_CATEGORIES = {
+    sre_c.CATEGORY_DIGIT: str.isdigit,
+    sre_c.CATEGORY_NOT_DIGIT: lambda c: not c.isdigit(),
+    sre_c.CATEGORY_SPACE: str.isspace,
+    sre_c.CATEGORY_NOT_SPACE: lambda c: not c.isspace(),
+    sre_c.CATEGORY_WORD: lambda c: c.isalnum() or c == "_",
+    sre_c.CATEGORY_NOT_WORD: lambda c: not (c.isalnum() or c == "_"),
+}
+
+_REPEATS = {sre_c.MAX_REPEAT, sre_c.MIN_REPEAT}
+# Possessive repeats and atomic groups never backtrack into themselves.
+_POSSESSIVE = getattr(sre_c, "POSSESSIVE_REPEAT", None)
+_ATOMIC = getattr(sre_c, "ATOMIC_GROUP", None)
+_NO_BACKTRACK = {_POSSESSIVE, _ATOMIC} - {None}
+
+RISK_LEVELS = ("safe", "polynomial", "exponential")
+
+
+@dataclass
+class PatternRisk:
+    """
+    Static verdict on a pattern's worst-case backtracking. `level` is one of
+    RISK_LEVELS, or "unknown" when the pattern uses syntax only the `regex`
+    module understands.
+    """
+    level: str
+    reasons: list[str] = field(default_factory=list)
+    # Inputs likely to trigger the flagged backtracking, for the benchmark.
+    probes: list[str] = field(default_factory=list)
+
+    def add(self, level: str, reason: str) -> None:
+        if RISK_LEVELS.index(level) > RISK_LEVELS.index(self.level):
+            self.level = level
+        self.reasons.append(reason)
+
+
+# -----------------------
+# Character sets of pattern pieces
+# -----------------------
+def _class_chars(items, ignorecase: bool) -> frozenset:
+    negate = False
+    tests = []
+    for op, av in items:
+        if op is sre_c.NEGATE:
+            negate = True
+        elif op is sre_c.LITERAL:
+            tests.append(lambda c, v=chr(av): c == v)
+        elif op is sre_c.RANGE:
+            tests.append(lambda c, lo=av[0], hi=av[1]: lo <= ord(c) <= hi)
+        elif op is sre_c.CATEGORY:
+            tests.append(_CATEGORIES.get(av, lambda c: True))
+        else:
+            tests.append(lambda c: True)
+    hit = frozenset(
+        c for c in _UNIVERSE
+        if any(t(c) or (ignorecase and (t(c.lower()) or t(c.upper()))) for t in tests)
+    )
+    return _UNIVERSE - hit if negate else hit
+
+def _item_chars(op, av, ignorecase: bool) -> Optional[frozenset]:
+    """Characters a single-character item can consume; None if not a single-character item."""
+    if op is sre_c.LITERAL:
+        c = chr(av)
+        return frozenset({c, c.lower(), c.upper()} if ignorecase else {c})
+    if op is sre_c.NOT_LITERAL:
+        return _UNIVERSE - {chr(av)}
+    if op is sre_c.ANY:
+        return _UNIVERSE - {"\n"}
+    if op is sre_c.IN:
+        return _class_chars(av, ignorecase)
+    return None
+
+def _body(op, av):
+    """Sub-sequences an element contains, for recursion."""
+    if op is sre_c.SUBPATTERN:
+        return [av[-1]]
+    if op is sre_c.BRANCH:
+        return list(av[1])
+    if op is _ATOMIC:
+        return [av]
+    if op in _REPEATS or op is _POSSESSIVE:
+        return [av[-1]]
+    if op in (sre_c.ASSERT, sre_c.ASSERT_NOT):
+        return [av[1]]
+    return []
+
+def _chars(seq, ignorecase: bool) -> frozenset:
+    """Every character `seq` could consume anywhere."""
+    out = frozenset()
+    for op, av in seq:
+        own = _item_chars(op, av, ignorecase)
+        if own is not None:
+            out |= own
+        elif op is sre_c.GROUPREF:
+            out |= _UNIVERSE
+        elif op not in (sre_c.ASSERT, sre_c.ASSERT_NOT):
+            for sub in _body(op, av):
+                out |= _chars(sub, ignorecase)
+    return out
+
+def _nullable(seq) -> bool:
+    for op, av in seq:
+        if op in _REPEATS or op is _POSSESSIVE:
+            if av[0] > 0 and not _nullable(av[-1]):
+                return False
+        elif op is sre_c.SUBPATTERN or op is _ATOMIC:
+            if not _nullable(_body(op, av)[0]):
+                return False
+        elif op is sre_c.BRANCH:
+            if not any(_nullable(b) for b in av[1]):
+                return False
+        elif op not in (sre_c.AT, sre_c.ASSERT, sre_c.ASSERT_NOT, sre_c.GROUPREF):
+            return False
+    return True
+
+def _first(seq, ignorecase: bool) -> frozenset:
+    out = frozenset()
+    for op, av in seq:
+        own = _item_chars(op, av, ignorecase)
+        if own is not None:
+            return out | own
+        if op in (sre_c.AT, sre_c.ASSERT, sre_c.ASSERT_NOT):
+            continue
+        for sub in _body(op, av):
+            out |= _first(sub, ignorecase)
+        if not _nullable([(op, av)]):
+            return out
+    return out
+
+
+# -----------------------
+# Analysis
+# -----------------------
+def _is_wide(op, av) -> bool:
+    return op in _REPEATS and (av[1] == sre_c.MAXREPEAT or av[1] > _WIDE_REPEAT)
+
+def _inner_repeats(seq) -> Iterable[tuple]:
+    """Backtracking repeats (max > 1) anywhere inside `seq`."""
+    for el in seq:
+        op, av = el
+        if op in _NO_BACKTRACK:
+            continue
+        if op in _REPEATS and av[1] > 1:
+            yield el
+        for sub in _body(op, av):
+            yield from _inner_repeats(sub)
+
+def _unwrap(seq):
+    """Look through groups that make up a whole sequence: ((a+,)) -> a+,"""
+    while len(seq) == 1 and seq[0][0] is sre_c.SUBPATTERN:
+        seq = seq[0][1][-1]
+    return seq
+
+def _contains(el, target) -> bool:
+    if el is target:
+        return True
+    return any(_contains(x, target) for sub in _body(*el) for x in sub)
+
+def _check_repeat(av, ignorecase: bool, risk: PatternRisk, text: str) -> None:
+    body = _unwrap(av[-1])
+
+    # (X+)+ style: the outer loop can split one run between iterations in
+    # exponentially many ways unless every iteration must also consume a
+    # character the inner loop cannot.
+    for inner in _inner_repeats(body):
+        mandatory = frozenset()
+        for el in body:
+            if not _contains(el, inner) and not _nullable([el]):
+                mandatory |= _chars([el], ignorecase)
+        inner_chars = _chars([inner], ignorecase)
+        if not mandatory or mandatory & inner_chars:
+            risk.add("exponential", f"nested quantifier in {text}")
+            risk.probes.append(_probe(mandatory & inner_chars or inner_chars))
+            break
+
+    # (aa?)+ style, which is also what (a|aa)+ becomes once the parser has
+    # factored out the common prefix: an optional part that can take the
+    # same characters as the mandatory part, so a run splits many ways.
+    mandatory = _chars([el for el in body if not _nullable([el])], ignorecase)
+    for el in body:
+        if _nullable([el]) and next(_inner_repeats([el]), None) is None:
+            overlap = _chars([el], ignorecase) & mandatory
+            if overlap:
+                risk.add("exponential", f"optional part overlaps the rest of a quantified group in {text}")
+                risk.probes.append(_probe(overlap))
+                break
+
+    # (a|ab)* style: overlapping alternatives under a loop.
+    for branches in _branches(body):
+        firsts = [_first(b, ignorecase) for b in branches]
+        overlap = next(
+            (firsts[i] & firsts[j] for i in range(len(firsts)) for j in range(i + 1, len(firsts)) if firsts[i] & firsts[j]),
+            None,
+        )
+        if overlap:
+            risk.add("exponential", f"overlapping alternatives under a quantifier in {text}")
+            risk.probes.append(_probe(overlap))
+            break
+
+def _probe(chars: frozenset) -> str:
+    # A long run the loop can split many ways, then a character that makes
+    # the overall match fail and forces every split to be tried.
+    ch = min((c for c in chars if c.isalnum()), default=min(chars, default="a"))
+    return ch * 32 + "\x00"
+
+def _branches(seq) -> Iterable[list]:
+    """Alternations directly in `seq`, looking through plain groups."""
+    for op, av in seq:
+        if op is sre_c.BRANCH:
+            yield av[1]
+        elif op is sre_c.SUBPATTERN:
+            yield from _branches(av[-1])
+
+def _walk(seq, ignorecase: bool, risk: PatternRisk, text: str) -> None:
+    previous = None  # last wide repeat in this sequence with nothing mandatory after it
+    for op, av in seq:
+        if op in _NO_BACKTRACK:
+            previous = None
+            continue
+        if _is_wide(op, av):
+            _check_repeat(av, ignorecase, risk, text)
+            chars = _chars(av[-1], ignorecase)
+            if previous is not None and previous & chars:
+                risk.add("polynomial", f"adjacent overlapping quantifiers in {text}")
+            previous = chars
+        elif not _nullable([(op, av)]):
+            chars = _chars([(op, av)], ignorecase)
+            if previous is not None and not (previous & chars):
+                previous = None
+        for sub in _body(op, av):
+            _walk(sub, ignorecase, risk, text)
+
+def analyze_pattern(pattern: str, flags: int = 0) -> PatternRisk:
+    """
+    Flag patterns whose backtracking can blow up, without running them:
+    nested quantifiers whose iterations are not separated by a distinct
+    character ("exponential"), quantified alternatives that can match the
+    same text ("exponential"), and back-to-back unbounded quantifiers over
+    overlapping characters ("polynomial"). Possessive quantifiers and
+    atomic groups are treated as safe.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags & ~re.VERSION1 & ~re.VERSION0)
+    except Exception:
+        return PatternRisk("unknown", ["pattern uses syntax the analyzer does not model"])
+    ignorecase = bool(parsed.state.flags & sre_c.SRE_FLAG_IGNORECASE)
+    risk = PatternRisk("safe")
+    _walk(list(parsed), ignorecase, risk, pattern)
+    return risk
+
+
+# -----------------------
+# Micro-benchmark
+# -----------------------
+@dataclass
+class Benchmark:
+    cells: int
+    per_cell_us: float
+    timed_out: bool
+
+def benchmark(regex_obj: re.Pattern, template: str, cells: list[str], cell_timeout: float) -> Benchmark:
+    """
+    Time `regex_obj.sub(template, cell)` on sample cells, each bounded by
+    `cell_timeout` seconds. Stops at the first timeout.
+    """
+    start = time.perf_counter()
+    for n, cell in enumerate(cells, start=1):
+        try:
+            regex_obj.sub(template, cell, timeout=cell_timeout)
+        except TimeoutError:
+            return Benchmark(cells=n, per_cell_us=cell_timeout * 1e6, timed_out=True)
+    elapsed = time.perf_counter() - start
+    return Benchmark(cells=len(cells), per_cell_us=elapsed * 1e6 / max(1, len(cells)), timed_out=False)
+
+
+@dataclass
+class Safety:
+    """
+    Outcome of `assess`: "ok", "slow" (kept but ranked down and run with
+    time limits) or "reject".
+    """
+    verdict: str
+    risk: PatternRisk
+    bench: Optional[Benchmark] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "verdict": self.verdict,
+            "risk": self.risk.level,
+            "reasons": self.risk.reasons,
+            "per_cell_us": round(self.bench.per_cell_us, 2) if self.bench else None,
+        }
+
+def assess(
+    plan: CompiledPlan,
+    cells: list[str],
+    cell_timeout: float,
+    column_timeout: float,
+    budget_us: float,
+) -> Safety:
+    """
+    Decide whether a candidate is safe to run over the whole table.
+
+    The static analysis runs first; every runnable plan is then timed on
+    `cells` plus the analyzer's probe inputs, each with a per-cell limit
+    (extract/split plans as a substitution with "", which scans for every
+    match as a split does).
+    A timeout rejects the plan; a per-cell cost above `budget_us` on the
+    real cells marks it "slow". Anything not proven safe has its Python
+    tier guarded by `cell_timeout` / `column_timeout` (set on `plan`).
+    The `regex` engine survives many statically risky shapes, so the
+    static verdict alone never rejects.
+    """
+    risk = analyze_pattern(plan.pattern, plan.regex_obj.flags)
+    if plan.is_noop:
+        return Safety("ok", risk)
+
+    template = plan.template or ""
+    probe = benchmark(plan.regex_obj, template, risk.probes, cell_timeout)
+    bench = benchmark(plan.regex_obj, template, cells, cell_timeout) if not probe.timed_out else probe
+    if bench.timed_out:
+        risk.reasons.append(f"timed out on a sample cell (> {cell_timeout * 1000:.0f} ms)")
+        return Safety("reject", risk, bench)
+
+    slow = bench.per_cell_us > budget_us
+    if slow or risk.level != "safe":
+        plan.cell_timeout, plan.column_timeout = cell_timeout, column_timeout
+    return Safety("slow" if slow else "ok", risk, bench)
@@ -0,0 +1,133 @@
+# services/plan_cache.py
+from __future__ import annotations
+import hashlib
+import json
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import timedelta
+from threading import Lock
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from ..models import PlanCacheEntry
+
+
+def normalize_prompt(nl: str) -> str:
+    # Case is kept on purpose: prompts often quote literals ("replace 'N/A'").
+    return " ".join(unicodedata.normalize("NFKC", nl).split())
+
+def make_key(
+    nl: str, columns: list[str], model: str, temperature: float, k: int, profile: Optional[list[dict]] = None
+) -> str:
+    """
+    Only each profiled column's name and kind go into the key: examples,
+    fill rate and distinct counts change with every file, and the same
+    instruction on next week's export of the same table should still hit.
+    """
+    parts = [normalize_prompt(nl), list(columns), model, float(temperature), int(k)]
+    if profile:
+        parts.append([[col["name"], col["kind"]] for col in profile])
+    raw = json.dumps(parts, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """
+    Two-tier cache of validated planner output.
+
+    The in-process tier is an LRU of plain dicts; the shared tier lives in
+    the default database (PlanCacheEntry) so every worker process benefits.
+    Both tiers honour the same TTL. Database errors only disable the shared
+    tier for that call; planning never fails because of the cache.
+    """
+
+    def __init__(self, memory_entries: int, disk_entries: int, ttl_seconds: int):
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def _remember(self, key: str, plan: dict, expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, plan)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return hit[1]
+                del self._memory[key]
+
+        try:
+            entry = PlanCacheEntry.objects.filter(key=key).first()
+            if entry is not None:
+                expires_at = entry.created_at.timestamp() + self.ttl_seconds
+                if expires_at <= now:
+                    entry.delete()
+                else:
+                    PlanCacheEntry.objects.filter(pk=entry.pk).update(
+                        hits=entry.hits + 1, last_used_at=timezone.now()
+                    )
+                    self._remember(key, entry.plan, expires_at)
+                    self._count("disk_hits")
+                    return entry.plan
+        except DatabaseError:
+            pass
+
+        self._count("misses")
+        return None
+
+    def put(self, key: str, plan: dict, model_name: str = "") -> None:
+        self._remember(key, plan, time.time() + self.ttl_seconds)
+        try:
+            PlanCacheEntry.objects.update_or_create(
+                key=key,
+                defaults={"plan": plan, "model_name": model_name, "hits": 0, "created_at": timezone.now()},
+            )
+            self._evict_disk()
+        except DatabaseError:
+            pass
+
+    def _evict_disk(self) -> None:
+        cutoff = timezone.now() - timedelta(seconds=self.ttl_seconds)
+        expired, _ = PlanCacheEntry.objects.filter(created_at__lte=cutoff).delete()
+        overflow = PlanCacheEntry.objects.count() - self.disk_entries
+        if overflow > 0:
+            stale = PlanCacheEntry.objects.order_by("last_used_at").values_list("pk", flat=True)[:overflow]
+            PlanCacheEntry.objects.filter(pk__in=list(stale)).delete()
+        self._count("evictions", expired + max(0, overflow))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            for k in self.counters:
+                self.counters[k] = 0
+        try:
+            PlanCacheEntry.objects.all().delete()
+        except DatabaseError:
+            pass
+
+
+cache = PlanCache(
+    memory_entries=settings.PLAN_CACHE_MEMORY_ENTRIES,
+    disk_entries=settings.PLAN_CACHE_DISK_ENTRIES,
+    ttl_seconds=settings.PLAN_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,39 @@
+# services/profile.py
+from __future__ import annotations
+
+import pandas as pd
+
+from .dtypes import dtype_kind, spread, string_view
+
+# Rows looked at per column; the profile is a hint for the planner, not a statistic.
+PROFILE_SAMPLE_ROWS = 1_000
+PROFILE_EXAMPLES = 3
+PROFILE_EXAMPLE_CHARS = 40
+
+
+def profile_column(s: pd.Series) -> dict:
+    """
+    Cheap summary of one column from a spread-out row sample: its kind,
+    the share of non-empty cells, the distinct count in the sample and a
+    few example values (truncated).
+    """
+    sample = string_view(spread(s, PROFILE_SAMPLE_ROWS))
+    filled = sample[sample.notna() & (sample != "")]
+    examples = filled.drop_duplicates().head(PROFILE_EXAMPLES)
+    return {
+        "name": str(s.name),
+        "kind": dtype_kind(s),
+        "filled": round(len(filled) / len(sample), 2) if len(sample) else 0.0,
+        "sample_distinct": int(filled.nunique()),
+        "examples": [v[:PROFILE_EXAMPLE_CHARS] for v in examples.tolist()],
+    }
+
+
+def profile_frame(df: pd.DataFrame) -> list[dict]:
+    """`profile_column` for every column, in column order."""
+    return [profile_column(df.iloc[:, i].rename(col)) for i, col in enumerate(df.columns)]
+
+
+def matches_columns(profile: list[dict] | None, df: pd.DataFrame) -> bool:
+    """True if `profile` describes exactly the columns of `df`."""
+    return profile is not None and [p["name"] for p in profile] == [str(c) for c in df.columns]
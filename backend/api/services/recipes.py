@@ -0,0 +1,162 @@
+# services/recipes.py
+from __future__ import annotations
+import csv
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterator, Optional, Union
+
+import pandas as pd
+from django.conf import settings
+
+from .file_io import CSV_CHUNK_ROWS, SUPPORTED, _load_xls, iter_csv_chunks, iter_excel_chunks, sniff_csv
+from .pattern_safety import assess
+from .regex_engine import SUB_INTENTS, CompiledPlan, compile_pattern, compile_plan, evaluate_pipeline, materialize
+
+STEP_KEYS = ("prompt", "intent", "pattern", "flags", "replacement", "format", "columns")
+
+
+class RecipeError(ValueError): ...
+
+
+def normalize_steps(raw) -> list[dict]:
+    """
+    Validate recipe steps and return them in canonical form. Every step is
+    an already-compiled plan; instructions that still need the LLM are not
+    allowed here. A recipe replays as one pipeline, so it is held to
+    PIPELINE_MAX_STEPS as well. Raises RecipeError.
+    """
+    if not isinstance(raw, list) or not raw:
+        raise RecipeError("steps must be a non-empty list")
+    if len(raw) > settings.PIPELINE_MAX_STEPS:
+        raise RecipeError(f"at most {settings.PIPELINE_MAX_STEPS} steps are allowed")
+    steps = []
+    for i, item in enumerate(raw, start=1):
+        if not isinstance(item, dict) or not isinstance(item.get("pattern"), str) or not item["pattern"]:
+            raise RecipeError(f"step {i}: a compiled step with a pattern is required")
+        step = {k: item.get(k) for k in STEP_KEYS}
+        step["intent"] = step["intent"] or "replace"
+        step["flags"] = list(step["flags"] or [])
+        step["columns"] = list(step["columns"] or [])
+        step["prompt"] = step["prompt"] or step["pattern"]
+        if step["intent"] not in SUB_INTENTS:
+            raise RecipeError(f"step {i}: intent must be one of {', '.join(SUB_INTENTS)}")
+        if step["intent"] == "normalize" and not step["format"]:
+            raise RecipeError(f"step {i}: format is required for normalize")
+        if step["intent"] != "normalize" and not step["replacement"]:
+            raise RecipeError(f"step {i}: replacement is required for {step['intent']}")
+        if not all(isinstance(c, str) for c in step["columns"]):
+            raise RecipeError(f"step {i}: columns must be a list of names")
+        steps.append(step)
+    return steps
+
+
+def compile_recipe(
+    steps: list[dict], cell_timeout: float, column_timeout: float, budget_us: float
+) -> list[tuple[CompiledPlan, list[str]]]:
+    """
+    Compile canonical steps into (plan, columns) pairs for evaluate_pipeline.
+    Each plan goes through the pattern-safety check on its probe inputs, so
+    risky patterns run guarded and pathological ones raise RecipeError.
+    """
+    compiled = []
+    for i, step in enumerate(steps, start=1):
+        try:
+            pat_obj = compile_pattern(step["pattern"], step["flags"])
+        except Exception as e:
+            raise RecipeError(f"step {i}: {e}") from e
+        cand = SimpleNamespace(replacement=step["replacement"], format=step["format"], flags=step["flags"])
+        plan = compile_plan(pat_obj, step["intent"], cand)
+        safety = assess(plan, [], cell_timeout, column_timeout, budget_us)
+        if safety.verdict == "reject":
+            raise RecipeError(f"step {i}: pattern rejected: {'; '.join(safety.risk.reasons)}")
+        compiled.append((plan, step["columns"]))
+    return compiled
+
+
+# -----------------------
+# Batch application
+# -----------------------
+@dataclass
+class FileResult:
+    source: str
+    output: str
+    rows: int = 0
+    updated_rows: int = 0
+    updated_cells: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def _iter_chunks(path: Path, chunk_rows: int, sheet: Union[str, int, None]) -> tuple[Iterator[pd.DataFrame], str]:
+    """Input chunks and the delimiter to write them back with."""
+    ext = path.suffix.lower()
+    if ext == ".csv":
+        dialect = sniff_csv(path)
+        return iter_csv_chunks(path, chunk_rows, dialect), dialect.delimiter
+    if ext == ".xls":
+        return _load_xls(path, chunk_rows, sheet), ","
+    return iter_excel_chunks(path, chunk_rows, sheet), ","
+
+
+def apply_recipe_file(
+    source: Path,
+    output: Path,
+    steps: list[dict],
+    limits: tuple[float, float, float],
+    chunk_rows: int = CSV_CHUNK_ROWS,
+    sheet: Union[str, int, None] = None,
+) -> FileResult:
+    """
+    Stream `source` through the recipe into a UTF-8 CSV at `output`.
+
+    The input is read chunk by chunk (see file_io) and each chunk runs the
+    whole recipe in one fused pass, so memory is bounded by `chunk_rows`
+    whatever the file size. A chunk that introduced Extra_N columns is
+    written with its wider rows, as in the source. The output is written
+    to a temporary name and renamed when complete. Module-level and
+    picklable so the management command can run it in worker processes.
+    """
+    result = FileResult(source=str(source), output=str(output))
+    started = time.perf_counter()
+    tmp = output.with_name(f".{output.name}.part")
+    try:
+        plans = compile_recipe(steps, *limits)
+        chunks, delimiter = _iter_chunks(source, chunk_rows, sheet)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with tmp.open("w", encoding="utf-8", newline="") as fh:
+            header = True
+            for chunk in chunks:
+                evaluation = evaluate_pipeline(chunk, plans)
+                out = materialize(chunk, evaluation)
+                out.to_csv(fh, sep=delimiter, index=False, header=header, quoting=csv.QUOTE_MINIMAL)
+                header = False
+                result.rows += len(out)
+                result.updated_rows += evaluation.stats["updated_rows"]
+                result.updated_cells += evaluation.stats["updated_cells"]
+        tmp.replace(output)
+    except Exception as e:
+        tmp.unlink(missing_ok=True)
+        result.error = f"{type(e).__name__}: {e}"
+    result.seconds = round(time.perf_counter() - started, 3)
+    return result
+
+
+def collect_inputs(paths: list[Path], recursive: bool = True) -> list[tuple[Path, Path]]:
+    """
+    Expand files and directories into (file, path relative to its root)
+    pairs for every supported spreadsheet, in a stable order.
+    """
+    found = []
+    for root in paths:
+        if root.is_file():
+            found.append((root, Path(root.name)))
+            continue
+        if not root.is_dir():
+            raise RecipeError(f"no such file or directory: {root}")
+        pattern = "**/*" if recursive else "*"
+        for p in sorted(root.glob(pattern)):
+            if p.is_file() and p.suffix.lower() in SUPPORTED and not p.name.startswith("."):
+                found.append((p, p.relative_to(root)))
+    return found
@@ -0,0 +1,965 @@
+# services/regex_engine.py
+from __future__ import annotations
+import re as std_re
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from threading import Lock
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import regex as re
+
+from . import metrics
+from .dtypes import spread, string_view
+
+try:
+    from re import _constants as sre_c, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants as sre_c
+    import sre_parse
+
+FLAG_MAP = {
+    "IGNORECASE": re.IGNORECASE,
+    "MULTILINE": re.MULTILINE,
+    "DOTALL": re.DOTALL,
+    "UNICODE": re.UNICODE,
+}
+
+# RE2 inline flags for the Arrow kernels; UNICODE is RE2's default.
+_ARROW_INLINE = {
+    "IGNORECASE": "i",
+    "MULTILINE": "m",
+    "DOTALL": "s",
+}
+
+SUB_INTENTS = ("replace", "mask", "normalize")
+
+# Intents that add columns next to their source instead of rewriting it:
+# capture groups to columns (extract) and the pieces between matches (split).
+COLUMN_INTENTS = ("extract", "split")
+
+# Widest output of one extract/split per source column. A split stops after
+# MAX_OUTPUT_COLUMNS - 1 cuts, so its last column holds the unsplit rest.
+MAX_OUTPUT_COLUMNS = 16
+
+# Dtype of the columns extract/split add (what the dataset store reads back).
+OUTPUT_DTYPE = pd.StringDtype("pyarrow")
+
+# Below this many rows per shard, thread hand-off costs more than it saves.
+PARALLEL_MIN_ROWS = 100_000
+
+# Compiled patterns (and their stdlib / RE2 variants) kept per process.
+PATTERN_CACHE_SIZE = 512
+
+# Text columns are evaluated once per distinct value (and fanned out via
+# factorize codes) when a spread-out sample of DICTIONARY_SAMPLE_ROWS has
+# at most DICTIONARY_MAX_RATIO distinct values per row.
+DICTIONARY_MIN_ROWS = 1_000
+DICTIONARY_SAMPLE_ROWS = 16_384
+DICTIONARY_MAX_RATIO = 0.5
+
+# Python and RE2 disagree on \s for \x0b and \x1c-\x1f even on ASCII text.
+_RE2_SPACE_GAP = "[\x0b\x1c-\x1f]"
+# Where stdlib `re` reads a class shorthand differently from `regex`: `re`
+# counts \x1c-\x1f as \s, and its \w and \d (hence \b) follow str methods
+# rather than Unicode properties, which only diverge outside ASCII.
+_STD_GAPS = {
+    "CATEGORY_SPACE": "[\x1c-\x1f]",
+    "CATEGORY_NOT_SPACE": "[\x1c-\x1f]",
+    "CATEGORY_DIGIT": "[^\x00-\x7f]",
+    "CATEGORY_NOT_DIGIT": "[^\x00-\x7f]",
+    "CATEGORY_WORD": "[^\x00-\x7f]",
+    "CATEGORY_NOT_WORD": "[^\x00-\x7f]",
+    "AT_BOUNDARY": "[^\x00-\x7f]",
+    "AT_NON_BOUNDARY": "[^\x00-\x7f]",
+}
+
+
+def flags_from_names(flags_list: list[str] | None) -> int:
+    flags = 0
+    for k in flags_list or []:
+        flags |= FLAG_MAP.get(k.upper(), 0)
+    return flags
+
+def to_py_backrefs(template: str) -> str:
+    return re.sub(r"\$(\d+)", r"\\g<\1>", template)
+
+def _to_arrow_template(template: str) -> Optional[str]:
+    # RE2 rewrites only understand \0-\9; anything else in the template
+    # (escapes, $10) keeps the Python path.
+    if "\\" in template or re.search(r"\$\d\d", template):
+        return None
+    return re.sub(r"\$(\d)", r"\\\1", template)
+
+def _flag_key(flags_list: list[str] | None) -> tuple[str, ...]:
+    return tuple(sorted({k.upper() for k in flags_list or []}))
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _compile_cached(pattern: str, flag_key: tuple[str, ...]) -> re.Pattern:
+    return re.compile(pattern, flags_from_names(list(flag_key)))
+
+def compile_pattern(pattern: str, flags_list: list[str] | None = None) -> re.Pattern:
+    """`regex.compile` behind an LRU keyed on (pattern, flags). Raises re.error."""
+    return _compile_cached(pattern, _flag_key(flags_list))
+
+def _std_parse(pattern: str, flags: int):
+    """
+    The stdlib parse of `pattern`, or None where `re` cannot run it or would
+    read it differently from `regex`. `re` only warns about what looks like
+    a nested set or set operation ("[[:alpha:]]", "[a--b]"), which `regex`
+    may treat as a POSIX class or set operation instead.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        try:
+            return sre_parse.parse(pattern, flags)
+        except (std_re.error, ValueError, TypeError, FutureWarning):
+            return None
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _std_compile(pattern: str, flag_key: tuple[str, ...]) -> Optional[std_re.Pattern]:
+    flags = flags_from_names(list(flag_key))
+    if _std_parse(pattern, flags) is None:
+        return None
+    try:
+        return std_re.compile(pattern, flags)
+    except (std_re.error, ValueError):
+        return None
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _std_gap(pattern: str, flag_key: tuple[str, ...]) -> Optional[str]:
+    """
+    An RE2 pattern matching the characters on which `re` and `regex` read
+    `pattern` differently (see _STD_GAPS), or None where they never do.
+    """
+    parsed = _std_parse(pattern, flags_from_names(list(flag_key)))
+    if parsed is None:
+        return None
+    gaps, stack = set(), [parsed]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (sre_parse.SubPattern, list, tuple)):
+            stack.extend(node)
+        elif isinstance(node, sre_c._NamedIntConstant) and node.name in _STD_GAPS:
+            gaps.add(_STD_GAPS[node.name])
+    return "|".join(sorted(gaps)) or None
+
+def _arrow_pattern(pattern: str, flags_list: list[str] | None) -> Optional[str]:
+    return _arrow_pattern_cached(pattern, _flag_key(flags_list))
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _arrow_pattern_cached(pattern: str, flag_key: tuple[str, ...]) -> Optional[str]:
+    # `$` matches before a trailing newline in Python but not in RE2, and
+    # POSIX classes mean different things to each engine.
+    if "$" in pattern or "[:" in pattern:
+        return None
+    # RE2 skips an empty match right after a match, Python does not
+    # ("a1b" with \d* -> "#" gives "#a#b#" vs "#a##b#").
+    parsed = _std_parse(pattern, flags_from_names(list(flag_key)))
+    if parsed is None or parsed.getwidth()[0] == 0:
+        return None
+    inline = "".join(sorted({_ARROW_INLINE[k] for k in flag_key if k in _ARROW_INLINE}))
+    arrow_pat = f"(?{inline}){pattern}" if inline else pattern
+    try:
+        pc.replace_substring_regex(pa.array([""]), pattern=arrow_pat, replacement="")
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return None
+    return arrow_pat
+
+# -----------------------
+# Literal pre-filter
+# -----------------------
+_REQUIRED_REPEATS = {sre_c.MAX_REPEAT, sre_c.MIN_REPEAT, getattr(sre_c, "POSSESSIVE_REPEAT", None)} - {None}
+
+def _longest_literal(items, ignorecase: bool) -> str:
+    """Longest literal every match of the sequence `items` must contain."""
+    best = run = ""
+    for op, av in items:
+        if op is sre_c.LITERAL:
+            run += chr(av)
+            continue
+        inner = ""
+        if op is sre_c.SUBPATTERN:
+            add_flags = av[1]
+            inner = _longest_literal(av[-1], ignorecase or bool(add_flags & sre_c.SRE_FLAG_IGNORECASE))
+        elif op in _REQUIRED_REPEATS and av[0] >= 1:
+            inner = _longest_literal(av[2], ignorecase)
+        elif op is getattr(sre_c, "ATOMIC_GROUP", None):
+            inner = _longest_literal(av, ignorecase)
+        best = max(best, run, inner, key=len)
+        run = ""
+    best = max(best, run, key=len)
+    # Case-insensitive matching may hit other spellings of cased characters.
+    if ignorecase and any(c.lower() != c.upper() for c in best):
+        return ""
+    return best
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def required_literal(pattern: str, flags: int) -> Optional[str]:
+    """
+    A substring every match of `pattern` must contain, or None. Only
+    derived from the mandatory path of the pattern (no branches, optional
+    parts or classes), so a cell without it cannot match at all.
+    """
+    parsed = _std_parse(pattern, flags)
+    if parsed is None:
+        return None
+    return _longest_literal(parsed, bool(parsed.state.flags & sre_c.SRE_FLAG_IGNORECASE)) or None
+
+
+@dataclass
+class CompiledPlan:
+    """
+    One candidate ready to run against a frame.
+
+    Three execution tiers, picked per column:
+      * Arrow (RE2) kernels, when the pattern, template and column data all
+        behave identically under RE2;
+      * the stdlib `re` engine, when the pattern does not need `regex` and
+        the column has none of the characters in `std_gap`;
+      * the `regex` module for everything else.
+
+    When `cell_timeout` is set (see services.pattern_safety) the Python tier
+    always runs on `regex` with that per-cell limit, and `column_timeout`
+    bounds the whole column; exceeding either raises PatternTimeout.
+
+    `literal` is a substring every match contains (see `required_literal`);
+    the Python tier only evaluates cells that contain it, and columns where
+    no cell does are skipped outright.
+
+    Extract and split plans have no template and add columns instead (see
+    `column_outputs`); they run through pandas' vectorized string methods
+    when `std_obj` is set, and on `regex` otherwise.
+    """
+    intent: str
+    pattern: str
+    template: Optional[str]
+    regex_obj: re.Pattern
+    std_obj: Optional[std_re.Pattern] = None
+    arrow_pattern: Optional[str] = None
+    arrow_template: Optional[str] = None
+    cell_timeout: Optional[float] = None
+    column_timeout: Optional[float] = None
+    literal: Optional[str] = None
+    std_gap: Optional[str] = None
+
+    @property
+    def adds_columns(self) -> bool:
+        return self.intent in COLUMN_INTENTS
+
+    @property
+    def is_noop(self) -> bool:
+        return self.template is None and not self.adds_columns
+
+    def std_agrees(self, values: pa.ChunkedArray | np.ndarray) -> bool:
+        """Whether `std_obj` can stand in for `regex_obj` on `values`."""
+        if self.std_obj is None:
+            return False
+        if self.std_gap is None:
+            return True
+        if isinstance(values, np.ndarray):
+            values = pa.array(values, type=pa.string())
+        return not pc.any(pc.match_substring_regex(values, self.std_gap), skip_nulls=True).as_py()
+
+    def python_sub(self, concurrent: bool = False, std: bool = True) -> Callable[[str], str]:
+        template = self.template
+        if self.cell_timeout is not None:
+            obj, limit = self.regex_obj, self.cell_timeout
+            return lambda x, timeout=limit: obj.sub(template, x, concurrent=concurrent, timeout=timeout)
+        if concurrent:
+            # stdlib `re` holds the GIL; `regex` releases it when asked to.
+            return partial(self.regex_obj.sub, template, concurrent=True)
+        return partial((self.std_obj if std and self.std_obj is not None else self.regex_obj).sub, template)
+
+
+def compile_plan(pat_obj: re.Pattern, intent: str, candidate, flags_list: list[str] | None = None) -> CompiledPlan:
+    if intent in ("replace", "mask"):
+        raw_template = candidate.replacement or ""
+    elif intent == "normalize":
+        raw_template = candidate.format or ""
+    elif intent in COLUMN_INTENTS:
+        flags_list = flags_list if flags_list is not None else getattr(candidate, "flags", [])
+        std_obj = _std_compile(pat_obj.pattern, _flag_key(flags_list))
+        return CompiledPlan(
+            intent=intent, pattern=pat_obj.pattern, template=None, regex_obj=pat_obj,
+            std_obj=std_obj, std_gap=_std_gap(pat_obj.pattern, _flag_key(flags_list)),
+        )
+    else:
+        return CompiledPlan(intent=intent, pattern=pat_obj.pattern, template=None, regex_obj=pat_obj)
+
+    flags_list = flags_list if flags_list is not None else getattr(candidate, "flags", [])
+    template = to_py_backrefs(raw_template)
+    std_obj = _std_compile(pat_obj.pattern, _flag_key(flags_list))
+
+    arrow_pattern = arrow_template = None
+    if std_obj is not None:
+        arrow_template = _to_arrow_template(raw_template)
+        if arrow_template is not None:
+            arrow_pattern = _arrow_pattern(pat_obj.pattern, flags_list)
+
+    return CompiledPlan(
+        intent=intent,
+        pattern=pat_obj.pattern,
+        template=template,
+        regex_obj=pat_obj,
+        std_obj=std_obj,
+        arrow_pattern=arrow_pattern,
+        arrow_template=arrow_template,
+        literal=required_literal(std_obj.pattern, std_obj.flags) if std_obj is not None else None,
+        std_gap=_std_gap(pat_obj.pattern, _flag_key(flags_list)),
+    )
+
+
+# -----------------------
+# Column application
+# -----------------------
+@dataclass
+class Evaluation:
+    """
+    Result of running one plan over a frame without materializing it.
+
+    `changes` maps each touched column to (row positions, new values), so a
+    losing candidate costs only its changed cells until it is dropped.
+    `added` maps each column an extract/split creates to (source column,
+    row positions, values); its other cells are missing. A fused pipeline
+    (`evaluate_pipeline`) has no single plan.
+    """
+    plan: Optional[CompiledPlan]
+    stats: dict
+    changes: dict[str, tuple[np.ndarray, np.ndarray]] = field(default_factory=dict)
+    added: dict[str, tuple[str, np.ndarray, np.ndarray]] = field(default_factory=dict)
+
+
+class PatternTimeout(TimeoutError):
+    """A guarded plan exceeded its per-cell or per-column time limit."""
+
+
+def _as_string_series(s: pd.Series) -> pd.Series:
+    return string_view(s)
+
+def _category_rows(codes: np.ndarray, changed_codes: np.ndarray, n_categories: int) -> np.ndarray:
+    hit = np.zeros(n_categories + 1, dtype=bool)  # last slot: code -1 (missing)
+    hit[changed_codes] = True
+    return np.flatnonzero(hit[codes])
+
+def _dictionary(s: pd.Series) -> Optional[tuple[np.ndarray, pd.Series]]:
+    """
+    Codes and distinct values of `s` when evaluating per distinct value
+    pays off: always for categoricals, and for text columns whose sampled
+    cardinality is low enough to be worth a factorize pass. Missing values
+    get code -1.
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.codes.to_numpy(), string_view(pd.Series(s.cat.categories))
+    if len(s) < DICTIONARY_MIN_ROWS:
+        return None
+    sample = spread(s, DICTIONARY_SAMPLE_ROWS)
+    if sample.nunique(dropna=True) > DICTIONARY_MAX_RATIO * len(sample):
+        return None
+    codes, uniques = pd.factorize(_as_string_series(s))
+    return codes, pd.Series(uniques.array)
+
+def _fan_out(codes: np.ndarray, n_values: int, positions: np.ndarray, values: np.ndarray):
+    """Map changes found on the distinct values back to row positions."""
+    rows = _category_rows(codes, positions, n_values)
+    lookup = np.empty(n_values, dtype=object)
+    lookup[positions] = values
+    return rows, lookup[codes[rows]]
+
+def _arrow_values(s: pd.Series) -> pa.ChunkedArray:
+    if s.dtype.storage == "pyarrow":
+        return s.array.__arrow_array__()
+    return pa.chunked_array([pa.array(s.array, type=pa.string())])
+
+def _arrow_eligible(plan: CompiledPlan, arr: pa.ChunkedArray) -> bool:
+    if plan.arrow_pattern is None:
+        return False
+    if not pc.all(pc.string_is_ascii(arr), skip_nulls=True).as_py():
+        return False
+    if "\\s" in plan.pattern or "\\S" in plan.pattern:
+        if pc.any(pc.match_substring_regex(arr, _RE2_SPACE_GAP), skip_nulls=True).as_py():
+            return False
+    return True
+
+def _changes_arrow(plan: CompiledPlan, arr: pa.ChunkedArray):
+    out = pc.replace_substring_regex(arr, pattern=plan.arrow_pattern, replacement=plan.arrow_template)
+    changed = pc.fill_null(pc.not_equal(arr, out), False).to_numpy(zero_copy_only=False)
+    positions = np.flatnonzero(changed)
+    values = out.take(pa.array(positions)).to_numpy(zero_copy_only=False)
+    return positions, values
+
+def _literal_rows(literal: str, s: pd.Series) -> np.ndarray:
+    """Positions of the cells containing `literal` (a memchr-speed Arrow scan)."""
+    hit = pc.match_substring(_arrow_values(s), literal)
+    return np.flatnonzero(pc.fill_null(hit, False).to_numpy(zero_copy_only=False))
+
+def _changes_python(plan: CompiledPlan, s: pd.Series, concurrent: bool):
+    rows = None
+    if plan.literal is not None:
+        rows = _literal_rows(plan.literal, s)
+        if not len(rows):
+            return rows, np.empty(0, dtype=object)
+        s = s.iloc[rows]
+    na = s.isna().to_numpy()
+    before = s.to_numpy(dtype=object, na_value="")
+    sub = plan.python_sub(concurrent, plan.std_agrees(_arrow_values(s)))
+    after = np.empty(len(before), dtype=object)
+    if plan.cell_timeout is None:
+        after[:] = [sub(x) for x in before]
+    else:
+        after[:] = list(_guarded(sub, before, plan))
+    changed = np.flatnonzero((before != after) & ~na)
+    return (changed if rows is None else rows[changed]), after[changed]
+
+def _guarded(sub: Callable, values: np.ndarray, plan: CompiledPlan):
+    deadline = time.monotonic() + plan.column_timeout if plan.column_timeout else None
+    for x in values:
+        timeout = plan.cell_timeout
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PatternTimeout(f"column time limit exceeded: {plan.pattern}")
+            timeout = min(timeout, remaining)
+        try:
+            yield sub(x, timeout)
+        except TimeoutError as e:
+            raise PatternTimeout(f"{e}: {plan.pattern}") from e
+
+def column_changes(plan: CompiledPlan, s: pd.Series, concurrent: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Run `plan` over one column and return the positions and new values of
+    the cells it changes. Missing values are never rewritten. Categorical
+    and low-cardinality columns are evaluated once per distinct value.
+    """
+    dictionary = _dictionary(s)
+    if dictionary is not None:
+        # Run on the distinct values only, then fan out through the codes.
+        codes, uniques = dictionary
+        positions, values = column_changes(plan, uniques, concurrent)
+        return _fan_out(codes, len(uniques), positions, values)
+
+    s = _as_string_series(s)
+    if plan.arrow_pattern is not None:
+        arr = _arrow_values(s)
+        if _arrow_eligible(plan, arr):
+            return _changes_arrow(plan, arr)
+    return _changes_python(plan, s, concurrent)
+
+# -----------------------
+# Extract / split
+# -----------------------
+Output = tuple[int, str, np.ndarray, np.ndarray]  # (ordinal, label, row positions, values)
+
+def _output_labels(plan: CompiledPlan, width: int) -> list[str]:
+    """Name suffixes of the output columns: group names or numbers for extract, 1..n for split."""
+    if plan.intent == "split":
+        return [str(i) for i in range(1, width + 1)]
+    groups = plan.regex_obj.groups
+    if not groups:
+        # A groupless extract that matched nothing has no output column.
+        return ["match"][:width]
+    names = {i: name for name, i in plan.regex_obj.groupindex.items()}
+    return [names.get(i, str(i)) for i in range(1, groups + 1)][:width]
+
+def _python_outputs(plan: CompiledPlan, s: pd.Series) -> pd.DataFrame:
+    """The `regex` fallback of `_output_frame`, under the plan's time limits if it has any."""
+    obj = plan.regex_obj
+    if plan.intent == "split":
+        def cell(x, **kw):
+            return obj.split(x, maxsplit=MAX_OUTPUT_COLUMNS - 1, **kw)
+    else:
+        def cell(x, **kw):
+            m = obj.search(x, **kw)
+            return None if m is None else (m.groups() if obj.groups else (m.group(0),))
+
+    na = s.isna().to_numpy()
+    values = s.to_numpy(dtype=object, na_value="")
+    rows = np.flatnonzero(~na)
+    if plan.cell_timeout is None:
+        results = [cell(x) for x in values[rows]]
+    else:
+        results = list(_guarded(lambda x, timeout: cell(x, timeout=timeout), values[rows], plan))
+    width = min(MAX_OUTPUT_COLUMNS, max((len(r) for r in results if r), default=0))
+    columns = {}
+    for i in range(width):
+        col = np.full(len(s), None, dtype=object)
+        col[rows] = [r[i] if r is not None and i < len(r) else None for r in results]
+        columns[i] = col
+    return pd.DataFrame(columns, index=s.index)
+
+def _output_frame(plan: CompiledPlan, s: pd.Series) -> pd.DataFrame:
+    """
+    One column per output of `plan` on the text series `s` (missing where
+    a cell has no such output), at most MAX_OUTPUT_COLUMNS wide. Uses
+    pandas' `str.split` / `str.extract` where the stdlib engine can run the
+    pattern unguarded, and the `regex` module otherwise.
+    """
+    if plan.cell_timeout is not None or not plan.std_agrees(_arrow_values(s)):
+        return _python_outputs(plan, s)
+    if plan.intent == "split":
+        frame = s.str.split(plan.std_obj, n=MAX_OUTPUT_COLUMNS - 1, expand=True, regex=True)
+    elif plan.std_obj.groups:
+        frame = s.str.extract(plan.std_obj.pattern, flags=plan.std_obj.flags, expand=True)
+    else:
+        # str.extract needs a group; a match without groups extracts whole.
+        return _python_outputs(plan, s)
+    return frame.iloc[:, :MAX_OUTPUT_COLUMNS]
+
+def column_outputs(plan: CompiledPlan, s: pd.Series) -> tuple[list[Output], np.ndarray]:
+    """
+    Run an extract/split `plan` over one column. Returns the new columns'
+    cells as (ordinal, label, positions, values) and the rows the pattern
+    matched; unsplit cells land whole in a split's first column. Categorical
+    and low-cardinality columns are evaluated once per distinct value.
+    """
+    dictionary = _dictionary(s)
+    if dictionary is not None:
+        codes, uniques = dictionary
+        outputs, matched = column_outputs(plan, uniques)
+        fanned = [(i, label, *_fan_out(codes, len(uniques), pos, vals)) for i, label, pos, vals in outputs]
+        return fanned, _category_rows(codes, matched, len(uniques))
+
+    frame = _output_frame(plan, _as_string_series(s))
+    present = frame.notna().to_numpy()
+    if plan.intent == "split":
+        matched = np.flatnonzero(present[:, 1]) if present.shape[1] > 1 else np.empty(0, dtype=np.int64)
+    else:
+        matched = np.flatnonzero(present.any(axis=1))
+    outputs = []
+    for i, label in enumerate(_output_labels(plan, frame.shape[1])):
+        positions = np.flatnonzero(present[:, i])
+        values = frame.iloc[:, i].to_numpy(dtype=object, na_value=None)[positions]
+        outputs.append((i, label, positions, values))
+    return outputs, matched
+
+def _output_name(name: str, taken: set) -> str:
+    unique, n = name, 2
+    while unique in taken:
+        unique, n = f"{name}_{n}", n + 1
+    return unique
+
+def _target_columns(df: pd.DataFrame, columns: list[str] | None) -> list[str]:
+    target_cols = columns or list(df.columns)
+    return [c for c in target_cols if c in df.columns]
+
+def _shard_bounds(n_rows: int, workers: int, min_rows: int) -> list[tuple[int, int]]:
+    n_shards = max(1, min(workers, n_rows // max(1, min_rows)))
+    step = -(-n_rows // n_shards) if n_rows else 1
+    return [(lo, min(lo + step, n_rows)) for lo in range(0, max(n_rows, 1), step)]
+
+_executors: dict[int, ThreadPoolExecutor] = {}
+_executors_lock = Lock()
+
+def _executor(workers: int) -> ThreadPoolExecutor:
+    with _executors_lock:
+        ex = _executors.get(workers)
+        if ex is None:
+            ex = _executors[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="regex-eval")
+        return ex
+
+def evaluate_plans(
+    df: pd.DataFrame,
+    plans: list[CompiledPlan],
+    columns: list[str] | None,
+    workers: int = 1,
+    min_parallel_rows: int = PARALLEL_MIN_ROWS,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> list[Evaluation]:
+    """
+    Score every plan against `df` and collect their sparse changes.
+
+    With workers > 1 the rows are split into shards and every
+    (plan, column, shard) runs on a thread pool. The Arrow kernels and
+    `regex` with concurrent=True release the GIL while matching, so the
+    candidates progress in parallel. `progress(done, total)` is called from
+    the calling thread as each shard finishes, counting evaluated cells.
+    A guarded plan that hits its time limit on any shard is skipped from
+    then on and reported with stats["timed_out"] and no changes.
+
+    Extract/split plans report their new columns under `added` (named
+    `<column>_<label>`, made unique) and stats["added_columns"]; their
+    updated_rows are the rows the pattern matched and updated_cells the
+    new cells on those rows.
+    """
+    target_cols = _target_columns(df, columns)
+    n_rows = len(df)
+    shards = _shard_bounds(n_rows, workers, min_parallel_rows)
+    concurrent = workers > 1 and len(shards) * len(plans) > 1
+
+    tasks = [
+        (pi, col, lo, hi)
+        for pi, plan in enumerate(plans) if not plan.is_noop
+        for col in target_cols
+        for lo, hi in shards
+    ]
+
+    timed_out: set[int] = set()
+
+    def run(task):
+        pi, col, lo, hi = task
+        if pi in timed_out:
+            return task, None, None
+        try:
+            if plans[pi].adds_columns:
+                outputs, matched = column_outputs(plans[pi], df[col].iloc[lo:hi])
+                return task, [(i, label, pos + lo, vals) for i, label, pos, vals in outputs], matched + lo
+            positions, values = column_changes(plans[pi], df[col].iloc[lo:hi], concurrent)
+        except PatternTimeout:
+            timed_out.add(pi)
+            return task, None, None
+        return task, positions + lo, values
+
+    results = _executor(workers).map(metrics.carry_context(run), tasks) if concurrent else map(run, tasks)
+
+    parts: list[dict[str, list]] = [{} for _ in plans]
+    # Extract/split: per plan, column -> (ordinal, label) -> chunks, and matched rows.
+    output_parts: list[dict[str, dict]] = [{} for _ in plans]
+    matched_parts: list[dict[str, list]] = [{} for _ in plans]
+    total_cells = sum(hi - lo for _pi, _col, lo, hi in tasks)
+    done_cells = 0
+    for (pi, col, lo, hi), positions, values in results:
+        done_cells += hi - lo
+        if progress is not None:
+            progress(done_cells, total_cells)
+        if positions is None:
+            continue
+        if plans[pi].adds_columns:
+            for i, label, pos, vals in positions:
+                output_parts[pi].setdefault(col, {}).setdefault((i, label), []).append((pos, vals))
+            matched_parts[pi].setdefault(col, []).append(values)
+        elif len(positions):
+            parts[pi].setdefault(col, []).append((positions, values))
+
+    evaluations = []
+    for pi, (plan, plan_parts) in enumerate(zip(plans, parts)):
+        if pi in timed_out:
+            stats = {"updated_rows": 0, "updated_cells": 0, "target_cols": target_cols, "timed_out": True}
+            evaluations.append(Evaluation(plan=plan, stats=stats))
+            continue
+        if plan.adds_columns:
+            evaluations.append(_output_evaluation(plan, df, target_cols, output_parts[pi], matched_parts[pi]))
+            continue
+        changes = {}
+        changed_row_mask = np.zeros(n_rows, dtype=bool)
+        updated_cells = 0
+        for col, chunks in plan_parts.items():
+            positions = np.concatenate([c[0] for c in chunks])
+            values = np.concatenate([c[1] for c in chunks])
+            changes[col] = (positions, values)
+            changed_row_mask[positions] = True
+            updated_cells += len(positions)
+        stats = {
+            "updated_rows": int(changed_row_mask.sum()),
+            "updated_cells": updated_cells,
+            "target_cols": target_cols,
+        }
+        evaluations.append(Evaluation(plan=plan, stats=stats, changes=changes))
+    return evaluations
+
+def _output_evaluation(
+    plan: CompiledPlan, df: pd.DataFrame, target_cols: list[str], outputs: dict[str, dict], matched: dict[str, list]
+) -> Evaluation:
+    """
+    Assemble an extract/split plan's shard outputs into new columns, in
+    source column order. Columns the pattern never matched get none.
+    """
+    matched_rows = np.zeros(len(df), dtype=bool)
+    taken = set(df.columns)
+    added = {}
+    updated_cells = 0
+    for col in target_cols:
+        col_matched = np.zeros(len(df), dtype=bool)
+        for rows in matched.get(col, []):
+            col_matched[rows] = True
+        if not col_matched.any():
+            continue
+        matched_rows |= col_matched
+        for (_i, label), chunks in sorted(outputs.get(col, {}).items()):
+            name = _output_name(f"{col}_{label}", taken)
+            taken.add(name)
+            positions = np.concatenate([c[0] for c in chunks])
+            added[name] = (col, positions, np.concatenate([c[1] for c in chunks]))
+            updated_cells += int(col_matched[positions].sum())
+    stats = {
+        "updated_rows": int(matched_rows.sum()),
+        "updated_cells": updated_cells,
+        "target_cols": target_cols,
+        "added_columns": list(added),
+    }
+    return Evaluation(plan=plan, stats=stats, added=added)
+
+# -----------------------
+# Fused pipelines
+# -----------------------
+def _python_run(
+    plans: list[CompiledPlan], cur: np.ndarray, na: np.ndarray, concurrent: bool
+) -> tuple[np.ndarray, list[np.ndarray]]:
+    """
+    Apply consecutive Python-tier plans to the working buffer `cur` and
+    return it with the positions each plan changed. Missing cells hold ""
+    here and are masked out of the positions.
+    """
+    hits: list[np.ndarray] = []
+    for plan in plans:
+        sub = plan.python_sub(concurrent, plan.std_agrees(cur))
+        run = (lambda values: [sub(x) for x in values]) if plan.cell_timeout is None else (
+            lambda values: list(_guarded(sub, values, plan))
+        )
+        if plan.literal is None:
+            after = np.empty(len(cur), dtype=object)
+            after[:] = run(cur)
+        else:
+            # Only cells containing the plan's required literal can change.
+            literal = plan.literal
+            rows = np.flatnonzero(np.fromiter((literal in x for x in cur), dtype=bool, count=len(cur)))
+            after = cur.copy()
+            if len(rows):
+                after[rows] = run(cur[rows])
+        hits.append(np.flatnonzero((cur != after) & ~na))
+        cur = after
+    return cur, hits
+
+def fused_column_changes(
+    plans: list[CompiledPlan], s: pd.Series, concurrent: bool = False
+) -> tuple[np.ndarray, np.ndarray, list[np.ndarray]]:
+    """
+    Run `plans` in order over one column in a single working buffer and
+    return the net changed positions and values plus the positions each
+    plan changed along the way. Runs of Arrow-eligible plans stay in Arrow; the
+    buffer is converted only when the tier changes. Categorical and
+    low-cardinality columns are processed on their distinct values and
+    fanned out through the codes (see `_dictionary`).
+    """
+    dictionary = _dictionary(s)
+    if dictionary is not None:
+        codes, uniques = dictionary
+        positions, values, hits = fused_column_changes(plans, uniques, concurrent)
+        positions, values = _fan_out(codes, len(uniques), positions, values)
+        return positions, values, [_category_rows(codes, h, len(uniques)) for h in hits]
+
+    s = _as_string_series(s)
+    na = s.isna().to_numpy()
+    before = s.to_numpy(dtype=object, na_value="")
+    arr: Optional[pa.ChunkedArray] = None
+    cur: Optional[np.ndarray] = before
+    hits: list[np.ndarray] = []
+    arrow_off = False  # set once the text is known not to be ASCII
+
+    i = 0
+    while i < len(plans):
+        plan = plans[i]
+        if plan.arrow_pattern is not None and not arrow_off:
+            if arr is None:
+                arr = _arrow_values(s) if cur is before else pa.chunked_array([pa.array(cur, type=pa.string(), mask=na)])
+            if _arrow_eligible(plan, arr):
+                out = pc.replace_substring_regex(arr, pattern=plan.arrow_pattern, replacement=plan.arrow_template)
+                hits.append(np.flatnonzero(pc.fill_null(pc.not_equal(arr, out), False).to_numpy(zero_copy_only=False)))
+                arr, cur = out, None
+                i += 1
+                continue
+            arrow_off = not pc.all(pc.string_is_ascii(arr), skip_nulls=True).as_py()
+        if cur is None:
+            cur = np.where(na, "", arr.to_numpy(zero_copy_only=False))
+        j = i + 1
+        while j < len(plans) and (arrow_off or plans[j].arrow_pattern is None):
+            j += 1
+        cur, run_hits = _python_run(plans[i:j], cur, na, concurrent)
+        hits.extend(run_hits)
+        arr = None
+        i = j
+
+    if cur is None:
+        cur = np.where(na, "", arr.to_numpy(zero_copy_only=False))
+    changed = (before != cur) & ~na
+    positions = np.flatnonzero(changed)
+    return positions, cur[positions], hits
+
+def _step_stats(hits: list[np.ndarray], n_rows: int) -> dict:
+    rows = np.zeros(n_rows, dtype=bool)
+    for h in hits:
+        rows[h] = True
+    return {"updated_rows": int(rows.sum()), "updated_cells": int(sum(len(h) for h in hits))}
+
+def evaluate_pipeline(
+    df: pd.DataFrame,
+    steps: list[tuple[CompiledPlan, list[str] | None]],
+    workers: int = 1,
+    min_parallel_rows: int = PARALLEL_MIN_ROWS,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Evaluation:
+    """
+    Run an ordered list of (plan, target columns) steps as one transform.
+
+    Each target column is read once and every step that touches it is
+    applied in sequence to the same buffer (`fused_column_changes`), so no
+    intermediate frames are built; only the net changes are returned.
+    Sharding and progress work as in `evaluate_plans`. stats["steps"] holds
+    each step's own updated_rows / updated_cells. A guarded plan that times out raises
+    PatternTimeout.
+
+    Extract/split steps read their source as left by the steps before them
+    and later steps may target the columns they add, so a pipeline that has
+    any runs in segments around them (`_evaluate_segments`).
+    """
+    if any(plan.adds_columns for plan, _ in steps):
+        return _evaluate_segments(df, steps, workers, min_parallel_rows, progress)
+    n_rows = len(df)
+    shards = _shard_bounds(n_rows, workers, min_parallel_rows)
+    per_column: dict[str, list[int]] = {}
+    for si, (plan, columns) in enumerate(steps):
+        if plan.is_noop:
+            continue
+        for col in _target_columns(df, columns):
+            per_column.setdefault(col, []).append(si)
+    tasks = [(col, lo, hi) for col in per_column for lo, hi in shards]
+    concurrent = workers > 1 and len(tasks) > 1
+
+    def run(task):
+        col, lo, hi = task
+        plans = [steps[si][0] for si in per_column[col]]
+        positions, values, hits = fused_column_changes(plans, df[col].iloc[lo:hi], concurrent)
+        return task, positions + lo, values, [h + lo for h in hits]
+
+    results = _executor(workers).map(metrics.carry_context(run), tasks) if concurrent else map(run, tasks)
+
+    parts: dict[str, list] = {}
+    step_hits: list[list[np.ndarray]] = [[] for _ in steps]
+    total_cells = sum(hi - lo for _col, lo, hi in tasks)
+    done_cells = 0
+    for (col, lo, hi), positions, values, hits in results:
+        done_cells += hi - lo
+        if progress is not None:
+            progress(done_cells, total_cells)
+        for si, h in zip(per_column[col], hits):
+            step_hits[si].append(h)
+        if len(positions):
+            parts.setdefault(col, []).append((positions, values))
+
+    changes = {}
+    changed_row_mask = np.zeros(n_rows, dtype=bool)
+    for col, chunks in parts.items():
+        positions = np.concatenate([c[0] for c in chunks])
+        changes[col] = (positions, np.concatenate([c[1] for c in chunks]))
+        changed_row_mask[positions] = True
+    stats = {
+        "updated_rows": int(changed_row_mask.sum()),
+        "updated_cells": int(sum(len(p) for p, _ in changes.values())),
+        "target_cols": list(per_column),
+        "steps": [_step_stats(h, n_rows) for h in step_hits],
+    }
+    return Evaluation(plan=None, stats=stats, changes=changes)
+
+def _overlay(first: tuple[np.ndarray, np.ndarray], then: tuple[np.ndarray, np.ndarray]):
+    """(positions, values) of `first` updated by `then`; `then` wins where both have a position."""
+    positions = np.concatenate([then[0], first[0]])
+    values = np.concatenate([then[1], first[1]])
+    positions, keep = np.unique(positions, return_index=True)
+    return positions, values[keep]
+
+def _evaluate_segments(
+    df: pd.DataFrame,
+    steps: list[tuple[CompiledPlan, list[str] | None]],
+    workers: int,
+    min_parallel_rows: int,
+    progress: Optional[Callable[[int, int], None]],
+) -> Evaluation:
+    """
+    `evaluate_pipeline` for pipelines with extract/split steps: runs of
+    substituting steps are fused as usual, each extract/split step runs on
+    its own, and the frame is materialized between segments (unchanged
+    columns are shared). The segments' changes are folded into one net
+    Evaluation against `df`.
+    """
+    segments: list[list[int]] = []
+    for si, (plan, _) in enumerate(steps):
+        if plan.adds_columns or not segments or steps[segments[-1][0]][0].adds_columns:
+            segments.append([si])
+        else:
+            segments[-1].append(si)
+
+    cur = df
+    changes: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+    added: dict[str, tuple[str, np.ndarray, np.ndarray]] = {}
+    step_stats: list[dict] = []
+    target_cols: list[str] = []
+    for segment in segments:
+        plan, columns = steps[segment[0]]
+        if plan.adds_columns:
+            ev = evaluate_plans(cur, [plan], columns, workers, min_parallel_rows, progress)[0]
+            if ev.stats.get("timed_out"):
+                raise PatternTimeout(f"column time limit exceeded: {plan.pattern}")
+            step_stats.append({k: ev.stats[k] for k in ("updated_rows", "updated_cells", "added_columns")})
+        else:
+            ev = evaluate_pipeline(cur, [steps[si] for si in segment], workers, min_parallel_rows, progress)
+            step_stats.extend(ev.stats["steps"])
+        target_cols += [c for c in ev.stats["target_cols"] if c not in target_cols]
+        for col, change in ev.changes.items():
+            if col in added:
+                source, positions, values = added[col]
+                added[col] = (source, *_overlay((positions, values), change))
+            else:
+                changes[col] = _overlay(changes[col], change) if col in changes else change
+        added.update(ev.added)
+        cur = materialize(cur, ev)
+
+    changed_row_mask = np.zeros(len(df), dtype=bool)
+    for positions, _ in changes.values():
+        changed_row_mask[positions] = True
+    for _, positions, _ in added.values():
+        changed_row_mask[positions] = True
+    stats = {
+        "updated_rows": int(changed_row_mask.sum()),
+        "updated_cells": int(sum(len(p) for p, _ in changes.values()) + sum(len(p) for _, p, _ in added.values())),
+        "target_cols": target_cols,
+        "steps": step_stats,
+    }
+    return Evaluation(plan=None, stats=stats, changes=changes, added=added)
+
+def changed_rows(evaluation: Evaluation) -> np.ndarray:
+    """Sorted row positions where at least one cell changed or was added."""
+    parts = [pos for pos, _ in evaluation.changes.values()] + [pos for _, pos, _ in evaluation.added.values()]
+    if not parts:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(np.concatenate(parts))
+
+def materialize(df: pd.DataFrame, evaluation: Evaluation) -> pd.DataFrame:
+    """
+    Build the transformed frame for `evaluation`. Columns without changes
+    are shared with `df`; changed columns are copied and patched. Added
+    columns are inserted after their source column, in order.
+    """
+    if not evaluation.changes and not evaluation.added:
+        return df
+    new_df = df.copy(deep=False)
+    for col, (positions, values) in evaluation.changes.items():
+        base = _as_string_series(df[col])
+        if len(positions) == len(base):
+            arr = pd.array(values, dtype=base.dtype)
+        else:
+            arr = base.array.copy()
+            arr[positions] = values
+        new_df[col] = pd.Series(arr, index=df.index, name=col)
+    anchors: dict[str, str] = {}
+    for name, (source, positions, values) in evaluation.added.items():
+        full = np.full(len(df), None, dtype=object)
+        full[positions] = values
+        loc = new_df.columns.get_loc(anchors.get(source, source)) + 1
+        new_df.insert(loc, name, pd.Series(pd.array(full, dtype=OUTPUT_DTYPE), index=df.index))
+        anchors[source] = name
+    return new_df
+
+def apply_plan(df: pd.DataFrame, plan: CompiledPlan, columns: list[str] | None, workers: int = 1):
+    """
+    Apply `plan` column-wise, copying only the columns that actually change.
+
+    Changed cells and changed rows are both derived from the per-column
+    change positions, so every target column is scanned exactly once.
+    """
+    evaluation = evaluate_plans(df, [plan], columns, workers=workers)[0]
+    return materialize(df, evaluation), evaluation.stats
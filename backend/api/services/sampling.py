@@ -0,0 +1,34 @@
+# services/sampling.py
+from __future__ import annotations
+import math
+
+import numpy as np
+
+
+def stratified_positions(n_rows: int, sample_rows: int, seed: int = 0) -> np.ndarray:
+    """
+    Pick `sample_rows` row positions, one uniformly at random from each of
+    `sample_rows` equal-width strata along the table.
+
+    Uploads are often sorted or grouped (by date, by source system), so
+    spreading the sample over the whole file keeps a candidate that only
+    matches one region from being missed or over-counted.
+    """
+    if sample_rows >= n_rows:
+        return np.arange(n_rows)
+    rng = np.random.default_rng(seed)
+    edges = np.linspace(0, n_rows, sample_rows + 1)
+    lo = edges[:-1].astype(np.int64)
+    hi = np.maximum(edges[1:].astype(np.int64), lo + 1)
+    return rng.integers(lo, hi)
+
+
+def wilson_interval(successes: int, trials: int, z: float = 1.96) -> tuple[float, float]:
+    """Wilson score interval for a binomial proportion."""
+    if trials <= 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denom = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denom
+    half = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
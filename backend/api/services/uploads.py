@@ -0,0 +1,73 @@
+# services/uploads.py
+from __future__ import annotations
+import hashlib
+import os
+import re
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+
+from ..models import UploadedDataset
+
+UPLOAD_DIR = "uploads"
+_EXT_RE = re.compile(r"^\.[a-z0-9]{1,15}$")
+
+
+@dataclass
+class SavedUpload:
+    sha256: str
+    # Storage name relative to MEDIA_ROOT, for UploadedDataset.file.
+    name: str
+    size: int
+    # False when identical bytes were already stored.
+    created: bool
+
+
+def upload_name(sha256: str, ext: str) -> str:
+    """`uploads/<2 hex>/<sha256><ext>`: the name depends only on content and extension."""
+    ext = ext.lower() if _EXT_RE.match(ext.lower()) else ""
+    return f"{UPLOAD_DIR}/{sha256[:2]}/{sha256}{ext}"
+
+
+def save_upload(f: UploadedFile) -> SavedUpload:
+    """
+    Stream `f` to disk, hashing it on the way, and store it under its
+    content hash. A file with the same bytes and extension is stored once;
+    concurrent identical uploads race harmlessly on the final rename.
+    """
+    root = Path(settings.MEDIA_ROOT)
+    tmp_dir = root / UPLOAD_DIR / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    tmp = tmp_dir / f"{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with tmp.open("wb") as out:
+            for chunk in f.chunks():
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        sha256 = digest.hexdigest()
+        name = upload_name(sha256, Path(f.name or "").suffix)
+        final = root / name
+        created = not final.exists()
+        if created:
+            final.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, final)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return SavedUpload(sha256, name, size, created)
+
+
+def discard(record: UploadedDataset) -> None:
+    """Delete `record`'s stored file unless another upload shares it."""
+    if not record.file.name:
+        return
+    others = UploadedDataset.objects.filter(file=record.file.name)
+    if record.pk is not None:
+        others = others.exclude(pk=record.pk)
+    if not others.exists():
+        record.file.delete(save=False)
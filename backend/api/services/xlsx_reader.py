@@ -0,0 +1,258 @@
+# services/xlsx_reader.py
+from __future__ import annotations
+import posixpath
+import zipfile
+from pathlib import Path
+from typing import Iterator, Optional, Union
+from xml.etree.ElementTree import iterparse
+
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.cell import column_index_from_string, range_boundaries
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+_PKG_RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+_DIGITS = "0123456789"
+
+
+def _ns(tag: str) -> str:
+    """'{uri}local' -> '{uri}'; transitional and strict OOXML differ only here."""
+    return tag[: tag.index("}") + 1] if tag.startswith("{") else ""
+
+
+def _local(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+class XlsxWorkbook:
+    """
+    Minimal streaming reader for .xlsx worksheets.
+
+    openpyxl's read-only mode still builds a cell object (with style
+    lookups and descriptor validation) for every value; for a plain
+    "give me the text of each cell" load that bookkeeping is most of the
+    cost. This reads the sheet XML with a single iterparse pass instead and
+    only keeps one row alive at a time. Values come out as the text
+    `pd.read_excel(dtype="string")` would produce: shared/inline strings
+    as-is, integral numbers without ".0", date-formatted numbers as
+    datetimes, booleans as "True"/"False", errors and blanks as None.
+    """
+
+    def __init__(self, path: Path):
+        self.zip = zipfile.ZipFile(path)
+        root = self._find_workbook()
+        self._root = root
+        rels = self._rels(root)
+
+        self.sheets: list[tuple[str, str]] = []
+        self.epoch = CALENDAR_WINDOWS_1900
+        with self.zip.open(root) as fh:
+            for _, el in iterparse(fh):
+                name = _local(el.tag)
+                if name == "workbookPr" and el.get("date1904") in ("1", "true"):
+                    self.epoch = CALENDAR_MAC_1904
+                elif name == "sheet":
+                    rid = next((v for k, v in el.attrib.items() if _local(k) == "id"), None)
+                    target, kind = rels.get(rid, (None, ""))
+                    if target is not None and kind.endswith("/worksheet"):
+                        self.sheets.append((el.get("name"), target))
+
+        self._strings: Optional[list[str]] = None
+        self._date_styles: Optional[dict[int, bool]] = None
+
+    def close(self) -> None:
+        self.zip.close()
+
+    @property
+    def sheetnames(self) -> list[str]:
+        return [name for name, _ in self.sheets]
+
+    # -----------------------
+    # Package parts
+    # -----------------------
+    def _resolve(self, base: str, target: str) -> str:
+        return target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+
+    def _rels(self, part: str) -> dict[str, tuple[str, str]]:
+        base, name = posixpath.split(part)
+        rels_path = posixpath.join(base, "_rels", f"{name}.rels")
+        out = {}
+        if rels_path not in self.zip.NameToInfo:
+            return out
+        with self.zip.open(rels_path) as fh:
+            for _, el in iterparse(fh):
+                if el.tag == _PKG_RELS:
+                    out[el.get("Id")] = (self._resolve(base, el.get("Target")), el.get("Type", ""))
+        return out
+
+    def _find_workbook(self) -> str:
+        for target, kind in self._rels("").values():
+            if kind.endswith("/officeDocument"):
+                return target
+        return "xl/workbook.xml"
+
+    def _part(self, suffix: str) -> Optional[str]:
+        for target, kind in self._rels(self._root).values():
+            if kind.endswith(suffix):
+                return target
+        return None
+
+    def _shared_strings(self) -> list[str]:
+        if self._strings is None:
+            self._strings = []
+            part = self._part("/sharedStrings")
+            if part is not None and part in self.zip.NameToInfo:
+                with self.zip.open(part) as fh:
+                    for _, el in iterparse(fh):
+                        if _local(el.tag) == "si":
+                            # Plain <t> or rich-text runs <r><t>; phonetic <rPh> hints are skipped.
+                            parts = [el.find(f"{_ns(el.tag)}t")] + [
+                                r.find(f"{_ns(el.tag)}t") for r in el.iterfind(f"{_ns(el.tag)}r")
+                            ]
+                            self._strings.append("".join(t.text or "" for t in parts if t is not None))
+                            el.clear()
+        return self._strings
+
+    def _date_style_map(self) -> dict[int, bool]:
+        """Style index -> True for date formats, False for durations; others absent."""
+        if self._date_styles is None:
+            self._date_styles = {}
+            part = self._part("/styles")
+            if part is None or part not in self.zip.NameToInfo:
+                return self._date_styles
+            custom: dict[int, str] = {}
+            xfs: list[int] = []
+            in_cell_xfs = False
+            with self.zip.open(part) as fh:
+                for event, el in iterparse(fh, events=("start", "end")):
+                    name = _local(el.tag)
+                    if name == "cellXfs":
+                        in_cell_xfs = event == "start"
+                    elif event == "end" and name == "numFmt":
+                        custom[int(el.get("numFmtId"))] = el.get("formatCode", "")
+                    elif event == "end" and name == "xf" and in_cell_xfs:
+                        xfs.append(int(el.get("numFmtId", 0)))
+            for index, fmt_id in enumerate(xfs):
+                code = custom.get(fmt_id, BUILTIN_FORMATS.get(fmt_id, "General"))
+                if is_date_format(code):
+                    self._date_styles[index] = not is_timedelta_format(code)
+        return self._date_styles
+
+    # -----------------------
+    # Worksheets
+    # -----------------------
+    def sheet(self, sheet: Union[str, int, None]) -> tuple[str, str]:
+        """(title, part path) for a sheet name or 0-based index; default the first."""
+        if not self.sheets:
+            raise ValueError("Workbook has no worksheets")
+        if sheet is None:
+            return self.sheets[0]
+        if isinstance(sheet, int):
+            if not 0 <= sheet < len(self.sheets):
+                raise ValueError(f"Worksheet index {sheet} is out of range")
+            return self.sheets[sheet]
+        for entry in self.sheets:
+            if entry[0] == sheet:
+                return entry
+        raise ValueError(f"Worksheet named '{sheet}' not found")
+
+    def declared_rows(self, part: str) -> Optional[int]:
+        """Row count from the sheet's <dimension> tag, read without scanning the data."""
+        with self.zip.open(part) as fh:
+            for _, el in iterparse(fh, events=("start",)):
+                name = _local(el.tag)
+                if name == "dimension":
+                    try:
+                        _, min_row, _, max_row = range_boundaries(el.get("ref", ""))
+                    except (TypeError, ValueError):
+                        return None
+                    return max_row - min_row + 1 if min_row and max_row else None
+                if name == "sheetData":
+                    return None
+        return None
+
+    def iter_rows(self, part: str) -> Iterator[list[Optional[str]]]:
+        """
+        Yield rows as lists of cell texts with trailing blanks trimmed.
+        Blank rows before the first and after the last non-empty row are
+        dropped; blank rows in between come out as [] (read_excel keeps them).
+        """
+        strings = self._shared_strings()
+        date_styles = self._date_style_map()
+        epoch = self.epoch
+
+        with self.zip.open(part) as fh:
+            events = iterparse(fh, events=("start", "end"))
+            _, root = next(events)
+            ns = _ns(root.tag)
+            T_ROW, T_C, T_V, T_IS, T_T, T_DATA = (f"{ns}{t}" for t in ("row", "c", "v", "is", "t", "sheetData"))
+
+            data = None
+            row: list[Optional[str]] = []
+            expected = 1  # row number implied when <row> has no r attribute
+            blanks = 0
+            started = False
+            for event, el in events:
+                tag = el.tag
+                if event == "start":
+                    if tag == T_DATA:
+                        data = el
+                    continue
+                if tag == T_C:
+                    kind = el.get("t", "n")
+                    if kind == "inlineStr":
+                        inline = el.find(T_IS)
+                        value = None if inline is None else "".join(t.text or "" for t in inline.iter(T_T))
+                    else:
+                        v = el.find(T_V)
+                        text = None if v is None else v.text
+                        if text is None:
+                            value = None
+                        elif kind == "n":
+                            value = self._number(text, el.get("s"), date_styles, epoch)
+                        elif kind == "s":
+                            value = strings[int(text)]
+                        elif kind == "b":
+                            value = "True" if text in ("1", "true") else "False"
+                        elif kind == "e":
+                            value = None
+                        else:  # "str" (formula result) and "d" (ISO date)
+                            value = text.replace("T", " ") if kind == "d" else text
+
+                    ref = el.get("r")
+                    if ref is not None:
+                        col = column_index_from_string(ref.rstrip(_DIGITS)) - 1
+                        if col > len(row):
+                            row.extend([None] * (col - len(row)))
+                    row.append(value)
+                elif tag == T_ROW:
+                    ref = el.get("r")
+                    number = int(ref) if ref is not None else expected
+                    blanks += number - expected  # rows absent from the XML entirely
+                    expected = number + 1
+                    while row and row[-1] is None:
+                        row.pop()
+                    if row:
+                        if started:
+                            yield from ([] for _ in range(blanks))
+                        yield row
+                        row = []
+                        started, blanks = True, 0
+                    else:
+                        blanks += 1
+                    el.clear()
+                    if data is not None:
+                        data.clear()
+
+    @staticmethod
+    def _number(text: str, style: Optional[str], date_styles: dict[int, bool], epoch) -> str:
+        num = float(text)
+        if style is not None:
+            is_date = date_styles.get(int(style))
+            if is_date is not None:
+                try:
+                    return str(from_excel(num, epoch, timedelta=not is_date))
+                except (OverflowError, ValueError):
+                    pass
+        if num.is_integer():
+            return str(int(num))
+        return str(num)
@@ -0,0 +1,15 @@
+from api.services.llm_client import CompilePlan
+
+
+def llm_plan(*candidates, intent="replace"):
+    """A planner answer with one regex candidate per (pattern, replacement) pair."""
+    return CompilePlan.model_validate({
+        "is_table_op": True,
+        "intent": intent,
+        "reason": "",
+        "columns": [],
+        "candidates": [
+            {"engine": "regex", "pattern": p, "flags": [], "replacement": r, "explanation": ""}
+            for p, r in candidates
+        ],
+    })
@@ -1,25 +1,31 @@
-from django.test import Client, TestCase
+import tempfile
+from unittest import mock
+
+from django.test import Client, TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from api.services import dataset_store
+from api.tests.helpers import llm_plan
+
 
 CSV = """ID,Name,Email\n1,John,john@example.com\n2,Jane,jane@site.org\n""".encode()
 
 
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
 class APISmoke(TestCase):
     def setUp(self):
         self.client = Client()
-
-
-def test_upload_and_transform(self):
-    up = SimpleUploadedFile("sample.csv", CSV, content_type="text/csv")
-    r = self.client.post("/api/upload", {"file": up})
-    self.assertEqual(r.status_code, 200)
-
-
-    body = {
-        "natural_language": "Find email addresses",
-        "replacement": "REDACTED"
-    }
-    r2 = self.client.post("/api/transform", body, content_type="application/json")
-    self.assertEqual(r2.status_code, 200)
-    self.assertIn("REDACTED", str(r2.json()))
\ No newline at end of file
+        patcher = mock.patch.object(dataset_store, "store", dataset_store.DatasetStore(tempfile.mkdtemp(), 1 << 30))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_upload_and_transform(self):
+        up = SimpleUploadedFile("sample.csv", CSV, content_type="text/csv")
+        r = self.client.post("/api/upload", {"file": up})
+        self.assertEqual(r.status_code, 200)
+
+        plan = llm_plan((r"[\w.]+@[\w.]+", "REDACTED"), intent="mask")
+        with mock.patch("api.views.compile_regex_plan", return_value=plan):
+            r2 = self.client.post("/api/transform", {"prompt": "Find email addresses"}, content_type="application/json")
+        self.assertEqual(r2.status_code, 200)
+        self.assertIn("REDACTED", str(r2.json()))
@@ -0,0 +1,38 @@
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from api.services import dataset_store
+from benchmarks.cases import build_cases
+from benchmarks.datasets import Spec, csv_bytes, frame
+from benchmarks.runner import Result, compare, measure
+
+
+class DatasetTests(TestCase):
+    def test_spec_controls_shape_cardinality_and_encoding(self):
+        df = frame(Spec(rows=500, cols=8, cardinality=10, accented=True))
+        self.assertEqual(df.shape, (500, 8))
+        self.assertEqual(list(df.columns)[-2:], ["email_1", "phone_1"])
+        self.assertLessEqual(df["name"].nunique(), 10)
+        self.assertEqual(frame(Spec(rows=500)).iloc[:, 0].nunique(), 500)
+        data = csv_bytes(Spec(rows=3, accented=True, encoding="cp1252", delimiter=";"))
+        self.assertIn(";", data.decode("cp1252").splitlines()[0])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class RunnerTests(TestCase):
+    def test_every_case_runs(self):
+        with mock.patch.object(dataset_store, "store", dataset_store.DatasetStore(tempfile.mkdtemp(), 1 << 30)):
+            for case in build_cases(scale=0.001).values():
+                with self.subTest(case=case.name):
+                    result = measure(case, repeat=1, warmup=0)
+                    self.assertGreater(result.p50_ms, 0)
+
+    def test_compare_flags_regressions_beyond_threshold(self):
+        def result(name, p50):
+            return Result(name, 100, 1, p50, p50, p50, 1.0, None, None)
+        baseline = {"scale": 1.0, "results": {"a": {"p50_ms": 100.0}, "b": {"p50_ms": 100.0}}}
+        rows = compare([result("a", 120.0), result("b", 130.0), result("c", 1.0)], baseline, 1.0, threshold=0.25)
+        self.assertEqual([(r["change"], r["regressed"]) for r in rows], [(0.2, False), (0.3, True), (None, False)])
+        self.assertIsNone(compare([result("a", 500.0)], baseline, 0.5)[0]["change"])
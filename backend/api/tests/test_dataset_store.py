@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from api.models import Transformation, UploadedDataset
+from api.services import dataset_store, uploads
+from api.services.dataset_store import DatasetStore
+
+
+def _frame(n: int, tag: str = "x") -> pd.DataFrame:
+    return pd.DataFrame({"v": pd.array([f"{tag}{i}" for i in range(n)], dtype="string")})
+
+
+class DatasetStoreTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def test_lru_eviction_and_transparent_reload(self):
+        store = DatasetStore(self.root, memory_budget=1)
+        a = store.create(_frame(100, "a"), "a.csv")
+        b = store.create(_frame(100, "b"), "b.csv")
+        self.assertEqual(store.stats()["resident_datasets"], 1)
+        again = store.get(a.dataset_id)
+        self.assertEqual(again.name, "a.csv")
+        pd.testing.assert_frame_equal(again.df.astype("string"), a.df)
+        self.assertIsNotNone(store.get(b.dataset_id))
+
+    def test_other_worker_updates_are_picked_up(self):
+        worker_a = DatasetStore(self.root, memory_budget=1 << 30)
+        worker_b = DatasetStore(self.root, memory_budget=1 << 30)
+        ds = worker_a.create(_frame(3), "f.csv")
+        self.assertEqual(worker_b.get(ds.dataset_id).df["v"].tolist(), ["x0", "x1", "x2"])
+        worker_a.put(ds.dataset_id, _frame(2, "y"))
+        self.assertEqual(worker_b.get(ds.dataset_id).df["v"].tolist(), ["y0", "y1"])
+        self.assertEqual(worker_b.get(ds.dataset_id).name, "f.csv")
+
+    def test_unknown_or_malformed_ids(self):
+        store = DatasetStore(self.root, memory_budget=1 << 30)
+        self.assertIsNone(store.get("0" * 32))
+        self.assertIsNone(store.get("../../etc/passwd"))
+
+    def test_reopened_frames_are_memory_mapped(self):
+        writer = DatasetStore(self.root, memory_budget=1 << 30)
+        ds = writer.create(_frame(10), "f.csv")
+        reader = DatasetStore(self.root, memory_budget=1 << 30)
+        df = reader.get(ds.dataset_id).df
+        self.assertEqual(df["v"].dtype, pd.StringDtype("pyarrow"))
+        pd.testing.assert_frame_equal(df.astype("string"), ds.df)
+
+    def test_update_lock_is_shared_between_workers(self):
+        worker_a = DatasetStore(self.root, memory_budget=1 << 30)
+        worker_b = DatasetStore(self.root, memory_budget=1 << 30)
+        ds = worker_a.create(_frame(3), "f.csv")
+        order = []
+
+        def waiter():
+            with worker_b.lock(ds.dataset_id):
+                order.append("b")
+
+        with worker_a.lock(ds.dataset_id):
+            t = threading.Thread(target=waiter)
+            t.start()
+            time.sleep(0.1)
+            order.append("a")
+        t.join(5)
+        self.assertEqual(order, ["a", "b"])
+
+    def test_prune_deletes_unused_datasets(self):
+        store = DatasetStore(self.root, memory_budget=1 << 30, retention=3600)
+        old, busy, fresh = (store.create(_frame(3), f"{n}.csv").dataset_id for n in ("old", "busy", "fresh"))
+        (Path(self.root) / f"{old}.history.json").write_text("{}")
+        past = time.time() - 7200
+        for dataset_id in (old, busy):
+            for suffix in (".arrow", ".json"):
+                os.utime(Path(self.root) / f"{dataset_id}{suffix}", (past, past))
+
+        upload = UploadedDataset.objects.create(file="uploads/old.csv", original_name="old.csv", public_id=old)
+        Transformation.objects.create(dataset=upload, natural_language="x", pattern="x")
+        with store.lock(busy):
+            self.assertEqual(store.prune(), [old])
+        self.assertFalse(UploadedDataset.objects.filter(public_id=old).exists())
+        self.assertFalse(Transformation.objects.exists())
+        self.assertIsNone(store.get(old))
+        self.assertEqual(list(Path(self.root).glob(f"{old}*")), [])
+        self.assertIsNotNone(store.get(busy))
+        self.assertIsNotNone(store.get(fresh))
+        self.assertEqual(DatasetStore(self.root, memory_budget=1, retention=0).prune(), [])
+
+    def test_lock_taken_on_a_pruned_lock_file_is_retried(self):
+        store = DatasetStore(self.root, memory_budget=1 << 30, retention=3600)
+        dataset_id = store.create(_frame(3), "f.csv").dataset_id
+        lock_path = Path(self.root) / f"{dataset_id}.lock"
+        lock_path.touch()
+        opened = []
+        real_lock_file = dataset_store._lock_file
+
+        def lock_file(fh, blocking):
+            # The first lock is granted just after prune() unlinked the file.
+            if not opened:
+                lock_path.unlink()
+            opened.append(os.fstat(fh.fileno()).st_ino)
+            return real_lock_file(fh, blocking)
+
+        with mock.patch.object(dataset_store, "_lock_file", side_effect=lock_file):
+            with store.lock(dataset_id):
+                self.assertEqual(os.stat(lock_path).st_ino, opened[-1])
+        self.assertEqual(len(opened), 2)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PersistedUploadTests(TestCase):
+    def setUp(self):
+        from django.conf import settings
+        patcher = mock.patch.object(dataset_store, "store", DatasetStore(Path(settings.MEDIA_ROOT) / "datasets", 1 << 30))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_upload_and_transform_are_recorded(self):
+        up = SimpleUploadedFile("people.csv", b"ID,Name\n1,John\n")
+        r = self.client.post("/api/upload", {"file": up})
+        self.assertEqual(r.status_code, 200)
+        dataset_id = r.json()["dataset_id"]
+        self.assertEqual((r.json()["encoding"], r.json()["delimiter"]), ("utf-8-sig", ","))
+        self.assertEqual(self.client.session["dataset_id"], dataset_id)
+
+        record = UploadedDataset.objects.get(public_id=dataset_id)
+        self.assertEqual((record.row_count, record.columns), (1, ["ID", "Name"]))
+        self.assertEqual(record.columnar_path, f"datasets/{dataset_id}.arrow")
+        self.assertTrue(record.file.name.startswith("uploads/"))
+
+        plan = json.dumps({
+            "is_table_op": True, "intent": "replace", "reason": "", "columns": ["Name"],
+            "candidates": [{"engine": "regex", "pattern": "John", "replacement": "Jon", "explanation": ""}],
+        })
+        with mock.patch("api.services.llm_client._chat_once", return_value=plan):
+            r = self.client.post("/api/transform", {"prompt": "fix name"}, content_type="application/json")
+        self.assertEqual(r.json()["data"], [["1", "Jon"]])
+        t = Transformation.objects.get(dataset=record)
+        self.assertEqual((t.intent, t.pattern, t.replacement, t.updated_cells), ("replace", "John", "Jon", 1))
+        self.assertEqual(self.client.get("/api/rows", {"changed_only": 1}).json()["row_ids"], [0])
+
+    def test_typed_upload_reports_dtypes(self):
+        up = SimpleUploadedFile("typed.csv", b"id,price,when\n1,2.5,2024-01-02\n2,,2024-03-04\n")
+        body = self.client.post("/api/upload", {"file": up, "typed": "1"}).json()
+        self.assertEqual(body["dtypes"], {"id": "integer", "price": "float", "when": "datetime"})
+        self.assertEqual(body["data"], [["1", "2.5", "2024-01-02"], ["2", "", "2024-03-04"]])
+        df = dataset_store.store.get(body["dataset_id"]).df
+        self.assertEqual(str(df["id"].dtype), "Int64")
+        r = self.client.get("/api/rows", {"dataset_id": body["dataset_id"]})
+        self.assertEqual(r.json()["data"][1], ["2", "", "2024-03-04"])
+
+    def test_reupload_is_stored_once_and_not_reparsed(self):
+        content = b"ID;Name\n1;John\n2;Jane\n"
+        first = self.client.post("/api/upload", {"file": SimpleUploadedFile("a.csv", content)}).json()
+        with mock.patch("api.views.load_to_df", side_effect=AssertionError("parsed again")):
+            second = self.client.post("/api/upload", {"file": SimpleUploadedFile("b.csv", content)}).json()
+        self.assertEqual((first["cached"], second["cached"]), (False, True))
+        self.assertEqual(second["filename"], "b.csv")
+        self.assertEqual(second["delimiter"], ";")
+        self.assertEqual(second["data"], first["data"])
+        self.assertNotEqual(second["dataset_id"], first["dataset_id"])
+
+        a, b = (UploadedDataset.objects.get(public_id=body["dataset_id"]) for body in (first, second))
+        self.assertEqual(a.file.name, b.file.name)
+        self.assertEqual(a.content_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(b.original_name, "b.csv")
+
+        # The datasets share the cached file but change independently.
+        plan = json.dumps({
+            "is_table_op": True, "intent": "replace", "reason": "", "columns": ["Name"],
+            "candidates": [{"engine": "regex", "pattern": "John", "replacement": "Jon", "explanation": ""}],
+        })
+        with mock.patch("api.services.llm_client._chat_once", return_value=plan):
+            self.client.post("/api/transform", {"prompt": "fix name"}, content_type="application/json")
+        self.assertEqual(dataset_store.store.get(second["dataset_id"]).df["Name"].tolist(), ["Jon", "Jane"])
+        self.assertEqual(dataset_store.store.get(first["dataset_id"]).df["Name"].tolist(), ["John", "Jane"])
+        third = self.client.post("/api/upload", {"file": SimpleUploadedFile("c.csv", content)}).json()
+        self.assertEqual(third["data"], [["1", "John"], ["2", "Jane"]])
+
+        typed = self.client.post("/api/upload", {"file": SimpleUploadedFile("a.csv", content), "typed": "1"}).json()
+        self.assertFalse(typed["cached"])
+
+    def test_failed_upload_keeps_shared_file(self):
+        content = b"ID\n1\n"
+        name = uploads.upload_name(hashlib.sha256(content).hexdigest(), ".txt")
+        saved = Path(settings.MEDIA_ROOT) / name
+        saved.parent.mkdir(parents=True, exist_ok=True)
+        saved.write_bytes(content)
+        UploadedDataset.objects.create(original_name="x.txt", file=name)
+
+        r = self.client.post("/api/upload", {"file": SimpleUploadedFile("y.txt", content)})
+        self.assertEqual(r.status_code, 400)
+        self.assertTrue(saved.is_file())
+        UploadedDataset.objects.all().delete()
+        r = self.client.post("/api/upload", {"file": SimpleUploadedFile("y.txt", content)})
+        self.assertFalse(saved.exists())
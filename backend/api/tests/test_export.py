@@ -0,0 +1,64 @@
+import gzip
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+
+from api.services import dataset_store
+from api.services.xlsx_reader import XlsxWorkbook
+
+
+@override_settings(EXPORT_CHUNK_ROWS=2)
+class ExportTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(dataset_store, "store", dataset_store.DatasetStore(tempfile.mkdtemp(), 1 << 30))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.df = pd.DataFrame({
+            "name": pd.array(["Ann", None, "Zoë <&>", "x,y"], dtype="string"),
+            "n": pd.array(["1", "2", "3", "4"], dtype="string"),
+        })
+        self.dataset_id = dataset_store.store.create(self.df, "people.csv").dataset_id
+
+    def _get(self, **params):
+        r = self.client.get("/api/export", {"dataset_id": self.dataset_id, **params})
+        body = b"".join(r.streaming_content) if r.streaming else r.content
+        return r, body
+
+    def test_formats_round_trip(self):
+        expected = self.df.astype(object).where(self.df.notna(), None)
+        readers = {
+            "csv": lambda b: pd.read_csv(io.BytesIO(b), dtype="string", keep_default_na=False).replace("", None),
+            "jsonl": lambda b: pd.read_json(io.BytesIO(b), lines=True, dtype=False),
+            "parquet": lambda b: pd.read_parquet(io.BytesIO(b)),
+        }
+        for fmt, read in readers.items():
+            with self.subTest(fmt=fmt):
+                r, body = self._get(format=fmt)
+                self.assertTrue(r.streaming)
+                self.assertIn(f'filename="people.{fmt}"', r["Content-Disposition"])
+                got = read(body).astype(object)
+                pd.testing.assert_frame_equal(got.where(got.notna(), None), expected, check_dtype=False)
+
+    def test_xlsx_reads_back(self):
+        _, body = self._get(format="xlsx")
+        path = Path(tempfile.mkdtemp()) / "out.xlsx"
+        path.write_bytes(body)
+        wb = XlsxWorkbook(path)
+        rows = list(wb.iter_rows(wb.sheet(None)[1]))
+        wb.close()
+        self.assertEqual(rows, [["name", "n"], ["Ann", "1"], [None, "2"], ["Zoë <&>", "3"], ["x,y", "4"]])
+
+    def test_gzip_and_column_selection(self):
+        r, body = self._get(format="csv", gzip="1", columns="n")
+        self.assertEqual(r["Content-Type"], "application/gzip")
+        self.assertIn('filename="people.csv.gz"', r["Content-Disposition"])
+        self.assertEqual(gzip.decompress(body), b"n\n1\n2\n3\n4\n")
+
+    def test_bad_requests(self):
+        self.assertEqual(self._get(format="pdf")[0].status_code, 400)
+        self.assertEqual(self._get(columns="nope")[0].status_code, 400)
+        self.assertEqual(self.client.get("/api/export", {"dataset_id": "0" * 32}).status_code, 404)
@@ -0,0 +1,189 @@
+import datetime
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import openpyxl
+import pandas as pd
+from django.test import SimpleTestCase
+
+from api.services.dataset_store import DatasetStore
+from api.services.dtypes import display_rows, string_view
+from api.services.file_io import (
+    DECODE_BLOCK_BYTES, _load_xls, _parse_csv_with_header, detect_encoding, iter_csv_chunks, iter_excel_chunks, load_to_df, sniff_csv,
+)
+from api.services.regex_engine import apply_plan, compile_pattern, compile_plan
+
+
+class StreamingCSVTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def _write(self, name: str, data: bytes) -> Path:
+        p = self.tmp / name
+        p.write_bytes(data)
+        return p
+
+    def test_chunked_load_matches_text_parse(self):
+        text = "a,a,\n1,2,3,4\n5\n6,7,8,9,10,11\n"
+        p = self._write("wide.csv", text.encode())
+        expected = _parse_csv_with_header(text)
+        for chunk_rows in (1, 2, 100):
+            got = load_to_df(p, chunk_rows=chunk_rows).df
+            pd.testing.assert_frame_equal(got, expected)
+        self.assertEqual(list(expected.columns), ["a", "a_2", "Unnamed_3", "Extra_1", "Extra_2", "Extra_3"])
+
+    def test_iter_chunks_respects_chunk_size(self):
+        p = self._write("rows.csv", b"x;y\r\n" + b"1;2\r\n" * 10)
+        sizes = [len(c) for c in iter_csv_chunks(p, chunk_rows=4)]
+        self.assertEqual(sizes, [4, 4, 2])
+
+    def test_falls_back_when_encoding_breaks_after_prefix(self):
+        p = self._write("late.csv", b"a,b\n" + b"xx,yy\n" * 60000 + "é,ü\n".encode("cp1252"))
+        self.assertEqual(sniff_csv(p).encoding, "utf-8-sig")
+        loaded = load_to_df(p, chunk_rows=10000)
+        self.assertEqual(len(loaded.df), 60001)
+        self.assertEqual(loaded.df.iloc[-1].tolist(), ["é", "ü"])
+        self.assertEqual(loaded.encoding, "cp1252")
+
+    def test_non_ascii_byte_ending_a_decode_block(self):
+        # The first non-ASCII byte is the last byte of the first block.
+        rows = (DECODE_BLOCK_BYTES - 100) // 6
+        head = b"a,b\n" + b"xx,yy\n" * rows
+        pad = b"p" * (DECODE_BLOCK_BYTES - len(head) - len(b",Caf") - 1)
+        data = head + pad + b",Caf" + "é".encode("cp1252") + b"\n" + b"zz,ww\n" * 10
+        self.assertEqual(data.index("é".encode("cp1252")), DECODE_BLOCK_BYTES - 1)
+        loaded = load_to_df(self._write("edge.csv", data), chunk_rows=50000)
+        self.assertEqual(loaded.df.iloc[rows].tolist(), [pad.decode(), "Café"])
+        self.assertEqual(loaded.encoding, "cp1252")
+
+    def test_reports_detected_encoding(self):
+        text = "nom;ville\r\nJosé;Besançon\r\nRenée;“Orléans”\r\n"
+        loaded = load_to_df(self._write("fr.csv", text.encode("cp1252")))
+        self.assertEqual((loaded.encoding, loaded.delimiter), ("cp1252", ";"))
+        self.assertGreater(loaded.encoding_confidence, 0.5)
+        self.assertEqual(loaded.df.iloc[1].tolist(), ["Renée", "“Orléans”"])
+
+
+class EncodingDetectionTests(SimpleTestCase):
+    def test_legacy_code_pages(self):
+        cases = {
+            "gb18030": "姓名,城市\n张三,北京\n这是一个测试,我们的国家\n",
+            "big5": "姓名,城市\n張三,臺北\n這是一個測試,我們的國家\n",
+            "shift_jis": "名前,都市\n田中,東京\nこれはテストです\n",
+            "cp1252": "name,city\nZoë,Köln — 5€\n",
+        }
+        for enc, text in cases.items():
+            self.assertEqual(detect_encoding(text.encode(enc), final=True).encoding, enc)
+
+    def test_boms_and_nul_lanes(self):
+        text = "a,b\n1,2\n"
+        self.assertEqual(detect_encoding(text.encode("utf-16"), final=True).encoding, "utf-16")
+        self.assertEqual(detect_encoding(text.encode("utf-8-sig"), final=True).encoding, "utf-8-sig")
+        self.assertEqual(detect_encoding(text.encode("utf-32-be"), final=True).encoding, "utf-32-be")
+        self.assertEqual(detect_encoding(text.encode("utf-16-le"), final=True).encoding, "utf-16-le")
+
+    def test_partial_trailing_character_is_not_an_error(self):
+        raw = "é".encode("utf-8") * 10
+        self.assertEqual(detect_encoding(raw[:-1], final=False).encoding, "utf-8-sig")
+
+
+class StreamingExcelTests(SimpleTestCase):
+    def setUp(self):
+        self.path = Path(tempfile.mkdtemp()) / "book.xlsx"
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "People"
+        ws.append(["id", "joined", "active", "score", "id"])
+        ws.append([1, datetime.datetime(2024, 5, 6, 7, 8, 9), True, 2.5, "a"])
+        ws.append([])
+        ws.append([3, None, False, 1e3, "c", "overflow"])
+        other = wb.create_sheet("Codes")
+        other.append(["code"])
+        other.append(["X1"])
+        wb.save(self.path)
+
+    def test_matches_read_excel_values(self):
+        loaded = load_to_df(self.path, chunk_rows=1)
+        expected = pd.read_excel(self.path, dtype="string")
+        self.assertEqual(loaded.sheet, "People")
+        self.assertEqual(list(loaded.df.columns), ["id", "joined", "active", "score", "id_2", "Extra_1"])
+        self.assertEqual(
+            loaded.df.iloc[:, :5].astype(object).where(loaded.df.iloc[:, :5].notna(), None).values.tolist(),
+            expected.astype(object).where(expected.notna(), None).iloc[:, :5].values.tolist(),
+        )
+        self.assertEqual(loaded.df["Extra_1"].tolist()[2], "overflow")
+
+    def test_blank_interior_rows_are_kept_by_both_readers(self):
+        # read_excel keeps a blank row between data rows as an all-missing row.
+        streamed = pd.concat(iter_excel_chunks(self.path, chunk_rows=1), ignore_index=True)
+        legacy = next(_load_xls(self.path, 100, None))
+        for frame in (streamed, legacy):
+            self.assertEqual(len(frame), 3)
+            self.assertTrue(frame.iloc[1].isna().all())
+            self.assertEqual(frame["id"].tolist()[::2], ["1", "3"])
+        self.assertTrue(pd.read_excel(self.path).iloc[1].isna().all())
+
+    def test_sheet_selection_and_progress(self):
+        seen = []
+        loaded = load_to_df(self.path, sheet="Codes", progress=lambda done, total: seen.append(done))
+        self.assertEqual(loaded.df["code"].tolist(), ["X1"])
+        self.assertEqual(seen, [1])
+        self.assertEqual(load_to_df(self.path, sheet=1).sheet, "Codes")
+        with self.assertRaises(ValueError):
+            load_to_df(self.path, sheet="Missing")
+
+
+class TypedLoadingTests(SimpleTestCase):
+    def setUp(self):
+        rows = ["id,code,price,flag,day,city,note"]
+        for i in range(1200):
+            note = "" if i % 7 == 0 else f"n{i}"
+            rows.append(f"{i},00{i % 9},{i % 5}.50,{'True' if i % 2 else 'False'},2024-01-{i % 28 + 1:02d},"
+                        f"{['Paris', 'Oslo', 'Rome'][i % 3]},{note}")
+        self.path = Path(tempfile.mkdtemp()) / "typed.csv"
+        self.path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+
+    def test_inferred_kinds_are_lossless(self):
+        plain = load_to_df(self.path).df
+        loaded = load_to_df(self.path, typed=True)
+        self.assertEqual(loaded.dtypes, {
+            "id": "integer", "code": "category", "price": "category", "flag": "boolean",
+            "day": "datetime", "city": "category", "note": "text",
+        })
+        self.assertIsNone(load_to_df(self.path).dtypes)
+        for col in plain.columns:
+            with self.subTest(col=col):
+                got = string_view(loaded.df[col]).fillna("")
+                self.assertEqual(got.tolist(), plain[col].fillna("").tolist())
+        self.assertEqual(display_rows(loaded.df.head(1)), [["0", "000", "0.50", "False", "2024-01-01", "Paris", ""]])
+
+    def test_regex_on_categorical_column(self):
+        df = load_to_df(self.path, typed=True).df
+        plan = compile_plan(compile_pattern("^Oslo$"), "replace", SimpleNamespace(replacement="OSLO", flags=[]))
+        out, stats = apply_plan(df, plan, ["city"])
+        self.assertEqual(stats["updated_cells"], 400)
+        self.assertEqual(out["city"].tolist()[:4], ["Paris", "OSLO", "Rome", "Paris"])
+        self.assertEqual(df["city"].tolist()[1], "Oslo")
+
+    def test_blank_cells_of_text_columns_stay_fillable(self):
+        path = self.path.with_name("blanks.csv")
+        path.write_text("n,note\n1,\n,x\n3,\n", encoding="utf-8")
+        loaded = load_to_df(path, typed=True)
+        self.assertEqual(loaded.dtypes, {"n": "integer", "note": "text"})
+        self.assertEqual(loaded.df["note"].tolist(), ["", "x", ""])
+        plan = compile_plan(compile_pattern("^$"), "replace", SimpleNamespace(replacement="N/A", flags=[]))
+        out, stats = apply_plan(loaded.df, plan, None)
+        # Blank text cells are filled; the integer column's blank is missing and stays so.
+        self.assertEqual(out["note"].tolist(), ["N/A", "x", "N/A"])
+        self.assertTrue(pd.isna(out["n"].iloc[1]))
+        self.assertEqual(stats["updated_cells"], 2)
+
+    def test_store_round_trip_keeps_dtypes(self):
+        df = load_to_df(self.path, typed=True).df
+        store = DatasetStore(tempfile.mkdtemp(), 1 << 30)
+        entry = store.create(df, "typed.csv")
+        store._forget(entry.dataset_id)
+        again = store.get(entry.dataset_id).df
+        self.assertEqual(list(again.dtypes.astype(str)), list(df.dtypes.astype(str)))
+        pd.testing.assert_frame_equal(again, df)
@@ -0,0 +1,140 @@
+import tempfile
+from unittest import mock
+
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from api import views
+from api.models import Transformation
+from api.services import dataset_store
+from api.services.history import HistoryLog
+from api.tests.helpers import llm_plan
+
+
+class HistoryTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(dataset_store, "store", dataset_store.DatasetStore(tempfile.mkdtemp(), 1 << 30))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        df = pd.DataFrame({
+            "name": pd.array(["ann", "bob", None, "cat"], dtype="string"),
+            "code": pd.array(["a1", "b2", "c3", "d4"], dtype="string"),
+        })
+        self.dataset_id = dataset_store.store.create(df, "people.csv").dataset_id
+
+    def _transform(self, pattern, replacement):
+        with mock.patch("api.views.compile_regex_plan", return_value=llm_plan((pattern, replacement))):
+            r = self.client.post(
+                "/api/transform", {"prompt": f"{pattern} -> {replacement}", "dataset_id": self.dataset_id},
+                content_type="application/json",
+            )
+        self.assertEqual(r.status_code, 200)
+        return r.json()
+
+    def _action(self, action, **body):
+        return self.client.post(
+            f"/api/history/{action}", {"dataset_id": self.dataset_id, **body}, content_type="application/json"
+        )
+
+    def _frame(self):
+        return dataset_store.store.get(self.dataset_id).df.astype(object).where(lambda d: d.notna(), None).values.tolist()
+
+    def test_undo_redo_and_jump(self):
+        original = self._frame()
+        self._transform("a", "A")
+        after_first = self._frame()
+        body = self._transform(r"\d", "#")
+        self.assertEqual(body["history"]["cursor"], 2)
+        self.assertEqual([s["cells"] for s in body["history"]["steps"]], [3, 4])
+
+        r = self._action("undo")
+        self.assertEqual(r.json()["stats"]["updated_rows"], 4)
+        self.assertEqual(self._frame(), after_first)
+        self.assertEqual(list(dataset_store.store.changed_rows(self.dataset_id)), [0, 1, 2, 3])
+
+        self._action("jump", step=0)
+        self.assertEqual(self._frame(), original)
+        self.assertFalse(self.client.get("/api/history", {"dataset_id": self.dataset_id}).json()["history"]["can_undo"])
+
+        r = self._action("redo")
+        self.assertEqual(r.json()["history"]["cursor"], 1)
+        self.assertEqual(self._frame(), after_first)
+
+    def test_new_transform_discards_redo_branch(self):
+        self._transform("a", "A")
+        self._transform(r"\d", "#")
+        self._action("undo")
+        body = self._transform("b", "B")
+        self.assertEqual([s["id"] for s in body["history"]["steps"]], [1, 2])
+        self.assertFalse(body["history"]["can_redo"])
+        self.assertEqual(self._action("redo").status_code, 409)
+
+    @override_settings(HISTORY_BUDGET_BYTES=1)
+    def test_budget_drops_oldest_steps(self):
+        self._transform("a", "A")
+        body = self._transform(r"\d", "#")
+        self.assertEqual([s["id"] for s in body["history"]["steps"]], [2])
+        self.assertEqual(body["history"]["floor"], 1)
+        self.assertEqual(self._action("jump", step=0).status_code, 409)
+        self.assertEqual(self._action("undo").status_code, 200)
+        self.assertEqual(self._action("undo").status_code, 409)
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_typed_columns_round_trip(self):
+        up = SimpleUploadedFile("typed.csv", b"id,price,note\n1,2.5,x\n22,,y\n")
+        self.dataset_id = self.client.post("/api/upload", {"file": up, "typed": "1"}).json()["dataset_id"]
+        original = self._frame()
+        dtypes = dataset_store.store.get(self.dataset_id).df.dtypes.tolist()
+        self._transform(r"\d", "X")
+        self.assertEqual(self._frame(), [["X", "X.X", "x"], ["XX", None, "y"]])
+        self.assertEqual(self._action("undo").status_code, 200)
+        self.assertEqual(self._frame(), original)
+        self.assertEqual(dataset_store.store.get(self.dataset_id).df.dtypes.tolist(), dtypes)
+
+    def _failing_transform(self, target, method):
+        with mock.patch.object(target, method, side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self._transform("a", "A")
+
+    def test_failed_history_write_leaves_dataset_unchanged(self):
+        self._transform(r"\d", "#")
+        before = self._frame()
+        self._failing_transform(HistoryLog, "_write_step")
+        self.assertEqual(self._frame(), before)
+        state = self.client.get("/api/history", {"dataset_id": self.dataset_id}).json()["history"]
+        self.assertEqual((state["cursor"], [s["id"] for s in state["steps"]]), (1, [1]))
+        self.assertFalse(Transformation.objects.filter(natural_language="a -> A").exists())
+
+    def test_failed_store_write_rolls_back_history(self):
+        before = self._frame()
+        self._failing_transform(dataset_store.DatasetStore, "put")
+        self.assertEqual(self._frame(), before)
+        state = self.client.get("/api/history", {"dataset_id": self.dataset_id}).json()["history"]
+        self.assertEqual((state["cursor"], state["steps"]), (0, []))
+        self.assertEqual(self._transform("a", "A")["history"]["cursor"], 1)
+
+    def test_failed_store_write_keeps_history_cursor(self):
+        self._transform("a", "A")
+        after = self._frame()
+        with mock.patch.object(dataset_store.DatasetStore, "put", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self._action("undo")
+        self.assertEqual(self._frame(), after)
+        self.assertEqual(self.client.get("/api/history", {"dataset_id": self.dataset_id}).json()["history"]["cursor"], 1)
+        r = self._action("undo")
+        self.assertEqual(r.json()["history"]["cursor"], 0)
+        self.assertEqual(r.json()["stats"]["updated_rows"], 2)
+
+    def test_updates_apply_to_the_latest_version(self):
+        # A second update planned against an older version must not undo the first.
+        stale = dataset_store.store.get(self.dataset_id)
+        self._transform("a", "A")
+        payload, code = views._run_transform(stale, "b -> B", llm_plan(("b", "B")), {})
+        self.assertEqual(code, 200)
+        self.assertEqual([s["id"] for s in payload["history"]["steps"]], [1, 2])
+        self.assertEqual([row[0] for row in self._frame()], ["Ann", "BoB", None, "cAt"])
+
+    def test_bad_requests(self):
+        self.assertEqual(self._action("jump", step="x").status_code, 400)
+        self.assertEqual(self._action("rewind").status_code, 404)
@@ -0,0 +1,82 @@
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from api.services import dataset_store, jobs
+from api.services.llm_client import CompilePlan
+
+PLAN = CompilePlan.model_validate({
+    "is_table_op": True,
+    "intent": "replace",
+    "reason": "",
+    "columns": ["Name"],
+    "candidates": [{"engine": "regex", "pattern": "John", "flags": [], "replacement": "Jon", "explanation": ""}],
+})
+
+
+@override_settings(JOB_EAGER=True, MEDIA_ROOT=tempfile.mkdtemp())
+class EagerJobTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(dataset_store, "store", dataset_store.DatasetStore(tempfile.mkdtemp(), 1 << 30))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_upload_and_transform_as_jobs(self):
+        up = SimpleUploadedFile("people.csv", b"ID,Name\n1,John\n2,Ann\n")
+        r = self.client.post("/api/upload?async=1", {"file": up})
+        self.assertEqual(r.status_code, 202)
+        job = self.client.get(f"/api/jobs/{r.json()['job_id']}").json()
+        self.assertEqual((job["status"], job["progress"]["stage"]), ("succeeded", "parsing"))
+        self.assertEqual(job["result"]["data"], [["1", "John"], ["2", "Ann"]])
+        self.assertEqual(self.client.session["dataset_id"], job["dataset_id"])
+
+        with mock.patch("api.views.compile_regex_plan", return_value=PLAN):
+            r = self.client.post("/api/transform", {"prompt": "fix names", "async": True}, content_type="application/json")
+        job = self.client.get(f"/api/jobs/{r.json()['job_id']}").json()
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["result"]["data"], [["1", "Jon"], ["2", "Ann"]])
+        self.assertEqual(job["progress"]["stage"], "saving")
+
+    def test_failed_job_keeps_error(self):
+        up = SimpleUploadedFile("notes.txt", b"hello")
+        r = self.client.post("/api/upload", {"file": up, "async": "1"})
+        job = self.client.get(f"/api/jobs/{r.json()['job_id']}").json()
+        self.assertEqual((job["status"], job["status_code"]), ("failed", 400))
+        self.assertIn("Unsupported file type", job["error"])
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get("/api/jobs/nope").status_code, 404)
+        self.assertEqual(self.client.post("/api/jobs/nope/cancel").status_code, 404)
+
+
+@override_settings(JOB_EAGER=False)
+class BackgroundJobTests(TransactionTestCase):
+    def _wait(self, job_id, statuses, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = self.client.get(f"/api/jobs/{job_id}").json()
+            if job["status"] in statuses:
+                return job
+            time.sleep(0.02)
+        self.fail(f"job {job_id} never reached {statuses}")
+
+    def test_running_job_reports_progress_and_cancels(self):
+        release = threading.Event()
+
+        def work(ctx):
+            ctx.set_stage("counting", total=1000)
+            for i in range(1000):
+                ctx.progress(i)
+                ctx.flush()
+                release.wait(0.01)
+            return {}, 200
+
+        job = jobs.submit("test", work)
+        running = self._wait(job.job_id, {"running"})
+        self.assertEqual(running["progress"]["total"], 1000)
+        self.assertEqual(self.client.post(f"/api/jobs/{job.job_id}/cancel").json()["cancel_requested"], True)
+        self.assertEqual(self._wait(job.job_id, {"cancelled", "succeeded"})["status"], "cancelled")
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import pandas as pd
+from django.test import TransactionTestCase
+
+from api.services import dataset_store, llm_async, llm_client, plan_cache
+
+PLAN = {
+    "is_table_op": True,
+    "intent": "mask",
+    "reason": "emails",
+    "columns": [],
+    "candidates": [{"engine": "regex", "pattern": r"\S+@\S+", "replacement": "***", "explanation": ""}],
+}
+
+
+class _StubOllama(BaseHTTPRequestHandler):
+    """Stands in for the Ollama /api/chat endpoint."""
+
+    calls = 0
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = type(self)
+        with cls.lock:
+            cls.calls += 1
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        time.sleep(0.1)
+        with cls.lock:
+            cls.active -= 1
+        out = json.dumps({"model": body["model"], "message": {"role": "assistant", "content": json.dumps(PLAN)}})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class AsyncPlannerTests(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllama)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _StubOllama.calls = _StubOllama.peak = 0
+        host = f"http://127.0.0.1:{self.server.server_address[1]}"
+        for target, attr, value in (
+            (llm_client, "OLLAMA_HOST", host),
+            (plan_cache.cache, "ttl_seconds", 0),
+            (dataset_store, "store", dataset_store.DatasetStore(tempfile.mkdtemp(), 1 << 30)),
+        ):
+            patcher = mock.patch.object(target, attr, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _run(self, *coros):
+        async def main():
+            try:
+                return await asyncio.gather(*coros)
+            finally:
+                await llm_async.aclose()
+        return asyncio.run(main())
+
+    def test_identical_prompts_coalesce(self):
+        plans = self._run(*[llm_async.acompile_regex_plan("mask emails", ["Email"]) for _ in range(5)])
+        self.assertEqual(_StubOllama.calls, 1)
+        self.assertEqual({p.intent for p in plans}, {"mask"})
+
+    def test_concurrency_is_bounded(self):
+        with mock.patch.object(llm_async, "MAX_CONCURRENCY", 2):
+            self._run(*[llm_async.acompile_regex_plan(f"mask emails {i}") for i in range(6)])
+        self.assertEqual(_StubOllama.calls, 6)
+        self.assertLessEqual(_StubOllama.peak, 2)
+
+    def test_async_transform_view(self):
+        df = pd.DataFrame({"Email": pd.array(["a@b.com", "none"], dtype="string")})
+        dataset_id = dataset_store.store.create(df, "emails.csv").dataset_id
+
+        async def call():
+            return await self.async_client.post(
+                "/api/transform-async", {"prompt": "mask emails", "dataset_id": dataset_id},
+                content_type="application/json",
+            )
+
+        (r,) = self._run(call())
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["data"], [["***"], ["none"]])
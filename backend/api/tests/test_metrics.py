@@ -0,0 +1,120 @@
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+
+from api.services import dataset_store, llm_client, metrics
+from api.tests.helpers import llm_plan
+
+
+CSV = """ID,Name,Email\n1,John,john@example.com\n2,Jane,jane@site.org\n""".encode()
+
+
+class RegistryTests(SimpleTestCase):
+    def test_render_counters_and_histograms(self):
+        reg = metrics.Registry()
+        hits = reg.counter("t_hits_total", "Hits.", ("kind",))
+        lat = reg.histogram("t_seconds", "Latency.", ("stage",), buckets=(0.1, 1))
+        hits.inc(kind="a")
+        hits.inc(2, kind="a")
+        hits.inc(kind='b"')
+        lat.observe(0.05, stage="x")
+        lat.observe(0.5, stage="x")
+
+        text = reg.render()
+        self.assertIn("# TYPE t_hits_total counter", text)
+        self.assertIn('t_hits_total{kind="a"} 3', text)
+        self.assertIn('t_hits_total{kind="b\\""} 1', text)
+        self.assertIn('t_seconds_bucket{stage="x",le="0.1"} 1', text)
+        self.assertIn('t_seconds_bucket{stage="x",le="1"} 2', text)
+        self.assertIn('t_seconds_bucket{stage="x",le="+Inf"} 2', text)
+        self.assertIn('t_seconds_count{stage="x"} 2', text)
+        self.assertIn('t_seconds_sum{stage="x"} 0.55', text)
+
+    def test_spans_collect_into_trace(self):
+        with metrics.tracing() as trace:
+            with metrics.span("a"):
+                pass
+            metrics.record("b", 0.25)
+            metrics.record("b", 0.25)
+        self.assertEqual([s for s, _ in trace], ["a", "b", "b"])
+        header = metrics.server_timing(trace)
+        self.assertIn('b;dur=500.0;desc="x2"', header)
+
+    def test_carry_context_brings_thread_spans_into_trace(self):
+        def work(stage):
+            metrics.record(stage, 0.1)
+
+        with metrics.tracing() as trace:
+            with ThreadPoolExecutor(max_workers=2) as ex:
+                list(ex.map(work, ["lost"]))
+                list(ex.map(metrics.carry_context(work), ["a", "b", "c"]))
+        self.assertEqual(sorted(s for s, _ in trace), ["a", "b", "c"])
+
+    def test_llm_attempts_counted_by_outcome(self):
+        before = {o: metrics.LLM_CALLS.get(outcome=o) for o in ("ok", "error", "invalid")}
+        with llm_client.count_attempt():
+            pass
+        with self.assertRaises(llm_client.LLMCallError):
+            with llm_client.count_attempt():
+                raise llm_client.LLMCallError("down")
+        with self.assertRaises(llm_client.LLMBadJSON):
+            with llm_client.count_attempt():
+                raise llm_client.LLMBadJSON("{")
+        for outcome in ("ok", "error", "invalid"):
+            self.assertEqual(metrics.LLM_CALLS.get(outcome=outcome), before[outcome] + 1)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        patcher = mock.patch.object(dataset_store, "store", dataset_store.DatasetStore(tempfile.mkdtemp(), 1 << 30))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _upload(self):
+        up = SimpleUploadedFile("sample.csv", CSV, content_type="text/csv")
+        r = self.client.post("/api/upload", {"file": up})
+        self.assertEqual(r.status_code, 200)
+        return r
+
+    def test_upload_and_transform_report_stages(self):
+        r = self._upload()
+        self.assertIn("parse;dur=", r["Server-Timing"])
+        self.assertIn("upload-write;dur=", r["Server-Timing"])
+
+        plan = llm_plan((r"[\w.]+@[\w.]+", "REDACTED"), intent="mask")
+        with mock.patch("api.views.compile_regex_plan", return_value=plan):
+            r = self.client.post("/api/transform", {"prompt": "mask emails"}, content_type="application/json")
+        self.assertEqual(r.status_code, 200)
+        timing = r["Server-Timing"]
+        for stage in ("regex-compile", "evaluate", "materialize", "store-write", "serialize"):
+            self.assertIn(f"{stage};dur=", timing)
+
+    def test_metrics_endpoint(self):
+        self._upload()
+        r = self.client.get("/metrics")
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = r.content.decode()
+        self.assertIn('rhombus_http_requests_total{route="api/upload",method="POST",status="200"}', text)
+        self.assertIn('rhombus_stage_seconds_count{stage="parse"}', text)
+        self.assertIn('rhombus_rows_total{stage="load"}', text)
+        self.assertIn("rhombus_dataset_store_resident_bytes", text)
+        self.assertIn("rhombus_plan_cache_events_total", text)
+
+    def test_profile_header_writes_stats(self):
+        out = Path(tempfile.mkdtemp())
+        with override_settings(PROFILE_REQUESTS=True, PROFILE_DIR=out):
+            r = self.client.get("/api/history", HTTP_X_PROFILE="1")
+            plain = self.client.get("/api/history")
+        self.assertTrue((out / r["X-Profile"]).is_file())
+        self.assertNotIn("X-Profile", plain)
+
+        with override_settings(PROFILE_REQUESTS=False, PROFILE_DIR=out):
+            r = self.client.get("/api/history", HTTP_X_PROFILE="1")
+        self.assertNotIn("X-Profile", r)
@@ -0,0 +1,92 @@
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+import pandas as pd
+from django.test import SimpleTestCase, TestCase
+
+from api.services import dataset_store
+from api.services.pattern_safety import analyze_pattern, assess
+from api.services.regex_engine import PatternTimeout, column_changes, compile_pattern, compile_plan, evaluate_plans
+from api.tests.helpers import llm_plan
+
+# Blows up in the `regex` engine too: every split of the run into a/aa is tried.
+EVIL = r"^(a|aa)+$"
+EVIL_CELL = "a" * 40 + "!"
+
+
+def _compiled(pattern, replacement="#"):
+    return compile_plan(compile_pattern(pattern), "replace", SimpleNamespace(replacement=replacement, flags=[]))
+
+
+class AnalyzerTests(SimpleTestCase):
+    def test_verdicts(self):
+        cases = {
+            r"(a+)+$": "exponential",
+            r"(\w+\s?)*$": "exponential",
+            r"^(a|ab|abc)*$": "exponential",
+            EVIL: "exponential",
+            r"\d+\d+x": "polynomial",
+            r"(\d+,)*": "safe",
+            r"([a-z]+\.)+com": "safe",
+            r"(?>a+)+$": "safe",
+            r"(a++)+$": "safe",
+            r"\S+@\S+\.\w+": "polynomial",
+        }
+        for pattern, level in cases.items():
+            with self.subTest(pattern=pattern):
+                self.assertEqual(analyze_pattern(pattern).level, level)
+
+    def test_unparseable_pattern_is_unknown(self):
+        self.assertEqual(analyze_pattern(r"\p{Lu}+(?V1)[[a-z]--[aeiou]]").level, "unknown")
+
+
+class AssessTests(SimpleTestCase):
+    def test_pathological_pattern_is_rejected(self):
+        safety = assess(_compiled(EVIL), ["hello"], cell_timeout=0.05, column_timeout=1, budget_us=200)
+        self.assertEqual(safety.verdict, "reject")
+        self.assertTrue(safety.bench.timed_out)
+
+    def test_risky_pattern_is_guarded(self):
+        plan = _compiled(r"(\w+\s?)*$")
+        safety = assess(plan, ["hello world"], cell_timeout=0.05, column_timeout=1, budget_us=10_000)
+        self.assertEqual(safety.verdict, "ok")
+        self.assertEqual(plan.cell_timeout, 0.05)
+
+    def test_safe_pattern_runs_unguarded(self):
+        plan = _compiled(r"\d+")
+        self.assertEqual(assess(plan, ["a1"], 0.05, 1, 10_000).verdict, "ok")
+        self.assertIsNone(plan.cell_timeout)
+
+    def test_guarded_plan_times_out(self):
+        plan = _compiled(EVIL)
+        plan.cell_timeout, plan.column_timeout = 0.05, 1
+        s = pd.Series([EVIL_CELL], dtype="string")
+        with self.assertRaises(PatternTimeout):
+            column_changes(plan, s)
+        (ev,) = evaluate_plans(pd.DataFrame({"c": s}), [plan], ["c"])
+        self.assertTrue(ev.stats["timed_out"])
+        self.assertEqual(ev.changes, {})
+
+    def test_compiled_patterns_are_cached(self):
+        self.assertIs(compile_pattern(r"\d+", ["IGNORECASE"]), compile_pattern(r"\d+", ["ignorecase"]))
+
+
+class TransformScreeningTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(dataset_store, "store", dataset_store.DatasetStore(tempfile.mkdtemp(), 1 << 30))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        df = pd.DataFrame({"v": pd.array([EVIL_CELL, "aaa!", "b"], dtype="string")})
+        self.dataset_id = dataset_store.store.create(df, "v.csv").dataset_id
+
+    def test_pathological_candidate_is_rejected(self):
+        plan = llm_plan((EVIL, "x"), (r"!", "."))
+        with mock.patch("api.views.compile_regex_plan", return_value=plan):
+            r = self.client.post("/api/transform", {"prompt": "p", "dataset_id": self.dataset_id},
+                                 content_type="application/json")
+        body = r.json()
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(body["pattern"], "!")
+        self.assertEqual([c["pattern"] for c in body["rejected_candidates"]], [EVIL])
+        self.assertEqual(body["rejected_candidates"][0]["safety"]["verdict"], "reject")
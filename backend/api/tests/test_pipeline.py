@@ -0,0 +1,72 @@
+import tempfile
+from unittest import mock
+
+import pandas as pd
+from django.test import TestCase
+
+from api.services import dataset_store
+from api.tests.helpers import llm_plan
+
+
+class PipelineTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(dataset_store, "store", dataset_store.DatasetStore(tempfile.mkdtemp(), 1 << 30))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        df = pd.DataFrame({
+            "name": pd.array(["  Ann  ", "Bob", None], dtype="string"),
+            "email": pd.array(["ann@x.com", "bob@y.org", "n/a"], dtype="string"),
+        })
+        self.dataset_id = dataset_store.store.create(df, "people.csv").dataset_id
+
+    def _post(self, steps, **body):
+        return self.client.post(
+            "/api/pipeline", {"steps": steps, "dataset_id": self.dataset_id, **body}, content_type="application/json",
+        )
+
+    def test_steps_run_in_order_as_one_history_step(self):
+        mask = llm_plan((r"\S+@\S+", "***"), (r"@", "[at]"), intent="mask")
+        with mock.patch("api.views.compile_regex_plan", return_value=mask) as planner:
+            r = self._post([
+                {"pattern": r"^\s*(.*?)\s*$", "intent": "normalize", "format": "$1", "columns": ["name"]},
+                {"prompt": "mask emails", "columns": ["email"]},
+                {"pattern": r"\*+", "replacement": "<hidden>", "columns": ["email"]},
+            ])
+        self.assertEqual(planner.call_count, 1)
+        body = r.json()
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(body["data"], [["Ann", "<hidden>"], ["Bob", "<hidden>"], ["", "n/a"]])
+        self.assertEqual([s["pattern"] for s in body["steps"]], [r"^\s*(.*?)\s*$", r"\S+@\S+", r"\*+"])
+        self.assertEqual([s["stats"]["updated_cells"] for s in body["steps"]], [1, 2, 2])
+        self.assertEqual(body["stats"], {"updated_rows": 2, "updated_cells": 3})
+        self.assertEqual(len(body["history"]["steps"]), 1)
+
+        self.client.post("/api/history/undo", {"dataset_id": self.dataset_id}, content_type="application/json")
+        self.assertEqual(dataset_store.store.get(self.dataset_id).df["name"].iloc[0], "  Ann  ")
+
+    def test_split_step_adds_columns_later_steps_can_target(self):
+        r = self._post([
+            {"pattern": "@", "intent": "split", "columns": ["email"]},
+            {"pattern": r"\.", "replacement": "_", "columns": ["email_2"]},
+        ])
+        body = r.json()
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(body["headers"], ["name", "email", "email_1", "email_2"])
+        self.assertEqual([row[2:] for row in body["data"]], [["ann", "x_com"], ["bob", "y_org"], ["n/a", ""]])
+        self.assertEqual(body["added_columns"], ["email_1", "email_2"])
+
+        self.client.post("/api/history/undo", {"dataset_id": self.dataset_id}, content_type="application/json")
+        self.assertEqual(list(dataset_store.store.get(self.dataset_id).df.columns), ["name", "email"])
+        self.client.post("/api/history/redo", {"dataset_id": self.dataset_id}, content_type="application/json")
+        df = dataset_store.store.get(self.dataset_id).df
+        self.assertEqual(df["email_2"].tolist(), ["x_com", "y_org", pd.NA])
+
+    def test_invalid_steps_are_rejected(self):
+        for steps in ([], "trim", [{"columns": ["name"]}], [{"pattern": "x", "intent": "bogus"}]):
+            with self.subTest(steps=steps):
+                self.assertEqual(self._post(steps).status_code, 400)
+
+    def test_failing_step_reports_its_index(self):
+        r = self._post([{"pattern": "a", "replacement": "b"}, {"pattern": "(", "replacement": "x"}])
+        self.assertEqual(r.status_code, 422)
+        self.assertEqual(r.json()["step"], 2)
@@ -0,0 +1,77 @@
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from api.models import PlanCacheEntry
+from api.services import llm_client, plan_cache
+
+PLAN = {
+    "is_table_op": True,
+    "intent": "mask",
+    "reason": "emails",
+    "columns": [],
+    "candidates": [{"engine": "regex", "pattern": r"\S+@\S+", "replacement": "***", "explanation": ""}],
+}
+
+
+class PlanCacheTests(TestCase):
+    def setUp(self):
+        plan_cache.cache.clear()
+        patcher = mock.patch.object(llm_client, "_chat_once", return_value=json.dumps(PLAN))
+        self.chat = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeat_prompt_skips_model(self):
+        first = llm_client.compile_regex_plan("Mask all  emails", ["Email"])
+        second = llm_client.compile_regex_plan(" Mask all emails ", ["Email"])
+        self.assertEqual(first, second)
+        self.assertEqual(self.chat.call_count, 1)
+        self.assertEqual(plan_cache.cache.counters["memory_hits"], 1)
+
+    def test_key_includes_columns(self):
+        llm_client.compile_regex_plan("Mask all emails", ["Email"])
+        llm_client.compile_regex_plan("Mask all emails", ["Contact"])
+        self.assertEqual(self.chat.call_count, 2)
+
+    def test_profile_goes_into_prompt_and_key(self):
+        profile = [{"name": "Email", "kind": "text", "filled": 0.5, "sample_distinct": 2, "examples": ["a@x.com"]}]
+        llm_client.compile_regex_plan("Mask all emails", ["Email"], profile=profile)
+        llm_client.compile_regex_plan("Mask all emails", ["Email"], profile=profile)
+        llm_client.compile_regex_plan("Mask all emails", ["Email"])
+        self.assertEqual(self.chat.call_count, 2)
+        self.assertIn('- "Email" | text | 50% | "a@x.com"', self.chat.call_args_list[0].args[0])
+
+    def test_key_ignores_profile_statistics(self):
+        profile = [{"name": "Email", "kind": "text", "filled": 0.5, "sample_distinct": 2, "examples": ["a@x.com"]}]
+        next_file = [{**profile[0], "filled": 0.9, "sample_distinct": 40, "examples": ["b@y.org"]}]
+        llm_client.compile_regex_plan("Mask all emails", ["Email"], profile=profile)
+        llm_client.compile_regex_plan("Mask all emails", ["Email"], profile=next_file)
+        self.assertEqual(self.chat.call_count, 1)
+        llm_client.compile_regex_plan("Mask all emails", ["Email"], profile=[{**profile[0], "kind": "integer"}])
+        self.assertEqual(self.chat.call_count, 2)
+
+    def test_database_tier_survives_memory_loss(self):
+        llm_client.compile_regex_plan("Mask all emails", ["Email"])
+        plan_cache.cache._memory.clear()
+        llm_client.compile_regex_plan("Mask all emails", ["Email"])
+        self.assertEqual(self.chat.call_count, 1)
+        self.assertEqual(plan_cache.cache.counters["disk_hits"], 1)
+        self.assertEqual(PlanCacheEntry.objects.get().hits, 1)
+
+    def test_disk_tier_bounded(self):
+        cache = plan_cache.PlanCache(memory_entries=1, disk_entries=2, ttl_seconds=60)
+        for i in range(4):
+            cache.put(f"k{i}", PLAN)
+        self.assertEqual(len(cache._memory), 1)
+        self.assertEqual(PlanCacheEntry.objects.count(), 2)
+
+    def test_expired_entries_miss(self):
+        cache = plan_cache.PlanCache(memory_entries=4, disk_entries=4, ttl_seconds=60)
+        with mock.patch("api.services.plan_cache.time.time", return_value=0):
+            cache.put("k", PLAN)
+        self.assertIsNotNone(cache.get("k"))
+        cache._memory["k"] = (0, PLAN)
+        PlanCacheEntry.objects.update(created_at="2000-01-01T00:00:00Z")
+        self.assertIsNone(cache.get("k"))
+        self.assertFalse(PlanCacheEntry.objects.exists())
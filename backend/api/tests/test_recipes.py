@@ -0,0 +1,110 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from api.models import Recipe, Transformation, UploadedDataset
+from api.services import dataset_store
+from api.services.recipes import RecipeError, normalize_steps
+from api.tests.helpers import llm_plan
+
+STEPS = [
+    {"pattern": r"\S+@\S+", "intent": "mask", "replacement": "***", "columns": ["email"]},
+    {"pattern": r"(\d{3})(\d{4})", "intent": "normalize", "format": "$1-$2"},
+]
+
+
+class RecipeApiTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(dataset_store, "store", dataset_store.DatasetStore(tempfile.mkdtemp(), 1 << 30))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _dataset(self, emails):
+        df = pd.DataFrame({"email": pd.array(emails, dtype="string")})
+        dataset_id = dataset_store.store.create(df, "e.csv").dataset_id
+        UploadedDataset.objects.create(original_name="e.csv", public_id=dataset_id, file="uploads/e.csv")
+        return dataset_id
+
+    def test_save_from_transformations_and_replay_without_llm(self):
+        first = self._dataset(["a@b.com", "x"])
+        with mock.patch("api.views.compile_regex_plan", return_value=llm_plan((r"\S+@\S+", "***"), intent="mask")):
+            r = self.client.post("/api/transform", {"prompt": "mask emails", "dataset_id": first},
+                                 content_type="application/json")
+        tid = r.json()["transformation_id"]
+        self.assertEqual(Transformation.objects.get(pk=tid).pattern, r"\S+@\S+")
+
+        r = self.client.post("/api/recipes", {"name": "mask", "transformations": [tid]}, content_type="application/json")
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(r.json()["steps"][0]["prompt"], "mask emails")
+        dup = self.client.post("/api/recipes", {"name": "mask", "transformations": [tid]}, content_type="application/json")
+        self.assertEqual(dup.status_code, 409)
+
+        second = self._dataset(["c@d.org", "e@f.net"])
+        with mock.patch("api.views.compile_regex_plan") as planner:
+            r = self.client.post("/api/recipes/mask/apply", {"dataset_id": second}, content_type="application/json")
+        planner.assert_not_called()
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["data"], [["***"], ["***"]])
+        self.assertEqual(self.client.get("/api/recipes").json()["recipes"][0]["name"], "mask")
+
+    def test_invalid_recipes_are_rejected(self):
+        for body in (
+            {"name": "x", "steps": [{"prompt": "needs the LLM"}]},
+            {"name": "x", "steps": [{"pattern": "a", "intent": "extract"}]},
+            {"name": "x", "transformations": [999]},
+            {"steps": STEPS},
+        ):
+            with self.subTest(body=body):
+                self.assertEqual(self.client.post("/api/recipes", body, content_type="application/json").status_code, 400)
+
+    def test_normalize_steps_fills_defaults(self):
+        (step,) = normalize_steps([{"pattern": "a", "replacement": "b"}])
+        self.assertEqual(step["intent"], "replace")
+        self.assertEqual(step["columns"], [])
+        with self.assertRaises(RecipeError):
+            normalize_steps([{"pattern": "a"}])
+
+    @override_settings(PIPELINE_MAX_STEPS=2)
+    def test_step_count_is_capped(self):
+        with self.assertRaises(RecipeError):
+            normalize_steps(STEPS + STEPS[:1])
+        # Saved before the cap was lowered: refused, not a server error.
+        Recipe.objects.create(name="long", steps=normalize_steps(STEPS) + normalize_steps(STEPS[:1]))
+        r = self.client.post("/api/recipes/long/apply", {"dataset_id": self._dataset(["a@b.com"])},
+                             content_type="application/json")
+        self.assertEqual(r.status_code, 400)
+
+
+@override_settings(RECIPE_WORKERS=1)
+class ApplyRecipeCommandTests(TestCase):
+    def setUp(self):
+        Recipe.objects.create(name="clean", steps=normalize_steps(STEPS))
+        self.src = Path(tempfile.mkdtemp())
+        self.out = Path(tempfile.mkdtemp())
+        (self.src / "a.csv").write_text("email;phone\nann@x.com;5551234\nnone;n/a\n", encoding="cp1252")
+        (self.src / "nested").mkdir()
+        (self.src / "nested" / "b.csv").write_text("email,phone\nbob@y.org,5559876\n", encoding="utf-8")
+        (self.src / "notes.txt").write_text("ignored")
+
+    def _call(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command("apply_recipe", "clean", str(self.src), "--out", str(self.out), *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_directory_is_streamed_to_csv(self):
+        out, _ = self._call("--chunk-rows", "1", "--workers", "2")
+        self.assertIn("2/2 files written", out)
+        self.assertEqual((self.out / "a.csv").read_text(encoding="utf-8"), "email;phone\n***;555-1234\nnone;n/a\n")
+        self.assertEqual((self.out / "nested" / "b.csv").read_text(encoding="utf-8"), "email,phone\n***,555-9876\n")
+
+    def test_existing_outputs_are_skipped_and_unknown_recipe_fails(self):
+        self._call()
+        _, err = self._call()
+        self.assertIn("exists", err)
+        with self.assertRaises(CommandError):
+            call_command("apply_recipe", "missing", str(self.src), "--out", str(self.out))
@@ -0,0 +1,221 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pandas as pd
+import regex as re
+from django.test import SimpleTestCase
+
+from api.services import regex_engine
+from api.services.regex_engine import (
+    _dictionary, apply_plan, column_changes, compile_plan, evaluate_pipeline, evaluate_plans, materialize,
+    required_literal,
+)
+
+
+def _cand(**kw):
+    return SimpleNamespace(**{"replacement": None, "format": None, "flags": [], **kw})
+
+
+class RegexEngineTests(SimpleTestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "email": pd.array(["john@example.com", None, "plain"], dtype="string"),
+            "name": pd.array(["José", "Zoë", "Ann"], dtype="string"),
+        })
+
+    def _run(self, pattern, intent, cand, columns=None):
+        plan = compile_plan(re.compile(pattern, re.UNICODE), intent, cand)
+        return plan, apply_plan(self.df, plan, columns)
+
+    def test_mask_uses_arrow_on_ascii_and_keeps_missing(self):
+        plan, (out, stats) = self._run(r"[\w.]+@[\w.]+", "mask", _cand(replacement="REDACTED"), ["email"])
+        self.assertIsNotNone(plan.arrow_pattern)
+        self.assertEqual(out["email"].tolist(), ["REDACTED", pd.NA, "plain"])
+        self.assertEqual(stats["updated_cells"], 1)
+        self.assertEqual(stats["updated_rows"], 1)
+
+    def test_normalize_backrefs_and_untouched_columns_shared(self):
+        _, (out, stats) = self._run(r"(\w+)@(\w+)\.com", "normalize", _cand(format="$2/$1"))
+        self.assertEqual(out.loc[0, "email"], "example/john")
+        self.assertEqual(stats["target_cols"], ["email", "name"])
+        self.assertIs(out["name"].array, self.df["name"].array)
+        self.assertEqual(self.df.loc[0, "email"], "john@example.com")
+
+    def test_regex_only_features_fall_back(self):
+        plan, (out, stats) = self._run(r"\p{Lu}", "replace", _cand(replacement="_"), ["name"])
+        self.assertIsNone(plan.std_obj)
+        self.assertEqual(out["name"].tolist(), ["_osé", "_oë", "_nn"])
+        self.assertEqual(stats["updated_cells"], 3)
+
+    def test_noop_intent_returns_frame_unchanged(self):
+        _, (out, stats) = self._run(r"\w+", "none", _cand())
+        self.assertIs(out, self.df)
+        self.assertEqual(stats["updated_cells"], 0)
+
+    def test_extract_adds_a_column_per_group(self):
+        plan, (out, stats) = self._run(r"(?P<user>\w+)@(\w+)", "extract", _cand(), ["email"])
+        self.assertEqual(list(out.columns), ["email", "email_user", "email_2", "name"])
+        self.assertEqual(out["email_user"].tolist(), ["john", pd.NA, pd.NA])
+        self.assertEqual(out["email_2"].tolist(), ["example", pd.NA, pd.NA])
+        self.assertEqual((stats["updated_rows"], stats["updated_cells"]), (1, 2))
+        self.assertEqual(stats["added_columns"], ["email_user", "email_2"])
+
+        _, (whole, _) = self._run(r"\p{Lu}", "extract", _cand(), ["name"])
+        self.assertEqual(whole["name_match"].tolist(), ["J", "Z", "A"])
+
+    def test_extract_without_matches_adds_nothing(self):
+        for pattern in (r"\d+", r"(\d+)-(\d+)", r"\p{N}+"):
+            _, (out, stats) = self._run(pattern, "extract", _cand(), ["email"])
+            self.assertIs(out, self.df)
+            self.assertEqual((stats["updated_cells"], stats["added_columns"]), (0, []))
+
+    def test_split_is_bounded_and_keeps_the_rest(self):
+        df = pd.DataFrame({"path": pd.array(["a/b/c", "x", None, "/".join("abcdefghijklmnopqrst")], dtype="string")})
+        plan = compile_plan(re.compile("/"), "split", _cand())
+        out, stats = apply_plan(df, plan, None)
+        width = regex_engine.MAX_OUTPUT_COLUMNS
+        self.assertEqual(list(out.columns), ["path"] + [f"path_{i}" for i in range(1, width + 1)])
+        self.assertEqual(out.iloc[0, 1:4].tolist(), ["a", "b", "c"])
+        self.assertEqual(out.iloc[1, 1:3].tolist(), ["x", pd.NA])
+        self.assertEqual(out.iloc[3, -1], "/".join("pqrst"))
+        self.assertEqual(stats["updated_rows"], 2)
+
+        # Nothing to split: no columns at all.
+        out, stats = apply_plan(df, compile_plan(re.compile(";"), "split", _cand()), None)
+        self.assertIs(out, df)
+
+    def test_column_outputs_agree_across_engines_and_shards(self):
+        values = [f"{w}-{i}" if i % 3 else w for i, w in enumerate(["ab", "cd", "ef"] * 700)]
+        df = pd.DataFrame({"v": pd.array(values + [None], dtype="string")})
+        for intent, pattern in (("split", "-"), ("extract", r"(\w)(\w)-(\d+)")):
+            plan = compile_plan(re.compile(pattern), intent, _cand())
+            expected = apply_plan(df, plan, None)[0]
+            fallback = compile_plan(re.compile(pattern), intent, _cand())
+            fallback.std_obj = None
+            with mock.patch.object(regex_engine, "_dictionary", return_value=None):
+                pd.testing.assert_frame_equal(apply_plan(df, fallback, None)[0], expected)
+            sharded = evaluate_plans(df, [plan], None, workers=4, min_parallel_rows=100)[0]
+            pd.testing.assert_frame_equal(materialize(df, sharded), expected)
+
+    def test_parallel_shards_match_serial(self):
+        df = pd.DataFrame({
+            "a": pd.array([f"id-{i}" if i % 5 else None for i in range(1000)], dtype="string"),
+            "b": pd.array([f"Zoë {i}" for i in range(1000)], dtype="string"),
+        })
+        plans = [
+            compile_plan(re.compile(r"\d+"), "replace", _cand(replacement="#")),
+            compile_plan(re.compile(r"(\p{L}+) (\d)"), "normalize", _cand(format="$2$1")),
+        ]
+        serial = evaluate_plans(df, plans, None)
+        parallel = evaluate_plans(df, plans, None, workers=4, min_parallel_rows=100)
+        for s, p in zip(serial, parallel):
+            self.assertEqual(s.stats, p.stats)
+            pd.testing.assert_frame_equal(materialize(df, s), materialize(df, p))
+        self.assertEqual(serial[0].stats["updated_cells"], 1800)
+
+    def test_fused_pipeline_matches_sequential_application(self):
+        df = pd.DataFrame({
+            "a": pd.array([f" id-{i}  x " if i % 7 else None for i in range(500)], dtype="string"),
+            "b": pd.array([f"Zoë {i}" if i % 3 else f"zoe {i}" for i in range(500)], dtype="string"),
+        })
+        steps = [
+            (compile_plan(re.compile(r"^\s+|\s+$"), "replace", _cand(replacement="")), None),
+            (compile_plan(re.compile(r"\p{Lu}"), "replace", _cand(replacement="_")), ["b"]),
+            (compile_plan(re.compile(r"\d+"), "replace", _cand(replacement="#")), None),
+            (compile_plan(re.compile(r"\s{2,}"), "replace", _cand(replacement=" ")), ["a"]),
+        ]
+        expected, per_step = df, []
+        for plan, cols in steps:
+            expected, stats = apply_plan(expected, plan, cols)
+            per_step.append({"updated_rows": stats["updated_rows"], "updated_cells": stats["updated_cells"]})
+
+        for workers in (1, 4):
+            ev = evaluate_pipeline(df, steps, workers=workers, min_parallel_rows=100)
+            pd.testing.assert_frame_equal(materialize(df, ev), expected)
+            self.assertEqual(ev.stats["steps"], per_step)
+        self.assertTrue(materialize(df, ev)["a"].isna().iloc[0])
+
+    def test_low_cardinality_columns_run_per_distinct_value(self):
+        s = pd.Series(pd.array([["Zoë", "José", None, "ann"][i % 4] for i in range(4000)], dtype="string"))
+        codes, uniques = _dictionary(s)
+        self.assertEqual(sorted(uniques.tolist()), ["José", "Zoë", "ann"])
+        self.assertEqual(codes[2], -1)
+        self.assertIsNone(_dictionary(pd.Series(pd.array([f"v{i}" for i in range(4000)], dtype="string"))))
+
+        plan = compile_plan(re.compile(r"(\p{Lu})"), "normalize", _cand(format="<$1>"))
+        positions, values = column_changes(plan, s)
+        with mock.patch.object(regex_engine, "DICTIONARY_MIN_ROWS", len(s) + 1):
+            expected = column_changes(plan, s)
+        self.assertEqual(positions.tolist(), expected[0].tolist())
+        self.assertEqual(values.tolist(), expected[1].tolist())
+        self.assertEqual(values[:2].tolist(), ["<Z>oë", "<J>osé"])
+
+        steps = [(plan, None), (compile_plan(re.compile(r"^<"), "replace", _cand(replacement="[")), None)]
+        ev = evaluate_pipeline(pd.DataFrame({"s": s}), steps)
+        self.assertEqual(ev.stats["steps"], [{"updated_rows": 2000, "updated_cells": 2000}] * 2)
+
+    def test_empty_matches_agree_across_tiers(self):
+        df = pd.DataFrame({"v": pd.array(["a1b", "12", ""], dtype="string")})
+        for pattern in (r"\d*", r"\b", r"x|"):
+            with self.subTest(pattern=pattern):
+                plan = compile_plan(re.compile(pattern), "replace", _cand(replacement="#"))
+                self.assertIsNone(plan.arrow_pattern)
+                expected = [re.sub(pattern, "#", v) for v in df["v"]]
+                self.assertEqual(apply_plan(df, plan, None)[0]["v"].tolist(), expected)
+                plan.std_obj = None
+                self.assertEqual(apply_plan(df, plan, None)[0]["v"].tolist(), expected)
+
+    def test_posix_classes_run_on_regex(self):
+        df = pd.DataFrame({"v": pd.array(["ab12", "c]"], dtype="string")})
+        plan = compile_plan(re.compile(r"[[:alpha:]]+"), "replace", _cand(replacement="_"))
+        self.assertEqual((plan.std_obj, plan.arrow_pattern, plan.literal), (None, None, None))
+        self.assertEqual(apply_plan(df, plan, None)[0]["v"].tolist(), ["_12", "_]"])
+
+    def test_class_shorthands_agree_with_regex_outside_ascii(self):
+        # `re` counts \x1c-\x1f as \s and "²" as \w; `regex` does not.
+        df = pd.DataFrame({"v": pd.array(["a\x1fb", "x²y", "éx", "a x", None], dtype="string")})
+        for pattern in (r"\s+", r"\S+", r"\w+", r"\d", r"\bx"):
+            with self.subTest(pattern=pattern):
+                plan = compile_plan(re.compile(pattern), "replace", _cand(replacement="#"))
+                self.assertIsNotNone(plan.std_gap)
+                expected = [v if pd.isna(v) else re.sub(pattern, "#", v) for v in df["v"]]
+                self.assertEqual(apply_plan(df, plan, None)[0]["v"].tolist(), expected)
+                ev = evaluate_pipeline(df, [(plan, None)])
+                self.assertEqual(materialize(df, ev)["v"].tolist(), expected)
+        plan = compile_plan(re.compile(r"[a-z]+"), "replace", _cand(replacement="#"))
+        self.assertIsNone(plan.std_gap)
+
+    def test_required_literal(self):
+        cases = {
+            (r"(\w+)@mail\.com", 0): "@mail.com",
+            (r"foo|bar", 0): None,
+            (r"(?:Mr|Mrs)\.\s+(\w+)", 0): "Mr",
+            (r"a{0,3}b", 0): "b",
+            (r"x(?i:abc)d", 0): "x",
+            (r"abc", re.IGNORECASE): None,
+            (r"12-3", re.IGNORECASE): "12-3",
+            (r"^\s+", 0): None,
+            (r"[[:alpha:]]+x", 0): None,
+        }
+        for (pattern, flags), literal in cases.items():
+            with self.subTest(pattern=pattern):
+                self.assertEqual(required_literal(pattern, flags), literal)
+
+    def test_literal_prefilter_matches_full_scan(self):
+        df = pd.DataFrame({
+            "mail": pd.array([f"zoë{i}@mail.com" if i % 3 else f"zoë{i}" for i in range(300)], dtype="string"),
+            "other": pd.array([f"Zoë {i}" for i in range(300)], dtype="string"),
+        })
+        steps = [
+            (compile_plan(re.compile(r"(\w+)@mail\.com"), "normalize", _cand(format="$1 at mail")), None),
+            (compile_plan(re.compile(r" at (mail)"), "replace", _cand(replacement="@$1")), None),
+        ]
+        self.assertEqual([p.literal for p, _ in steps], ["@mail.com", " at "])
+        filtered = evaluate_pipeline(df, steps)
+        single = evaluate_plans(df, [steps[0][0]], None)[0]
+        for plan, _cols in steps:
+            plan.literal = None
+        self.assertEqual(filtered.stats, evaluate_pipeline(df, steps).stats)
+        self.assertEqual(single.stats, evaluate_plans(df, [steps[0][0]], None)[0].stats)
+        self.assertEqual(single.stats["updated_cells"], 200)
+        self.assertEqual(materialize(df, filtered)["mail"].iloc[1], "zoë1@mail")
@@ -0,0 +1,83 @@
+import json
+import tempfile
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from django.test import TestCase
+
+from api.services import dataset_store
+
+
+class DatasetRowsTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(dataset_store, "store", dataset_store.DatasetStore(tempfile.mkdtemp(), 1 << 30))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        df = pd.DataFrame({
+            "id": pd.array([str(i) for i in range(1000)], dtype="string"),
+            "email": pd.array([f"u{i}@x.com" if i % 3 else None for i in range(1000)], dtype="string"),
+        })
+        self.ds = dataset_store.store.create(df, "big.csv")
+
+    def _rows(self, **params):
+        return self.client.get("/api/rows", {"dataset_id": self.ds.dataset_id, **params})
+
+    def test_window_and_column_subset(self):
+        body = self._rows(offset=998, limit=5, columns="email").json()
+        self.assertEqual(body["total_rows"], 1000)
+        self.assertEqual(body["row_ids"], [998, 999])
+        self.assertEqual(body["data"], [["u998@x.com"], [""]])
+
+    def test_changed_only_uses_last_transform(self):
+        dataset_store.store.put(self.ds.dataset_id, self.ds.df, changed_rows=np.array([5, 700]))
+        body = self._rows(changed_only=1, columns="id").json()
+        self.assertEqual((body["total_rows"], body["row_ids"], body["data"]), (2, [5, 700], [["5"], ["700"]]))
+
+    def test_etag_revalidation(self):
+        first = self._rows(limit=10)
+        again = self.client.get(
+            "/api/rows", {"dataset_id": self.ds.dataset_id, "limit": 10}, HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        self.assertEqual(again.status_code, 304)
+        dataset_store.store.put(self.ds.dataset_id, self.ds.df.iloc[:5])
+        changed = self.client.get(
+            "/api/rows", {"dataset_id": self.ds.dataset_id, "limit": 10}, HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()["total_rows"], 5)
+
+    def test_rejects_bad_windows(self):
+        self.assertEqual(self._rows(limit=0).status_code, 400)
+        r = self._rows(offset="x")
+        self.assertEqual((r.status_code, r.json()["error"]), (400, "invalid offset"))
+        self.assertEqual(self._rows(columns="nope").status_code, 400)
+        self.assertEqual(self.client.get("/api/rows", {"dataset_id": "f" * 32}).status_code, 404)
+
+    def test_column_layout(self):
+        rows = self._rows(offset=2, limit=3).json()
+        cols = self._rows(offset=2, limit=3, layout="columns").json()
+        self.assertEqual(cols["layout"], "columns")
+        self.assertEqual(cols["data"], [["2", "3", "4"], ["u2@x.com", "", "u4@x.com"]])
+        self.assertEqual([list(r) for r in zip(*cols["data"])], rows["data"])
+        self.assertEqual(self._rows(layout="diagonal").status_code, 400)
+
+    def test_arrow_stream_by_accept_header(self):
+        r = self.client.get(
+            "/api/rows", {"dataset_id": self.ds.dataset_id, "offset": 998, "limit": 5},
+            HTTP_ACCEPT="application/vnd.apache.arrow.stream",
+        )
+        self.assertEqual(r["Content-Type"], "application/vnd.apache.arrow.stream")
+        table = pa.ipc.open_stream(r.content).read_all()
+        self.assertEqual(table.column_names, ["id", "email"])
+        self.assertEqual(table.column("email").to_pylist(), ["u998@x.com", None])
+        page = json.loads(table.schema.metadata[b"page"])
+        self.assertEqual((page["total_rows"], page["row_ids"]), (1000, [998, 999]))
+        self.assertNotEqual(r["ETag"], self._rows(offset=998, limit=5)["ETag"])
+
+        missing = self.client.get(
+            "/api/rows", {"dataset_id": "f" * 32}, HTTP_ACCEPT="application/vnd.apache.arrow.stream",
+        )
+        self.assertEqual((missing.status_code, missing["Content-Type"]), (404, "application/json"))
+        self.assertIn("error", missing.json())
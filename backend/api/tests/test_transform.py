@@ -0,0 +1,73 @@
+import tempfile
+from unittest import mock
+
+import pandas as pd
+from django.test import TestCase, override_settings
+
+from api.services import dataset_store
+from api.tests.helpers import llm_plan
+
+
+@override_settings(TRANSFORM_SAMPLE_ROWS=500)
+class SampledScoringTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(dataset_store, "store", dataset_store.DatasetStore(tempfile.mkdtemp(), 1 << 30))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        n = 5000
+        df = pd.DataFrame({
+            "code": pd.array([f"A{i}" if i % 2 else f"B{i}" for i in range(n)], dtype="string"),
+        })
+        self.dataset_id = dataset_store.store.create(df, "codes.csv").dataset_id
+
+    def _transform(self, plan, **body):
+        body = {"prompt": "p", "dataset_id": self.dataset_id, **body}
+        with mock.patch("api.views.compile_regex_plan", return_value=plan):
+            return self.client.post("/api/transform", body, content_type="application/json")
+
+    def test_clear_winner_scored_on_sample_only(self):
+        r = self._transform(llm_plan((r"\d", "#"), (r"^A", "a")))
+        body = r.json()
+        self.assertEqual(body["scoring"], {"mode": "sample", "sample_rows": 500, "escalated": False})
+        self.assertEqual(body["pattern"], r"\d")
+        self.assertEqual(body["stats"]["updated_cells"], 5000)
+        self.assertTrue(body["candidates_debug"][1]["stats"]["sampled"])
+
+    def test_close_candidates_escalate_to_full_evaluation(self):
+        r = self._transform(llm_plan((r"^A", "a"), (r"^B", "b")))
+        body = r.json()
+        self.assertTrue(body["scoring"]["escalated"])
+        self.assertEqual([c["stats"]["updated_cells"] for c in body["candidates_debug"]], [2500, 2500])
+
+    def test_sample_rows_zero_disables_sampling(self):
+        r = self._transform(llm_plan((r"\d", "#"), (r"^A", "a")), sample_rows=0)
+        self.assertEqual(r.json()["scoring"]["mode"], "full")
+
+
+class PlannerContextTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(dataset_store, "store", dataset_store.DatasetStore(tempfile.mkdtemp(), 1 << 30))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        df = pd.DataFrame({
+            "email": pd.array(["a@x.com", "b@y.org"], dtype="string"),
+            "note": pd.array(["call a@x.com", ""], dtype="string"),
+        })
+        self.dataset_id = dataset_store.store.create(df, "people.csv").dataset_id
+
+    def test_planner_gets_schema_and_profile_and_plan_columns_are_honoured(self):
+        plan = llm_plan((r"\S+@\S+", "***"), intent="mask")
+        plan.columns = ["email", "Emial"]
+        with mock.patch("api.views.compile_regex_plan", return_value=plan) as planner:
+            r = self.client.post("/api/transform", {"prompt": "mask emails", "dataset_id": self.dataset_id},
+                                 content_type="application/json")
+        kwargs = planner.call_args.kwargs
+        self.assertEqual(kwargs["columns"], ["email", "note"])
+        self.assertEqual([(p["name"], p["kind"], p["examples"]) for p in kwargs["profile"]],
+                         [("email", "text", ["a@x.com", "b@y.org"]), ("note", "text", ["call a@x.com"])])
+        self.assertEqual(r.json()["data"], [["***", "call a@x.com"], ["***", ""]])
+
+        # The profile is kept across transforms while the columns stay the same.
+        stored = dataset_store.store.get(self.dataset_id)
+        self.assertEqual(dataset_store.store._read_meta(self.dataset_id)["profile"], kwargs["profile"])
+        self.assertEqual(dataset_store.store.profile(stored), kwargs["profile"])
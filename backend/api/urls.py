@@ -1,8 +1,23 @@
 from django.urls import path
-from .views import upload_file, transform_data
+from .views import (
+    upload_file, transform_data, transform_data_async, dataset_rows, dataset_history, history_action,
+    job_status, job_cancel, run_pipeline, recipes, recipe_detail, recipe_apply,
+    export_dataset,
+)
 
 
 urlpatterns = [
     path("upload", upload_file, name="upload"),
-    path("transform", transform_data, name="transform")
+    path("transform", transform_data, name="transform"),
+    path("transform-async", transform_data_async, name="transform-async"),
+    path("pipeline", run_pipeline, name="pipeline"),
+    path("recipes", recipes, name="recipes"),
+    path("recipes/<str:name>", recipe_detail, name="recipe-detail"),
+    path("recipes/<str:name>/apply", recipe_apply, name="recipe-apply"),
+    path("rows", dataset_rows, name="rows"),
+    path("export", export_dataset, name="export"),
+    path("history", dataset_history, name="history"),
+    path("history/<str:action>", history_action, name="history-action"),
+    path("jobs/<str:job_id>", job_status, name="job-status"),
+    path("jobs/<str:job_id>/cancel", job_cancel, name="job-cancel")
 ]
\ No newline at end of file
@@ -1,21 +1,50 @@
-import regex as re
+import functools
+import hashlib
+import json
+import logging
+import uuid
 import pandas as pd
-import numpy as np
+import pyarrow as pa
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, quote_etag
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework.decorators import api_view
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.decorators import api_view, renderer_classes
 from rest_framework.response import Response
 from rest_framework import status
+from pydantic import ValidationError
 
+from .services import dataset_store, export, jobs, metrics, uploads
+from .services.dataset_store import StoredDataset
+from .services.dtypes import display_columns, display_rows, text_frame
 from .services.file_io import load_to_df
-from .services.llm_client import compile_regex_plan
+from .services.history import HistoryError, HistoryLog, delta_from_evaluation
+from .services.llm_async import acompile_regex_plan
+from .services.llm_client import CompilePlan, RegexCandidate, compile_regex_plan
+from .services.pattern_safety import assess
+from .services.profile import profile_frame
+from .services.recipes import RecipeError, normalize_steps
+from .services.regex_engine import (
+    PatternTimeout, apply_plan, changed_rows, compile_pattern, compile_plan, evaluate_pipeline, evaluate_plans,
+    materialize,
+)
+from .services.sampling import stratified_positions, wilson_interval
+from .models import Job, Recipe, Transformation, UploadedDataset
+from .renderers import ArrowStreamRenderer, JSONRenderer
 from .serializers import UploadResponse
 
-TMP_DIR = Path(__file__).resolve().parent / "storage"
-
-_state = {"df": None, "filename": None}
+logger = logging.getLogger(__name__)
 
+def _wants_job(request) -> bool:
+    flag = request.query_params.get("async")
+    if flag is None and isinstance(request.data, dict):
+        flag = request.data.get("async")
+    return str(flag).lower() in ("1", "true", "yes")
 
 @csrf_exempt
 @api_view(["POST"])
@@ -23,130 +52,266 @@ def upload_file(request):
     f = request.FILES.get("file")
     if not f:
         return Response({"error": "Missing file"}, status=status.HTTP_400_BAD_REQUEST)
-    tmp = TMP_DIR / f.name
-    with tmp.open("wb+") as dst:
-        for chunk in f.chunks():
-            dst.write(chunk)
-    loaded = load_to_df(tmp)
-    _state["df"] = loaded.df
-    _state["filename"] = loaded.name
+    record = UploadedDataset(original_name=f.name, extension=Path(f.name).suffix.lower())
+    # Stored once per content: uploads/<hash prefix>/<sha256><ext>.
+    with metrics.span("upload.write"):
+        saved = uploads.save_upload(f)
+    record.file.name = saved.name
+    record.content_hash = saved.sha256
+    sheet = request.data.get("sheet") or None
+    if sheet is not None and sheet.isdigit():
+        sheet = int(sheet)
+    typed = request.data.get("typed")
+    typed = settings.LOAD_TYPED if typed in (None, "") else str(typed).lower() in ("1", "true", "yes")
 
+    if _wants_job(request):
+        record.save()
+        dataset_id = uuid.uuid4().hex
+        request.session["dataset_id"] = dataset_id
+        job = jobs.submit("upload", _upload_job, record.pk, sheet, dataset_id, typed, dataset_id=dataset_id)
+        return Response(jobs.describe(job), status=status.HTTP_202_ACCEPTED)
 
-    payload = {
-        "columns": list(loaded.df.columns),
-        "data": loaded.df.head(100).fillna("").values.tolist(),
-        "filename": loaded.name
-    }
+    try:
+        payload = _ingest_upload(record, sheet, typed=typed)
+    except ValueError as e:
+        uploads.discard(record)
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    request.session["dataset_id"] = payload["dataset_id"]
     return Response(UploadResponse(payload).data)
 
+def _ingest_upload(
+    record: UploadedDataset, sheet, dataset_id: str | None = None, progress=None, typed: bool = False
+) -> dict:
+    """
+    Parse the saved upload into the dataset store and fill in `record`.
+    Bytes parsed before with the same options are not parsed again: the
+    new dataset starts from the cached frame (see ParseCache).
+    """
+    store = dataset_store.store
+    key = store.parsed.key(record.content_hash, sheet, typed) if record.content_hash else None
+    cached = store.parsed.get(key) if key else None
+    if cached is not None:
+        metrics.UPLOADS.inc(result="cached")
+        details = cached.details
+        stored = store.adopt(cached.path, record.original_name, details["profile"], dataset_id)
+    else:
+        metrics.UPLOADS.inc(result="parsed")
+        loaded = load_to_df(Path(record.file.path), sheet=sheet, progress=progress, typed=typed)
+        details = {
+            "encoding": loaded.encoding,
+            "encoding_confidence": loaded.encoding_confidence,
+            "delimiter": loaded.delimiter,
+            "sheet": loaded.sheet,
+            "dtypes": loaded.dtypes,
+            "profile": profile_frame(loaded.df),
+        }
+        if dataset_id is None:
+            stored = store.create(loaded.df, record.original_name, profile=details["profile"])
+        else:
+            stored = store.put(dataset_id, loaded.df, record.original_name, profile=details["profile"])
+        if key:
+            store.parsed.put(key, store.path_for(stored.dataset_id), details)
+
+    df = stored.df
+    record.public_id = stored.dataset_id
+    record.columnar_path = _media_relative(store.path_for(stored.dataset_id))
+    record.columns = list(df.columns)
+    record.row_count = len(df)
+    record.save()
+
+    return {
+        "dataset_id": stored.dataset_id,
+        "columns": list(df.columns),
+        "data": display_rows(df.head(100)),
+        "filename": record.original_name,
+        "encoding": details["encoding"],
+        "encoding_confidence": details["encoding_confidence"],
+        "delimiter": details["delimiter"],
+        "sheet": details["sheet"],
+        "dtypes": details["dtypes"],
+        "cached": cached is not None,
+    }
+
+def _upload_job(
+    ctx: jobs.JobContext, record_pk: int, sheet, dataset_id: str, typed: bool = False
+) -> tuple[dict, int]:
+    record = UploadedDataset.objects.get(pk=record_pk)
+    ctx.set_stage("parsing")
+    try:
+        payload = _ingest_upload(record, sheet, dataset_id, ctx.progress, typed)
+    except (ValueError, jobs.JobCancelled) as e:
+        dataset_store.store.delete(dataset_id)
+        uploads.discard(record)
+        record.delete()
+        if isinstance(e, jobs.JobCancelled):
+            raise
+        return {"error": str(e)}, 400
+    return dict(UploadResponse(payload).data), 200
+
 
-FLAG_MAP = {
-    "IGNORECASE": re.IGNORECASE,
-    "MULTILINE": re.MULTILINE,
-    "DOTALL": re.DOTALL,
-    "UNICODE": re.UNICODE,
-}
+def _media_relative(path: Path) -> str:
+    try:
+        return str(path.resolve().relative_to(Path(settings.MEDIA_ROOT).resolve()))
+    except ValueError:
+        return str(path)
+
+def _record_transformation(
+    dataset_id: str, prompt: str, intent: str, chosen: dict, columns: list[str]
+) -> Transformation | None:
+    record = UploadedDataset.objects.filter(public_id=dataset_id).first()
+    if record is None:
+        return None
+    return Transformation.objects.create(
+        dataset=record,
+        natural_language=prompt,
+        intent=intent,
+        pattern=chosen["pattern"],
+        flags=chosen["flags"] or [],
+        replacement=chosen.get("replacement") or "",
+        format=chosen.get("format") or "",
+        target_columns=columns,
+        updated_rows=chosen["stats"]["updated_rows"],
+        updated_cells=chosen["stats"]["updated_cells"],
+    )
+
+def _history(dataset_id: str) -> HistoryLog:
+    return HistoryLog(dataset_store.store.root, dataset_id, settings.HISTORY_BUDGET_BYTES)
+
+def _save_version(stored: StoredDataset, df2: pd.DataFrame, evaluation, label: str) -> dict:
+    """
+    Record the undo step for `evaluation`, then store `df2` as the new
+    version. The step goes first so a failure leaves the dataset as it was;
+    if storing fails, the step is rolled back. Returns the history state.
+    """
+    history = _history(stored.dataset_id)
+    with metrics.span("history.record"):
+        state = history.record(label, delta_from_evaluation(stored.df, df2, evaluation))
+    try:
+        dataset_store.store.put(stored.dataset_id, df2, changed_rows=changed_rows(evaluation))
+    except BaseException:
+        history.rollback(state["cursor"])
+        raise
+    return state
 
 def _compile_regex_safe(pattern: str, flags_list: list[str]):
-    flags = 0
-    for k in flags_list or []:
-        flags |= FLAG_MAP.get(k.upper(), 0)
-    return re.compile(pattern, flags)
+    return compile_pattern(pattern, flags_list)
 
-def _to_py_backrefs(template: str) -> str:
-    return re.sub(r"\$(\d+)", r"\\g<\1>", template)
+def _bench_cells(df: pd.DataFrame, cols: list[str], n: int) -> list[str]:
+    """Up to `n` non-empty cells spread over the rows and target columns."""
+    cols = [c for c in cols if c in df.columns]
+    if not cols or n <= 0:
+        return []
+    positions = stratified_positions(len(df), max(1, n // len(cols)))
+    cells = []
+    for col in cols:
+        s = df[col].iloc[positions].dropna()
+        cells.extend(str(v) for v in s.to_numpy(dtype=object))
+    return cells[:n]
 
 def _apply_regex_once(df: pd.DataFrame, pat_obj, intent: str, candidate, columns: list[str] | None):
-    new_df = df.copy()
-    target_cols = columns or list(new_df.columns)
-    target_cols = [c for c in target_cols if c in new_df.columns]
-    if not target_cols:
-        return new_df, {"updated_rows": 0, "updated_cells": 0, "target_cols": []}
-
-    if intent in ("replace","mask"):
-        repl_template = _to_py_backrefs(candidate.replacement or "")
-        def do_sub(x: str):
-            try: return pat_obj.sub(repl_template, x, concurrent=True)
-            except re.TimeoutError: return x
-    elif intent == "normalize":
-        fmt = _to_py_backrefs(candidate.format or "")
-        def do_sub(x: str):
-            try: return pat_obj.sub(fmt, x, concurrent=True)
-            except re.TimeoutError: return x
-    else:
-        def do_sub(x: str): return x
-
-    updated_cells = 0
-    for col in target_cols:
-        before = new_df[col].astype(str).fillna("")
-        after = before.map(do_sub)
-        changed = (before != after)
-        updated_cells += int(changed.sum())
-        new_df[col] = after
-
-    changed_row_mask = np.zeros(len(new_df), dtype=bool)
-    for col in target_cols:
-        changed_row_mask |= (df[col].astype(str).fillna("") != new_df[col].astype(str).fillna("")).to_numpy()
-    updated_rows = int(changed_row_mask.sum())
-    return new_df, {"updated_rows": updated_rows, "updated_cells": updated_cells, "target_cols": target_cols}
-
-def _score_candidate(stats: dict, total_cells: int) -> float:
+    plan = compile_plan(pat_obj, intent, candidate)
+    return apply_plan(df, plan, columns)
+
+SLOW_PATTERN_FACTOR = 0.5
+
+def _score_candidate(stats: dict, total_cells: int, slow: bool = False) -> float:
     u = stats.get("updated_cells", 0)
     if u <= 0: return -1.0
     coverage = u / max(1, total_cells)
     penalty = 0.0
     if coverage > 0.8: penalty = (coverage - 0.8) * 0.5 * u
-    return u - penalty
+    score = u - penalty
+    return score * SLOW_PATTERN_FACTOR if slow else score
 
-@csrf_exempt
-@api_view(["POST"])
-def transform_data(request):
-    data = request.data or {}
-    prompt = data.get("prompt", "")
-    if not isinstance(prompt, str) or not prompt.strip():
-        return Response({"error": "prompt is required"}, status=400)
+def _is_slow(c: dict) -> bool:
+    return c.get("safety", {}).get("verdict") == "slow"
 
-    df = _state.get("df")
-    if df is None:
-        return Response({"error": "Upload a file first."}, status=400)
+def _score_on_sample(df: pd.DataFrame, candidates_evals: list[dict], cols_to_use: list[str],
+                     total_cells: int, sample_rows: int) -> dict:
+    """
+    Rank candidates on a stratified row sample and extrapolate their stats.
 
-    print(f"[/api/transform] received prompt: {prompt}")
+    Sorts `candidates_evals` by estimated score and decides whether the top
+    two are too close to call: their score intervals (from the Wilson bound
+    on coverage) overlap while their sample results differ. In that case,
+    with TRANSFORM_SAMPLE_ESCALATE on, every candidate is re-run in full.
+    """
+    positions = stratified_positions(len(df), sample_rows)
+    sample = df.take(positions)
+    sample_cells = len(sample) * max(1, len(cols_to_use))
+    row_scale = len(df) / max(1, len(sample))
+    cell_scale = total_cells / max(1, sample_cells)
 
-    try:
-        plan = compile_regex_plan(nl=prompt, columns=[], k=3)
-    except Exception as e:
-        print(f"[/api/transform] LLM call failed: {e}")
-        return Response({"error": f"compile failed: {str(e)}"}, status=502)
+    evaluations = evaluate_plans(sample, [c["plan"] for c in candidates_evals], cols_to_use)
+    for c, ev in zip(candidates_evals, evaluations):
+        hits = ev.stats["updated_cells"]
+        lo, hi = wilson_interval(hits, sample_cells, settings.TRANSFORM_SAMPLE_Z)
+        c["stats"] = {
+            **({"timed_out": True} if ev.stats.get("timed_out") else {}),
+            "updated_rows": round(ev.stats["updated_rows"] * row_scale),
+            "updated_cells": round(hits * cell_scale),
+            "target_cols": ev.stats["target_cols"],
+            "sampled": True,
+            "coverage_ci": [round(lo, 6), round(hi, 6)],
+        }
+        slow = _is_slow(c)
+        c["score"] = _score_candidate(c["stats"], total_cells, slow)
+        c["score_ci"] = (
+            _score_candidate({"updated_cells": lo * total_cells}, total_cells, slow),
+            _score_candidate({"updated_cells": hi * total_cells}, total_cells, slow),
+        )
+        c["sample_hits"] = hits
 
-    print(f"[/api/transform] LLM plan -> is_table_op={plan.is_table_op}, intent={plan.intent}, candidates={len(plan.candidates)}")
-    if not plan.is_table_op:
-        print(f"[/api/transform] invalid input: {plan.reason}")
-        return Response({"error": "invalid_input", "reason": plan.reason or "输入与表格文本处理无关"}, status=422)
+    candidates_evals.sort(key=lambda x: x["score"], reverse=True)
+    best, runner_up = candidates_evals[0], candidates_evals[1]
+    too_close = (
+        best["score_ci"][0] <= runner_up["score_ci"][1]
+        and best["sample_hits"] != runner_up["sample_hits"]
+    )
+    for c in candidates_evals:
+        del c["score_ci"], c["sample_hits"]
 
-    if not plan.candidates:
-        print("[/api/transform] no regex candidates from LLM")
-        return Response({"error": "no valid regex candidate produced"}, status=422)
+    escalated = too_close and settings.TRANSFORM_SAMPLE_ESCALATE
+    return {"mode": "full" if escalated else "sample", "sample_rows": len(sample), "escalated": escalated}
 
+def _compile_candidates(plan, df: pd.DataFrame, cols_to_use: list[str]) -> tuple[list[dict], list[dict]]:
+    """
+    Compile and screen the LLM's candidates for `plan`. Returns the usable
+    ones (with their compiled plan under "plan") and the ones rejected by
+    the pattern-safety check.
+    """
     candidates_evals = []
-    cols_to_use = plan.columns or list(df.columns)
-    total_cells = len(df) * max(1, len(cols_to_use))
+    rejected = []
+    bench_cells = _bench_cells(df, cols_to_use, settings.REGEX_BENCH_CELLS)
 
     for idx, cand in enumerate(plan.candidates, start=1):
         try:
-            pat_obj = _compile_regex_safe(cand.pattern, cand.flags)
+            with metrics.span("regex.compile"):
+                pat_obj = _compile_regex_safe(cand.pattern, cand.flags)
         except Exception as ce:
-            print(f"[/api/transform] candidate#{idx} compile failed: {cand.pattern} | {ce}")
+            logger.info("candidate#%d compile failed: %s | %s", idx, cand.pattern, ce)
             continue
 
         if plan.intent in ("replace","mask") and not cand.replacement:
-            print(f"[/api/transform] candidate#{idx} skipped: missing replacement for intent={plan.intent}")
+            logger.info("candidate#%d skipped: missing replacement for intent=%s", idx, plan.intent)
             continue
         if plan.intent == "normalize" and not cand.format:
-            print(f"[/api/transform] candidate#{idx} skipped: missing format for normalize")
+            logger.info("candidate#%d skipped: missing format for normalize", idx)
             continue
 
-        df_try, stats = _apply_regex_once(df, pat_obj, plan.intent, cand, cols_to_use)
-        score = _score_candidate(stats, total_cells)
+        with metrics.span("regex.compile"):
+            cplan = compile_plan(pat_obj, plan.intent, cand)
+        with metrics.span("regex.safety"):
+            safety = assess(
+                cplan, bench_cells,
+                cell_timeout=settings.REGEX_CELL_TIMEOUT,
+                column_timeout=settings.REGEX_COLUMN_TIMEOUT,
+                budget_us=settings.REGEX_CELL_BUDGET_US,
+            )
+        if safety.verdict == "reject":
+            logger.info("candidate#%d rejected: %s | %s", idx, cand.pattern, "; ".join(safety.risk.reasons))
+            rejected.append({"pattern": cand.pattern, "flags": cand.flags, "safety": safety.as_dict()})
+            continue
 
         candidates_evals.append({
             "idx": idx,
@@ -156,22 +321,202 @@ def transform_data(request):
             "risk_notes": cand.risk_notes,
             "replacement": cand.replacement,
             "format": cand.format,
-            "score": score,
-            "stats": stats,
-            "df": df_try
+            "safety": safety.as_dict(),
+            "plan": cplan,
         })
-        print(f"[/api/transform] candidate#{idx} score={score} stats={stats} pattern={cand.pattern}")
+    return candidates_evals, rejected
+
+def _validate_transform(data, session_dataset_id: str | None) -> tuple[str, StoredDataset | None, tuple[dict, int] | None]:
+    if not isinstance(data, dict):
+        return "", None, ({"error": "JSON object body required"}, 400)
+    prompt = data.get("prompt", "")
+    if not isinstance(prompt, str) or not prompt.strip():
+        return "", None, ({"error": "prompt is required"}, 400)
+
+    dataset_id = data.get("dataset_id") or session_dataset_id
+    stored = dataset_store.store.get(dataset_id) if isinstance(dataset_id, str) else None
+    if stored is None:
+        return prompt, None, ({"error": "Upload a file first."}, 400)
+    return prompt, stored, None
+
+def _planner_context(stored: StoredDataset) -> dict:
+    """Column names and the stored column profile, passed to the planner."""
+    return {"columns": [str(c) for c in stored.df.columns], "profile": dataset_store.store.profile(stored)}
+
+def _plan_columns(plan, df: pd.DataFrame) -> list[str]:
+    """The plan's columns that exist in `df`; every column if it names none."""
+    known = [c for c in plan.columns if c in df.columns]
+    return known or list(df.columns)
+
+@csrf_exempt
+@api_view(["POST"])
+def transform_data(request):
+    data = request.data or {}
+    session_id = None if isinstance(data, dict) and data.get("dataset_id") else request.session.get("dataset_id")
+    prompt, stored, error = _validate_transform(data, session_id)
+    if error:
+        return Response(error[0], status=error[1])
+
+    logger.info("[/api/transform] received prompt: %s", prompt)
+
+    if _wants_job(request):
+        job = jobs.submit("transform", _transform_job, stored.dataset_id, prompt, dict(data), dataset_id=stored.dataset_id)
+        return Response(jobs.describe(job), status=status.HTTP_202_ACCEPTED)
+
+    try:
+        plan = compile_regex_plan(nl=prompt, k=3, **_planner_context(stored))
+    except Exception as e:
+        logger.warning("[/api/transform] LLM call failed: %s", e)
+        return Response({"error": f"compile failed: {str(e)}"}, status=502)
+
+    payload, code = _run_transform(stored, prompt, plan, data)
+    return Response(payload, status=code)
+
+def _transform_job(ctx: jobs.JobContext, dataset_id: str, prompt: str, data: dict) -> tuple[dict, int]:
+    stored = dataset_store.store.get(dataset_id)
+    if stored is None:
+        return {"error": "Upload a file first."}, 400
+    ctx.set_stage("planning")
+    try:
+        plan = compile_regex_plan(nl=prompt, k=3, **_planner_context(stored))
+    except Exception as e:
+        logger.warning("[/api/transform] LLM call failed: %s", e)
+        return {"error": f"compile failed: {str(e)}"}, 502
+    return _run_transform(stored, prompt, plan, data, ctx)
+
+@csrf_exempt
+@require_POST
+async def transform_data_async(request):
+    """
+    Same contract as `transform_data`, for ASGI deployments: the LLM call
+    awaits the pooled async client instead of pinning a worker thread, and
+    only the pandas work is pushed onto a thread.
+    """
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "invalid JSON body"}, status=400)
+    session_id = None if isinstance(data, dict) and data.get("dataset_id") else await request.session.aget("dataset_id")
+    prompt, stored, error = await sync_to_async(_validate_transform, thread_sensitive=False)(data, session_id)
+    if error:
+        return JsonResponse(error[0], status=error[1])
+
+    logger.info("[/api/transform-async] received prompt: %s", prompt)
+
+    try:
+        context = await sync_to_async(_planner_context, thread_sensitive=False)(stored)
+        plan = await acompile_regex_plan(nl=prompt, k=3, **context)
+    except Exception as e:
+        logger.warning("[/api/transform-async] LLM call failed: %s", e)
+        return JsonResponse({"error": f"compile failed: {str(e)}"}, status=502)
+
+    payload, code = await sync_to_async(_run_transform, thread_sensitive=False)(stored, prompt, plan, data)
+    with metrics.span("serialize"):
+        return JsonResponse(payload, status=code)
+
+def _latest(fn):
+    """
+    Run `fn(stored, ...)` under the dataset's update lock, on the version
+    current once the lock is held, so concurrent updates of one dataset
+    (in any worker process) apply one after the other instead of
+    overwriting each other.
+    """
+    @functools.wraps(fn)
+    def run(stored: StoredDataset, *args, **kwargs) -> tuple[dict, int]:
+        with dataset_store.store.lock(stored.dataset_id):
+            current = dataset_store.store.get(stored.dataset_id)
+            if current is None:
+                return {"error": "Upload a file first."}, 400
+            return fn(current, *args, **kwargs)
+    return run
+
+@_latest
+def _run_transform(
+    stored: StoredDataset, prompt: str, plan, data: dict, ctx: jobs.JobContext | None = None
+) -> tuple[dict, int]:
+    df = stored.df
+    logger.info("[/api/transform] LLM plan -> is_table_op=%s, intent=%s, candidates=%d", plan.is_table_op, plan.intent, len(plan.candidates))
+    if not plan.is_table_op:
+        logger.info("[/api/transform] invalid input: %s", plan.reason)
+        return {"error": "invalid_input", "reason": plan.reason or "输入与表格文本处理无关"}, 422
+
+    if not plan.candidates:
+        logger.info("[/api/transform] no regex candidates from LLM")
+        return {"error": "no valid regex candidate produced"}, 422
+
+    cols_to_use = _plan_columns(plan, df)
+    total_cells = len(df) * max(1, len(cols_to_use))
+    candidates_evals, rejected = _compile_candidates(plan, df, cols_to_use)
 
     if not candidates_evals:
-        print("[/api/transform] all candidates invalid after compile/validation")
-        return Response({"error": "no valid regex candidate produced"}, status=422)
+        logger.info("[/api/transform] all candidates invalid after compile/validation")
+        return {"error": "no valid regex candidate produced", "rejected_candidates": rejected}, 422
+
+    sample_rows = data.get("sample_rows", settings.TRANSFORM_SAMPLE_ROWS)
+    try:
+        sample_rows = int(sample_rows)
+    except (TypeError, ValueError):
+        return {"error": "sample_rows must be an integer"}, 400
+
+    scoring = {"mode": "full", "sample_rows": 0, "escalated": False}
+    if len(candidates_evals) > 1 and 0 < sample_rows < len(df):
+        with metrics.span("scoring"):
+            scoring = _score_on_sample(df, candidates_evals, cols_to_use, total_cells, sample_rows)
+
+    if ctx is not None:
+        ctx.set_stage("evaluating")
+    progress = ctx.progress if ctx is not None else None
+    if scoring["mode"] == "full":
+        with metrics.span("evaluate"):
+            evaluations = evaluate_plans(
+                df, [c["plan"] for c in candidates_evals], cols_to_use,
+                workers=settings.TRANSFORM_WORKERS,
+                min_parallel_rows=settings.TRANSFORM_PARALLEL_MIN_ROWS,
+                progress=progress,
+            )
+        metrics.CELLS.inc(total_cells * len(candidates_evals), stage="evaluate")
+        for c, ev in zip(candidates_evals, evaluations):
+            c["stats"] = ev.stats
+            c["score"] = _score_candidate(ev.stats, total_cells, _is_slow(c))
+            c["evaluation"] = ev
+        candidates_evals.sort(key=lambda x: x["score"], reverse=True)
+        del evaluations
+    else:
+        # Losers keep their sample estimates; only the winner touches every row.
+        winner = candidates_evals[0]
+        with metrics.span("evaluate"):
+            winner["evaluation"] = evaluate_plans(
+                df, [winner["plan"]], cols_to_use,
+                workers=settings.TRANSFORM_WORKERS,
+                min_parallel_rows=settings.TRANSFORM_PARALLEL_MIN_ROWS,
+                progress=progress,
+            )[0]
+        metrics.CELLS.inc(total_cells, stage="evaluate")
+        winner["stats"] = winner["evaluation"].stats
+        winner["score"] = _score_candidate(winner["stats"], total_cells, _is_slow(winner))
+
+    for c in candidates_evals:
+        logger.debug("[/api/transform] candidate#%d score=%s stats=%s pattern=%s", c["idx"], c["score"], c["stats"], c["pattern"])
 
-    candidates_evals.sort(key=lambda x: x["score"], reverse=True)
     chosen = candidates_evals[0]
-    df2 = chosen["df"]
-    _state["df"] = df2
+    if chosen["stats"].get("timed_out"):
+        logger.warning("[/api/transform] candidate#%d timed out on the full table", chosen["idx"])
+        return {"error": "pattern timed out", "pattern": chosen["pattern"]}, 422
+    if ctx is not None:
+        ctx.set_stage("saving")  # last chance to cancel before the dataset changes
+    with metrics.span("materialize"):
+        df2 = materialize(df, chosen["evaluation"])
+    history_state = _save_version(stored, df2, chosen["evaluation"], prompt)
+    metrics.CELLS_CHANGED.inc(chosen["stats"]["updated_cells"])
+    # Only the winner's changes were needed; drop the rest before responding.
+    for c in candidates_evals:
+        c.pop("plan", None)
+        c.pop("evaluation", None)
+    transformation = _record_transformation(stored.dataset_id, prompt, plan.intent, chosen, cols_to_use)
 
     payload = {
+        "dataset_id": stored.dataset_id,
+        "transformation_id": transformation.pk if transformation is not None else None,
         "prompt": prompt,
         "intent": plan.intent,
         "pattern": chosen["pattern"],
@@ -180,12 +525,15 @@ def transform_data(request):
         "replacement": chosen.get("replacement"),
         "format": chosen.get("format"),
         "assumptions": plan.assumptions,
+        "scoring": scoring,
+        "history": history_state,
         "stats": {
             "updated_rows": chosen["stats"]["updated_rows"],
             "updated_cells": chosen["stats"]["updated_cells"]
         },
+        "added_columns": chosen["stats"].get("added_columns", []),
         "headers": list(df2.columns),
-        "data": df2.head(100).fillna("").values.tolist(),
+        "data": display_rows(df2.head(100)),
         "candidates_debug": [
             {
                 "pattern": c["pattern"],
@@ -193,12 +541,520 @@ def transform_data(request):
                 "replacement": c["replacement"],
                 "format": c["format"],
                 "score": c["score"],
-                "stats": c["stats"]
+                "stats": c["stats"],
+                "safety": c["safety"],
             } for c in candidates_evals
-        ]
+        ],
+        "rejected_candidates": rejected,
     }
 
-    pp = dict(payload); pp.pop("data", None)
-    print(f"[/api/transform] 200 response (preview): {pp}")
+    logger.info(
+        "[/api/transform] applied candidate#%d pattern=%s: %d cells in %d rows",
+        chosen["idx"], chosen["pattern"], payload["stats"]["updated_cells"], payload["stats"]["updated_rows"],
+    )
+
+    return payload, 200
+
+def _parse_pipeline_steps(raw) -> list[dict]:
+    """
+    Normalize the "steps" of a pipeline request. A step is an instruction
+    string, {"prompt", "columns"?}, or an already-compiled plan
+    {"pattern", "intent"?, "flags"?, "replacement"?, "format"?, "columns"?}
+    that skips the LLM. Raises ValueError for anything else.
+    """
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("steps must be a non-empty list")
+    if len(raw) > settings.PIPELINE_MAX_STEPS:
+        raise ValueError(f"at most {settings.PIPELINE_MAX_STEPS} steps are allowed")
+
+    steps = []
+    for i, item in enumerate(raw, start=1):
+        if isinstance(item, str):
+            item = {"prompt": item}
+        if not isinstance(item, dict):
+            raise ValueError(f"step {i}: expected a string or an object")
+        columns = item.get("columns") or []
+        if not isinstance(columns, list) or not all(isinstance(c, str) for c in columns):
+            raise ValueError(f"step {i}: columns must be a list of names")
+
+        if item.get("pattern"):
+            try:
+                plan = CompilePlan(
+                    is_table_op=True,
+                    intent=item.get("intent") or "replace",
+                    reason="",
+                    columns=columns,
+                    candidates=[RegexCandidate(
+                        engine="regex",
+                        pattern=item["pattern"],
+                        flags=item.get("flags") or [],
+                        replacement=item.get("replacement"),
+                        format=item.get("format"),
+                        explanation=item.get("prompt") or "",
+                    )],
+                )
+            except ValidationError as e:
+                raise ValueError(f"step {i}: {e.errors()[0]['msg']}") from e
+            steps.append({"prompt": item.get("prompt") or item["pattern"], "columns": columns, "plan": plan})
+            continue
+
+        prompt = item.get("prompt")
+        if not isinstance(prompt, str) or not prompt.strip():
+            raise ValueError(f"step {i}: prompt or pattern is required")
+        steps.append({"prompt": prompt, "columns": columns, "plan": None})
+    return steps
+
+def _plan_pipeline(stored: StoredDataset, steps: list[dict]) -> None:
+    """Fill in the LLM plan of every instruction step, concurrently."""
+    pending = [s for s in steps if s["plan"] is None]
+    if not pending:
+        return
+    # Same arguments as /api/transform, so both share plan-cache entries.
+    context = _planner_context(stored)
+    with ThreadPoolExecutor(max_workers=min(len(pending), settings.PIPELINE_PLAN_WORKERS)) as ex:
+        plan_step = metrics.carry_context(lambda s: compile_regex_plan(nl=s["prompt"], k=3, **context))
+        plans = list(ex.map(plan_step, pending))
+    for step, plan in zip(pending, plans):
+        step["plan"] = plan
+
+@csrf_exempt
+@api_view(["POST"])
+def run_pipeline(request):
+    """
+    Apply an ordered list of instructions as one transform.
 
-    return Response(payload, status=200)
\ No newline at end of file
+    Body: {"steps": [...], "dataset_id"?, "sample_rows"?, "async"?}. Every
+    step is planned up front, its candidate is picked on a row sample that
+    has already been through the earlier steps, and the chosen patterns
+    then run over the table in a single fused pass that records one
+    history step.
+    """
+    data = request.data or {}
+    session_id = None if isinstance(data, dict) and data.get("dataset_id") else request.session.get("dataset_id")
+    if not isinstance(data, dict):
+        return Response({"error": "JSON object body required"}, status=400)
+    dataset_id = data.get("dataset_id") or session_id
+    stored = dataset_store.store.get(dataset_id) if isinstance(dataset_id, str) else None
+    if stored is None:
+        return Response({"error": "Upload a file first."}, status=400)
+    try:
+        steps = _parse_pipeline_steps(data.get("steps"))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    logger.info("[/api/pipeline] received %d steps", len(steps))
+
+    if _wants_job(request):
+        job = jobs.submit("pipeline", _pipeline_job, stored.dataset_id, dict(data), dataset_id=stored.dataset_id)
+        return Response(jobs.describe(job), status=status.HTTP_202_ACCEPTED)
+
+    try:
+        _plan_pipeline(stored, steps)
+    except Exception as e:
+        logger.warning("[/api/pipeline] LLM call failed: %s", e)
+        return Response({"error": f"compile failed: {str(e)}"}, status=502)
+
+    payload, code = _run_pipeline(stored, steps, data)
+    return Response(payload, status=code)
+
+def _pipeline_job(ctx: jobs.JobContext, dataset_id: str, data: dict) -> tuple[dict, int]:
+    stored = dataset_store.store.get(dataset_id)
+    if stored is None:
+        return {"error": "Upload a file first."}, 400
+    steps = _parse_pipeline_steps(data.get("steps"))
+    ctx.set_stage("planning")
+    try:
+        _plan_pipeline(stored, steps)
+    except Exception as e:
+        logger.warning("[/api/pipeline] LLM call failed: %s", e)
+        return {"error": f"compile failed: {str(e)}"}, 502
+    return _run_pipeline(stored, steps, data, ctx)
+
+@_latest
+def _run_pipeline(
+    stored: StoredDataset, steps: list[dict], data: dict, ctx: jobs.JobContext | None = None
+) -> tuple[dict, int]:
+    df = stored.df
+    sample_rows = data.get("sample_rows", settings.TRANSFORM_SAMPLE_ROWS)
+    try:
+        sample_rows = int(sample_rows)
+    except (TypeError, ValueError):
+        return {"error": "sample_rows must be an integer"}, 400
+    sample = df.take(stratified_positions(len(df), sample_rows)) if 0 < sample_rows < len(df) else df
+
+    # Pick each step's candidate on the sample as it looks after the steps
+    # before it; only these small frames are ever materialized.
+    chosen = []
+    for i, step in enumerate(steps, start=1):
+        plan = step["plan"]
+        if not plan.is_table_op:
+            logger.info("[/api/pipeline] step %d invalid input: %s", i, plan.reason)
+            return {"error": "invalid_input", "step": i, "reason": plan.reason or "输入与表格文本处理无关"}, 422
+        cols_to_use = step["columns"] or _plan_columns(plan, df)
+        candidates_evals, rejected = _compile_candidates(plan, sample, cols_to_use)
+        if not candidates_evals:
+            logger.info("[/api/pipeline] step %d: no valid regex candidate", i)
+            return {"error": "no valid regex candidate produced", "step": i, "rejected_candidates": rejected}, 422
+
+        sample_cells = len(sample) * max(1, len(cols_to_use))
+        evaluations = evaluate_plans(sample, [c["plan"] for c in candidates_evals], cols_to_use)
+        for c, ev in zip(candidates_evals, evaluations):
+            c["score"] = -2.0 if ev.stats.get("timed_out") else _score_candidate(ev.stats, sample_cells, _is_slow(c))
+        best = max(range(len(candidates_evals)), key=lambda k: candidates_evals[k]["score"])
+        if evaluations[best].stats.get("timed_out"):
+            return {"error": "pattern timed out", "step": i, "pattern": candidates_evals[best]["pattern"]}, 422
+        sample = materialize(sample, evaluations[best])
+
+        winner = candidates_evals[best]
+        logger.debug("[/api/pipeline] step %d candidate#%d score=%s pattern=%s", i, winner["idx"], winner["score"], winner["pattern"])
+        chosen.append({**winner, "prompt": step["prompt"], "intent": plan.intent, "columns": cols_to_use,
+                       "assumptions": plan.assumptions, "rejected_candidates": rejected})
+
+    if ctx is not None:
+        ctx.set_stage("evaluating")
+    try:
+        with metrics.span("evaluate"):
+            evaluation = evaluate_pipeline(
+                df, [(c["plan"], c["columns"]) for c in chosen],
+                workers=settings.TRANSFORM_WORKERS,
+                min_parallel_rows=settings.TRANSFORM_PARALLEL_MIN_ROWS,
+                progress=ctx.progress if ctx is not None else None,
+            )
+    except PatternTimeout as e:
+        logger.warning("[/api/pipeline] %s", e)
+        return {"error": "pattern timed out", "detail": str(e)}, 422
+
+    if ctx is not None:
+        ctx.set_stage("saving")
+    metrics.CELLS.inc(len(df) * sum(max(1, len(c["columns"])) for c in chosen), stage="evaluate")
+    with metrics.span("materialize"):
+        df2 = materialize(df, evaluation)
+    history_state = _save_version(stored, df2, evaluation, " → ".join(c["prompt"] for c in chosen))
+    metrics.CELLS_CHANGED.inc(evaluation.stats["updated_cells"])
+    for c, step_stats in zip(chosen, evaluation.stats["steps"]):
+        c["stats"] = step_stats
+        c.pop("plan", None)
+        transformation = _record_transformation(stored.dataset_id, c["prompt"], c["intent"], c, c["columns"])
+        c["transformation_id"] = transformation.pk if transformation is not None else None
+
+    payload = {
+        "dataset_id": stored.dataset_id,
+        "steps": [
+            {
+                "transformation_id": c["transformation_id"],
+                "prompt": c["prompt"],
+                "intent": c["intent"],
+                "pattern": c["pattern"],
+                "flags": c["flags"],
+                "columns": c["columns"],
+                "replacement": c["replacement"],
+                "format": c["format"],
+                "assumptions": c["assumptions"],
+                "stats": c["stats"],
+                "safety": c["safety"],
+                "rejected_candidates": c["rejected_candidates"],
+            } for c in chosen
+        ],
+        "history": history_state,
+        "stats": {
+            "updated_rows": evaluation.stats["updated_rows"],
+            "updated_cells": evaluation.stats["updated_cells"],
+        },
+        "added_columns": list(evaluation.added),
+        "headers": list(df2.columns),
+        "data": display_rows(df2.head(100)),
+    }
+    logger.info("[/api/pipeline] applied %d steps, stats=%s", len(chosen), payload["stats"])
+    return payload, 200
+
+def _recipe_dict(recipe: Recipe) -> dict:
+    return {
+        "name": recipe.name,
+        "description": recipe.description,
+        "steps": recipe.steps,
+        "created_at": recipe.created_at.isoformat(),
+        "updated_at": recipe.updated_at.isoformat(),
+    }
+
+def _steps_from_transformations(ids) -> list[dict]:
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+        raise RecipeError("transformations must be a non-empty list of ids")
+    found = Transformation.objects.in_bulk(ids)
+    missing = [i for i in ids if i not in found]
+    if missing:
+        raise RecipeError(f"unknown transformations: {missing}")
+    return [found[i].as_step() for i in ids]
+
+@csrf_exempt
+@api_view(["GET", "POST"])
+def recipes(request):
+    """
+    GET lists saved recipes. POST saves one: {"name", "description"?, and
+    either "transformations": [ids, in order] or "steps": [compiled steps]}.
+    """
+    if request.method == "GET":
+        return Response({"recipes": [_recipe_dict(r) for r in Recipe.objects.all()]})
+
+    data = request.data if isinstance(request.data, dict) else {}
+    name = data.get("name")
+    if not isinstance(name, str) or not name.strip() or len(name) > 128:
+        return Response({"error": "name is required (max 128 characters)"}, status=400)
+    try:
+        if "transformations" in data:
+            steps = _steps_from_transformations(data["transformations"])
+        else:
+            steps = data.get("steps")
+        steps = normalize_steps(steps)
+    except RecipeError as e:
+        return Response({"error": str(e)}, status=400)
+
+    recipe, created = Recipe.objects.get_or_create(
+        name=name.strip(), defaults={"steps": steps, "description": data.get("description") or ""},
+    )
+    if not created:
+        if not data.get("overwrite"):
+            return Response({"error": f"recipe '{recipe.name}' already exists"}, status=409)
+        recipe.steps = steps
+        recipe.description = data.get("description") or recipe.description
+        recipe.save()
+    return Response(_recipe_dict(recipe), status=201 if created else 200)
+
+@csrf_exempt
+@api_view(["GET", "DELETE"])
+def recipe_detail(request, name: str):
+    recipe = Recipe.objects.filter(name=name).first()
+    if recipe is None:
+        return Response({"error": "recipe not found"}, status=404)
+    if request.method == "DELETE":
+        recipe.delete()
+        return Response(status=204)
+    return Response(_recipe_dict(recipe))
+
+@csrf_exempt
+@api_view(["POST"])
+def recipe_apply(request, name: str):
+    """Replay a recipe on a stored dataset as one pipeline, without the LLM."""
+    recipe = Recipe.objects.filter(name=name).first()
+    if recipe is None:
+        return Response({"error": "recipe not found"}, status=404)
+    data = request.data if isinstance(request.data, dict) else {}
+    dataset_id = data.get("dataset_id") or request.session.get("dataset_id")
+    stored = dataset_store.store.get(dataset_id) if isinstance(dataset_id, str) else None
+    if stored is None:
+        return Response({"error": "Upload a file first."}, status=400)
+
+    try:
+        steps = _parse_pipeline_steps(recipe.steps)
+    except ValueError as e:
+        return Response({"error": f"recipe cannot be applied: {e}"}, status=400)
+    logger.info("[/api/recipes] applying '%s' (%d steps) to %s", recipe.name, len(steps), stored.dataset_id)
+    if _wants_job(request):
+        job = jobs.submit("recipe", _pipeline_job, stored.dataset_id, {**data, "steps": recipe.steps},
+                          dataset_id=stored.dataset_id)
+        return Response(jobs.describe(job), status=status.HTTP_202_ACCEPTED)
+    payload, code = _run_pipeline(stored, steps, data)
+    if code == 200:
+        payload["recipe"] = recipe.name
+    return Response(payload, status=code)
+
+def _int_param(params, name: str, default: int, lo: int, hi: int | None = None) -> int:
+    raw = params.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(name) from None
+    if value < lo or (hi is not None and value > hi):
+        raise ValueError(name)
+    return value
+
+ROW_LAYOUTS = ("rows", "columns")
+
+def _page_rows(page: pd.DataFrame, layout: str = "rows") -> list[list]:
+    return display_columns(page) if layout == "columns" else display_rows(page)
+
+def _page_table(page: pd.DataFrame, meta: dict) -> pa.Table:
+    """The window as Arrow string columns (missing stays null), with `meta` as JSON schema metadata."""
+    table = pa.Table.from_pandas(text_frame(page), preserve_index=False)
+    return table.replace_schema_metadata({"page": json.dumps(meta)})
+
+@api_view(["GET"])
+@renderer_classes([JSONRenderer, ArrowStreamRenderer])
+def dataset_rows(request):
+    """
+    A window of a stored dataset: ?offset=&limit=&columns=a,b&changed_only=1.
+
+    Only the requested slice is converted, so each call costs O(limit)
+    regardless of table size. `layout=columns` returns "data" as one list
+    per column instead of one per row. With `Accept:
+    application/vnd.apache.arrow.stream` the window is sent as an Arrow IPC
+    stream instead, the other fields as JSON under the "page" schema
+    metadata key. Responses carry an ETag derived from the dataset version,
+    the window and the representation, and repeat requests with a matching
+    If-None-Match get a 304.
+    """
+    params = request.query_params
+    dataset_id = params.get("dataset_id") or request.session.get("dataset_id")
+    stored = dataset_store.store.get(dataset_id) if dataset_id else None
+    if stored is None:
+        return Response({"error": "Upload a file first."}, status=404)
+
+    try:
+        offset = _int_param(params, "offset", 0, 0)
+        limit = _int_param(params, "limit", 100, 1, settings.ROWS_PAGE_MAX)
+    except ValueError as e:
+        return Response({"error": f"invalid {e}"}, status=400)
+
+    df = stored.df
+    columns = [c for c in params.get("columns", "").split(",") if c] or list(df.columns)
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        return Response({"error": "unknown columns", "columns": missing}, status=400)
+    changed_only = params.get("changed_only") in ("1", "true", "yes")
+    layout = params.get("layout") or "rows"
+    if layout not in ROW_LAYOUTS:
+        return Response({"error": f"layout must be one of {', '.join(ROW_LAYOUTS)}"}, status=400)
+    fmt = request.accepted_renderer.format
+
+    tag = hashlib.sha1(json.dumps(
+        [stored.dataset_id, list(stored.version), offset, limit, columns, changed_only, layout, fmt]
+    ).encode()).hexdigest()
+    etag = quote_etag(tag)
+    if etag in [t.strip() for t in request.headers.get("If-None-Match", "").split(",")]:
+        return HttpResponseNotModified(headers={"ETag": etag, "Vary": "Accept"})
+
+    if changed_only:
+        changed = dataset_store.store.changed_rows(stored.dataset_id)
+        changed = changed if changed is not None else []
+        total = len(changed)
+        row_ids = [int(i) for i in changed[offset:offset + limit]]
+    else:
+        total = len(df)
+        row_ids = list(range(min(offset, total), min(offset + limit, total)))
+
+    page = df.iloc[row_ids][columns] if row_ids else df.iloc[0:0][columns]
+    payload = {
+        "dataset_id": stored.dataset_id,
+        "offset": offset,
+        "limit": limit,
+        "total_rows": total,
+        "changed_only": changed_only,
+        "columns": columns,
+        "row_ids": row_ids,
+    }
+    if fmt == "arrow":
+        response = Response(_page_table(page, payload))
+    else:
+        response = Response({**payload, "layout": layout, "data": _page_rows(page, layout)})
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    response["Vary"] = "Accept"
+    return response
+
+
+@require_GET
+def export_dataset(request):
+    """
+    Download the full stored dataset: ?format=csv|xlsx|parquet|jsonl
+    &columns=a,b&gzip=1. The body is produced slice by slice as the client
+    reads it (services.export), so server memory stays flat for any size.
+    """
+    params = request.GET
+    dataset_id = params.get("dataset_id") or request.session.get("dataset_id")
+    stored = dataset_store.store.get(dataset_id) if dataset_id else None
+    if stored is None:
+        return JsonResponse({"error": "Upload a file first."}, status=404)
+
+    df = stored.df
+    columns = [c for c in params.get("columns", "").split(",") if c]
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        return JsonResponse({"error": "unknown columns", "columns": missing}, status=400)
+    if columns:
+        df = df[columns]
+
+    fmt = params.get("format", "csv").lower()
+    error = export.check_exportable(df, fmt)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+    compress = params.get("gzip") in ("1", "true", "yes")
+
+    content_type, ext = export.FORMATS[fmt]
+    filename = f"{Path(stored.name or 'dataset').stem or 'dataset'}{ext}"
+    if compress:
+        content_type, filename = "application/gzip", filename + ".gz"
+    response = StreamingHttpResponse(
+        export.stream_export(df, fmt, compress, settings.EXPORT_CHUNK_ROWS), content_type=content_type,
+    )
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    response["X-Total-Rows"] = str(len(df))
+    return response
+
+@api_view(["GET"])
+def dataset_history(request):
+    dataset_id = request.query_params.get("dataset_id") or request.session.get("dataset_id")
+    stored = dataset_store.store.get(dataset_id) if dataset_id else None
+    if stored is None:
+        return Response({"error": "Upload a file first."}, status=404)
+    return Response({"dataset_id": stored.dataset_id, "history": _history(stored.dataset_id).state()})
+
+@csrf_exempt
+@api_view(["POST"])
+def history_action(request, action: str):
+    """POST /api/history/undo, /redo, or /jump with {"step": n}."""
+    data = request.data or {}
+    dataset_id = data.get("dataset_id") or request.session.get("dataset_id")
+    stored = dataset_store.store.get(dataset_id) if isinstance(dataset_id, str) else None
+    if stored is None:
+        return Response({"error": "Upload a file first."}, status=404)
+
+    if action not in ("undo", "redo", "jump"):
+        return Response({"error": f"unknown action: {action}"}, status=404)
+    payload, code = _history_move(stored, action, data.get("step"))
+    return Response(payload, status=code)
+
+@_latest
+def _history_move(stored: StoredDataset, action: str, step) -> tuple[dict, int]:
+    history = _history(stored.dataset_id)
+    previous = history.state()["cursor"]
+    try:
+        if action == "undo":
+            df2, rows = history.undo(stored.df)
+        elif action == "redo":
+            df2, rows = history.redo(stored.df)
+        else:
+            df2, rows = history.jump(stored.df, int(step))
+    except (TypeError, ValueError):
+        return {"error": "step must be an integer"}, 400
+    except HistoryError as e:
+        return {"error": str(e)}, 409
+
+    try:
+        dataset_store.store.put(stored.dataset_id, df2, changed_rows=rows)
+    except BaseException:
+        history.restore_cursor(previous)
+        raise
+    return {
+        "dataset_id": stored.dataset_id,
+        "history": history.state(),
+        "stats": {"updated_rows": int(len(rows))},
+        "headers": list(df2.columns),
+        "data": display_rows(df2.head(100)),
+    }, 200
+
+
+@api_view(["GET"])
+def job_status(request, job_id: str):
+    job = Job.objects.filter(job_id=job_id).first()
+    if job is None:
+        return Response({"error": "job not found"}, status=404)
+    return Response(jobs.describe(job))
+
+@csrf_exempt
+@api_view(["POST"])
+def job_cancel(request, job_id: str):
+    job = jobs.cancel(job_id)
+    if job is None:
+        return Response({"error": "job not found"}, status=404)
+    return Response(jobs.describe(job))
@@ -21,6 +21,7 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    "api.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -54,9 +55,102 @@ STATIC_URL = "/static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
-REST_FRAMEWORK = {"DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"]}
+# Candidate evaluation in /api/transform: thread count and the minimum rows
+# per shard before a table is split across threads. Serial by default: only
+# the Arrow kernels gain from threads, and the Python tiers run slower on
+# them, so raise this only where `manage.py bench evaluate_` shows
+# evaluate_parallel_4 beating evaluate_serial.
+TRANSFORM_WORKERS = int(os.getenv("TRANSFORM_WORKERS", "1"))
+TRANSFORM_PARALLEL_MIN_ROWS = int(os.getenv("TRANSFORM_PARALLEL_MIN_ROWS", "100000"))
+
+# Rank candidates on a stratified sample of this many rows (0 = always score
+# on the full table); escalate to a full evaluation when the top two are
+# within each other's confidence bounds (z-score below).
+TRANSFORM_SAMPLE_ROWS = int(os.getenv("TRANSFORM_SAMPLE_ROWS", "20000"))
+TRANSFORM_SAMPLE_Z = float(os.getenv("TRANSFORM_SAMPLE_Z", "1.96"))
+TRANSFORM_SAMPLE_ESCALATE = os.getenv("TRANSFORM_SAMPLE_ESCALATE", "1") == "1"
+
+# Candidate patterns are screened before evaluation (services.pattern_safety):
+# each is timed on REGEX_BENCH_CELLS sample cells and rejected if one cell
+# takes longer than REGEX_CELL_TIMEOUT seconds; a per-cell cost above
+# REGEX_CELL_BUDGET_US microseconds down-ranks it. Risky patterns then run
+# under the per-cell limit and a REGEX_COLUMN_TIMEOUT per column shard.
+REGEX_CELL_TIMEOUT = float(os.getenv("REGEX_CELL_TIMEOUT", "0.05"))
+REGEX_COLUMN_TIMEOUT = float(os.getenv("REGEX_COLUMN_TIMEOUT", "30"))
+REGEX_CELL_BUDGET_US = float(os.getenv("REGEX_CELL_BUDGET_US", "200"))
+REGEX_BENCH_CELLS = int(os.getenv("REGEX_BENCH_CELLS", "200"))
+
+# /api/pipeline: maximum steps per request and how many steps are planned
+# by the LLM concurrently.
+PIPELINE_MAX_STEPS = int(os.getenv("PIPELINE_MAX_STEPS", "20"))
+PIPELINE_PLAN_WORKERS = int(os.getenv("PIPELINE_PLAN_WORKERS", "4"))
+
+# Worker processes used by `manage.py apply_recipe` (one file per process).
+RECIPE_WORKERS = int(os.getenv("RECIPE_WORKERS", os.cpu_count() or 1))
+
+# Default for the upload "typed" field: infer numeric, date, boolean and
+# categorical columns instead of keeping every column as text. Blanks in
+# converted columns become missing, which transforms leave untouched; text
+# columns keep them as "" (see dtypes.infer_column).
+LOAD_TYPED = os.getenv("LOAD_TYPED", "0") == "1"
+
+# /api/export serializes this many rows per streamed chunk.
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "50000"))
+
+
+# LLM plan cache: in-process LRU size, shared (database) tier size and TTL.
+# A TTL of 0 disables caching.
+PLAN_CACHE_MEMORY_ENTRIES = int(os.getenv("PLAN_CACHE_MEMORY_ENTRIES", "512"))
+PLAN_CACHE_DISK_ENTRIES = int(os.getenv("PLAN_CACHE_DISK_ENTRIES", "10000"))
+PLAN_CACHE_TTL_SECONDS = int(os.getenv("PLAN_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+# Background jobs (/api/upload and /api/transform with async=1): size of the
+# in-process worker pool. JOB_EAGER runs jobs inline, for tests and scripts.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_EAGER = os.getenv("JOB_EAGER", "0") == "1"
+
+
+REST_FRAMEWORK = {"DEFAULT_RENDERER_CLASSES": ["api.renderers.JSONRenderer"]}
 
 
 MEDIA_ROOT = BASE_DIR / "api" / "storage"
 MEDIA_URL = "/media/"
-MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
+
+
+# Parsed datasets: a directory shared by every worker process, and the
+# per-process memory budget for frames kept resident between requests.
+DATASET_STORE_DIR = Path(os.getenv("DATASET_STORE_DIR", MEDIA_ROOT / "datasets"))
+DATASET_STORE_MEMORY_BYTES = int(os.getenv("DATASET_STORE_MEMORY_MB", "1024")) * 1024 * 1024
+
+# Datasets (with their undo history) unused for this long are deleted from
+# DATASET_STORE_DIR when new ones are created; 0 keeps them forever.
+DATASET_RETENTION_SECONDS = float(os.getenv("DATASET_RETENTION_HOURS", "168")) * 3600
+
+# Parsed uploads kept for re-uploads of the same bytes, keyed by content hash
+# (files are shared with the datasets made from them; oldest dropped first).
+PARSE_CACHE_BYTES = int(os.getenv("PARSE_CACHE_MB", "2048")) * 1024 * 1024
+
+# Per-dataset cap on undo history (cell deltas on disk); oldest steps are
+# dropped first.
+HISTORY_BUDGET_BYTES = int(os.getenv("HISTORY_BUDGET_MB", "256")) * 1024 * 1024
+
+# Largest window /api/rows will serve in one response.
+ROWS_PAGE_MAX = int(os.getenv("ROWS_PAGE_MAX", "5000"))
+
+
+# Instrumentation: per-stage timings go to /metrics (Prometheus), the
+# Server-Timing header and one log line per request. With PROFILE_REQUESTS=1,
+# a request sent with `X-Profile: 1` runs under cProfile and its stats are
+# written to PROFILE_DIR (open them with snakeviz or pstats).
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0") == "1"
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", BASE_DIR / "profiles"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"plain": {"format": "%(asctime)s %(levelname)s %(name)s: %(message)s"}},
+    "handlers": {"console": {"class": "logging.StreamHandler", "formatter": "plain"}},
+    "loggers": {"api": {"handlers": ["console"], "level": os.getenv("LOG_LEVEL", "INFO"), "propagate": False}},
+}
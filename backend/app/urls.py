@@ -1,16 +1,24 @@
 from django.contrib import admin
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.urls import path, include
+from django.views.decorators.http import require_GET
+
+from api.services.metrics import registry
 
 def root(_request):
     return JsonResponse({
         "service": "regex-match-replace-backend",
         "status": "ok",
-        "endpoints": ["/api/upload", "/api/transform", "/api/llm-preview"]
+        "endpoints": ["/api/upload", "/api/transform", "/api/transform-async", "/api/pipeline", "/api/recipes", "/api/rows", "/api/export", "/api/history", "/api/jobs/<id>", "/api/llm-preview", "/metrics"]
     })
 
+@require_GET
+def metrics(_request):
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 urlpatterns = [
     path("", root),                 # ← 新增：根健康页
     path("admin/", admin.site.urls),
     path("api/", include("api.urls")),
+    path("metrics", metrics),
 ]
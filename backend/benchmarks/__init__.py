@@ -0,0 +1,7 @@
+"""
+Performance benchmarks: ingest (load_to_df), regex application, candidate
+scoring and the /api/upload + /api/transform flow on synthetic data.
+
+Run them with `python manage.py bench` (see that command's --help); the
+reference numbers live in baseline.json next to this file.
+"""
@@ -0,0 +1,191 @@
+# benchmarks/cases.py
+from __future__ import annotations
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
+
+from api import views
+from api.services import dataset_store
+from api.services.file_io import load_to_df
+from api.services.llm_client import CompilePlan
+from api.services.regex_engine import apply_plan, compile_pattern, compile_plan, evaluate_plans
+
+from .datasets import Spec, csv_bytes, frame, xlsx_bytes
+
+
+@dataclass
+class Case:
+    """
+    One benchmark. `setup` builds its input once (untimed); `run` is timed
+    on that input and must leave it reusable. `rows` is what one run
+    processes, for throughput.
+    """
+    name: str
+    rows: int
+    setup: Callable[[], Any]
+    run: Callable[[Any], Any]
+
+
+def _plan(pattern: str, intent: str, **cand):
+    cand = SimpleNamespace(**{"replacement": None, "format": None, "flags": [], **cand})
+    return compile_plan(compile_pattern(pattern), intent, cand)
+
+
+def _llm_plan(intent: str, columns: list[str], *candidates: tuple[str, str]) -> CompilePlan:
+    key = "format" if intent == "normalize" else "replacement"
+    return CompilePlan.model_validate({
+        "is_table_op": True, "intent": intent, "reason": "benchmark", "columns": columns,
+        "candidates": [{"engine": "regex", "pattern": p, key: r, "explanation": ""} for p, r in candidates],
+    })
+
+
+# Used by the scoring and end-to-end cases: three competing email maskers.
+EMAIL_CANDIDATES = (
+    (r"[\w.+-]+@[\w-]+\.[\w.]+", "***"),
+    (r"\S+@\S+", "***"),
+    (r"user\d+@", "***@"),
+)
+
+# Used by the evaluate cases: one plan per tier (Arrow, stdlib `re`, `regex`).
+EVALUATE_PLANS = (
+    (r"\S+@\S+", "mask", {"replacement": "***"}),
+    (r"(\w)\1", "replace", {"replacement": "$1"}),
+    (r"(\p{Lu})\p{Ll}+", "normalize", {"format": "$1."}),
+)
+
+
+# -----------------------
+# Ingest
+# -----------------------
+def _file_case(name: str, spec: Spec, suffix: str, typed: bool = False) -> Case:
+    def setup():
+        path = Path(tempfile.mkdtemp(prefix="bench-")) / f"data{suffix}"
+        path.write_bytes(xlsx_bytes(spec) if suffix == ".xlsx" else csv_bytes(spec))
+        return path
+    return Case(name, spec.rows, setup, lambda path: load_to_df(path, typed=typed))
+
+
+# -----------------------
+# Regex application
+# -----------------------
+def _apply_case(name: str, spec: Spec, plan_args: tuple, columns=None) -> Case:
+    def setup():
+        return frame(spec), _plan(*plan_args[:2], **plan_args[2])
+    return Case(name, spec.rows, setup, lambda state: apply_plan(state[0], state[1], columns))
+
+
+def _scoring_case(name: str, spec: Spec, sample_rows: int) -> Case:
+    """Candidate screening, ranking (sampled or full) and the winner's full pass."""
+    def setup():
+        df = frame(spec)
+        return df, _llm_plan("mask", ["email"], *EMAIL_CANDIDATES)
+
+    def run(state):
+        df, llm_plan = state
+        cols = ["email"]
+        total_cells = len(df)
+        candidates, _rejected = views._compile_candidates(llm_plan, df, cols)
+        if 0 < sample_rows < len(df):
+            views._score_on_sample(df, candidates, cols, total_cells, sample_rows)
+            return evaluate_plans(df, [candidates[0]["plan"]], cols)
+        return evaluate_plans(df, [c["plan"] for c in candidates], cols)
+    return Case(name, spec.rows, setup, run)
+
+
+def _evaluate_case(name: str, spec: Spec, plan_args: tuple, workers: int) -> Case:
+    """
+    evaluate_plans over every column on `workers` threads, so the sharded
+    path can be compared with the serial one before TRANSFORM_WORKERS is raised.
+    """
+    def setup():
+        plans = [_plan(*args[:2], **args[2]) for args in plan_args]
+        return frame(spec), plans
+
+    def run(state):
+        df, plans = state
+        return evaluate_plans(df, plans, None, workers=workers, min_parallel_rows=max(1, spec.rows // 8))
+    return Case(name, spec.rows, setup, run)
+
+
+# -----------------------
+# Responses
+# -----------------------
+def _rows_case(name: str, spec: Spec, window: int, accept: str = "application/json", layout: str = "rows") -> Case:
+    """GET /api/rows for one `window`-row page, rendered as negotiated by `accept`."""
+    def setup():
+        return dataset_store.store.create(frame(spec), "bench.csv").dataset_id
+
+    def run(dataset_id):
+        r = Client().get("/api/rows", {"dataset_id": dataset_id, "limit": window, "layout": layout},
+                         HTTP_ACCEPT=accept)
+        assert r.status_code == 200, r.content[:200]
+    return Case(name, window, setup, run)
+
+
+# -----------------------
+# End to end
+# -----------------------
+def _end_to_end_case(name: str, spec: Spec, reupload: bool = False) -> Case:
+    """
+    POST /api/upload then /api/transform, with the planner stubbed out.
+    Every upload is parsed unless `reupload`, which times the parse cache.
+    """
+    def setup():
+        data = csv_bytes(spec)
+        if reupload:
+            Client().post("/api/upload", {"file": SimpleUploadedFile("bench.csv", data, content_type="text/csv")})
+        return data, _llm_plan("mask", ["email"], *EMAIL_CANDIDATES)
+
+    def run(state):
+        data, llm_plan = state
+        client = Client()
+        upload = SimpleUploadedFile("bench.csv", data, content_type="text/csv")
+        if reupload:
+            r = client.post("/api/upload", {"file": upload})
+        else:
+            with mock.patch.object(dataset_store.store.parsed, "get", return_value=None):
+                r = client.post("/api/upload", {"file": upload})
+        assert r.status_code == 200, r.content[:200]
+        with mock.patch.object(views, "compile_regex_plan", return_value=llm_plan):
+            r = client.post("/api/transform", {"prompt": "mask emails"}, content_type="application/json")
+        assert r.status_code == 200, r.content[:200]
+    return Case(name, spec.rows, setup, run)
+
+
+def build_cases(scale: float = 1.0) -> dict[str, Case]:
+    """Every case, keyed by name; row counts are multiplied by `scale`."""
+    def n(rows: int) -> int:
+        return max(100, int(rows * scale))
+
+    cases = [
+        _file_case("load_csv_utf8", Spec(n(200_000)), ".csv"),
+        _file_case("load_csv_cp1252_semicolon", Spec(n(200_000), accented=True, encoding="cp1252", delimiter=";"), ".csv"),
+        _file_case("load_csv_utf16_tab", Spec(n(100_000), encoding="utf-16", delimiter="\t"), ".csv"),
+        _file_case("load_csv_wide", Spec(n(20_000), cols=60), ".csv"),
+        _file_case("load_csv_typed_lowcard", Spec(n(200_000), cardinality=500), ".csv", typed=True),
+        _file_case("load_xlsx", Spec(n(20_000)), ".xlsx"),
+        _apply_case("apply_arrow_mask", Spec(n(500_000), cols=1), (r"\S+@\S+", "mask", {"replacement": "***"})),
+        _apply_case("apply_python_unique", Spec(n(200_000), accented=True),
+                    (r"(\p{Lu})\p{Ll}+", "normalize", {"format": "$1."}), ["name"]),
+        _apply_case("apply_python_lowcard", Spec(n(1_000_000), accented=True, cardinality=2_000),
+                    (r"(\p{Lu})\p{Ll}+", "normalize", {"format": "$1."}), ["name"]),
+        _apply_case("apply_wide_literal", Spec(n(100_000), cols=24, accented=True),
+                    (r"(\w+)@mail\.org", "replace", {"replacement": "$1@mail.net"})),
+        _scoring_case("score_candidates_sampled", Spec(n(500_000), cols=1), sample_rows=2_000),
+        _scoring_case("score_candidates_full", Spec(n(500_000), cols=1), sample_rows=0),
+        _evaluate_case("evaluate_serial", Spec(n(200_000), cols=2, accented=True), EVALUATE_PLANS, workers=1),
+        _evaluate_case("evaluate_parallel_4", Spec(n(200_000), cols=2, accented=True), EVALUATE_PLANS, workers=4),
+        _rows_case("rows_window_json", Spec(n(20_000), cols=20), window=n(5_000)),
+        _rows_case("rows_window_json_columns", Spec(n(20_000), cols=20), window=n(5_000), layout="columns"),
+        _rows_case("rows_window_arrow", Spec(n(20_000), cols=20), window=n(5_000),
+                   accept="application/vnd.apache.arrow.stream"),
+        _end_to_end_case("e2e_upload_transform", Spec(n(100_000))),
+        _end_to_end_case("e2e_reupload_transform", Spec(n(100_000)), reupload=True),
+    ]
+    return {c.name: c for c in cases}
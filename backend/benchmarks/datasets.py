@@ -0,0 +1,98 @@
+# benchmarks/datasets.py
+from __future__ import annotations
+import io
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+# Column generators, cycled to reach the requested width. Each maps an array
+# of integer keys (row ids, or ids drawn from a small pool for low
+# cardinality) to text cells.
+_DOMAINS = np.array(["example.com", "mail.org", "site.net", "corp.io"], dtype=object)
+_NAMES = np.array(["Ann", "Bob", "Chen", "Dara"], dtype=object)
+_NAMES_ACCENTED = np.array(["José", "Zoë", "Ingrid Ångström", "Renée"], dtype=object)
+
+
+def _email(keys: np.ndarray, accented: bool) -> np.ndarray:
+    user = np.char.add("user", keys.astype(str)).astype(object)
+    return user + "@" + _DOMAINS[keys % len(_DOMAINS)]
+
+
+def _phone(keys: np.ndarray, accented: bool) -> np.ndarray:
+    digits = np.char.zfill((keys * 7919 % 100_000_000).astype(str), 8).astype(object)
+    return np.array([f"+61 4{d[:2]} {d[2:5]} {d[5:]}" for d in digits], dtype=object)
+
+
+def _name(keys: np.ndarray, accented: bool) -> np.ndarray:
+    names = _NAMES_ACCENTED if accented else _NAMES
+    return names[keys % len(names)] + " " + keys.astype(str).astype(object)
+
+
+def _date(keys: np.ndarray, accented: bool) -> np.ndarray:
+    days = pd.Timestamp("2020-01-01") + pd.to_timedelta(keys % 2000, unit="D")
+    return days.strftime("%d/%m/%Y").to_numpy(dtype=object)
+
+
+def _code(keys: np.ndarray, accented: bool) -> np.ndarray:
+    return np.array([f"AB-{k % 10_000:04d}-{k % 7}" for k in keys], dtype=object)
+
+
+def _amount(keys: np.ndarray, accented: bool) -> np.ndarray:
+    return np.char.mod("%.2f", (keys % 100_000) / 100).astype(object)
+
+
+GENERATORS = {"email": _email, "phone": _phone, "name": _name, "date": _date, "code": _code, "amount": _amount}
+
+
+@dataclass(frozen=True)
+class Spec:
+    """
+    A synthetic table. `cardinality` is the number of distinct values per
+    column (None: every row distinct); `accented` puts non-ASCII letters in
+    the name columns, which also keeps regexes off the Arrow tier there.
+    """
+    rows: int
+    cols: int = 6
+    cardinality: Optional[int] = None
+    accented: bool = False
+    encoding: str = "utf-8"
+    delimiter: str = ","
+    seed: int = 0
+
+    def column_names(self) -> list[str]:
+        kinds = list(GENERATORS)
+        return [kinds[i % len(kinds)] + ("" if i < len(kinds) else f"_{i // len(kinds)}") for i in range(self.cols)]
+
+
+def frame(spec: Spec) -> pd.DataFrame:
+    """The table for `spec` as string columns; deterministic for a given seed."""
+    rng = np.random.default_rng(spec.seed)
+    kinds = list(GENERATORS)
+    columns = {}
+    for i, name in enumerate(spec.column_names()):
+        if spec.cardinality is None:
+            keys = rng.permutation(spec.rows) + i
+        else:
+            keys = rng.integers(0, spec.cardinality, spec.rows) + i
+        columns[name] = pd.array(GENERATORS[kinds[i % len(kinds)]](keys, spec.accented), dtype="string")
+    return pd.DataFrame(columns)
+
+
+def csv_bytes(spec: Spec) -> bytes:
+    text = frame(spec).to_csv(sep=spec.delimiter, index=False)
+    return text.encode(spec.encoding)
+
+
+def xlsx_bytes(spec: Spec) -> bytes:
+    df = frame(spec)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Data")
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False):
+        ws.append(list(row))
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
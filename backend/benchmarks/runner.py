@@ -0,0 +1,189 @@
+# benchmarks/runner.py
+from __future__ import annotations
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from multiprocessing import get_context
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+if TYPE_CHECKING:
+    from .cases import Case
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+# A case regresses when its median latency exceeds the baseline by this share.
+DEFAULT_THRESHOLD = 0.25
+
+
+@dataclass
+class Result:
+    name: str
+    rows: int
+    repeat: int
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+    rows_per_s: float
+    # Peak resident set of the process that ran the case (None where the
+    # platform cannot tell), and how much of it the case itself added.
+    peak_rss_mb: Optional[float]
+    case_rss_mb: Optional[float]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB elsewhere
+
+
+def measure(case: Case, repeat: int = 5, warmup: int = 1) -> Result:
+    """Time `case.run` `repeat` times after `warmup` untimed runs. The views' logging is silenced."""
+    rss_before = _peak_rss_mb()
+    state = case.setup()
+    times = []
+    logging.disable(logging.INFO)
+    try:
+        for _ in range(warmup):
+            case.run(state)
+        for _ in range(repeat):
+            started = time.perf_counter()
+            case.run(state)
+            times.append(time.perf_counter() - started)
+    finally:
+        logging.disable(logging.NOTSET)
+    rss_after = _peak_rss_mb()
+    ms = np.array(times) * 1000
+    p50 = float(np.percentile(ms, 50))
+    return Result(
+        name=case.name,
+        rows=case.rows,
+        repeat=repeat,
+        p50_ms=round(p50, 2),
+        p95_ms=round(float(np.percentile(ms, 95)), 2),
+        max_ms=round(float(ms.max()), 2),
+        rows_per_s=round(case.rows / (p50 / 1000)) if p50 else 0.0,
+        peak_rss_mb=None if rss_after is None else round(rss_after, 1),
+        case_rss_mb=None if rss_after is None else round(rss_after - rss_before, 1),
+    )
+
+
+# -----------------------
+# Isolated runs
+# -----------------------
+def prepare_environment() -> None:
+    """
+    Point the process at throwaway storage: an in-memory test database and
+    a temporary media/dataset directory, so the end-to-end case never
+    touches real data.
+    """
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    from api.services import dataset_store
+
+    root = Path(tempfile.mkdtemp(prefix="bench-media-"))
+    settings.MEDIA_ROOT = root
+    dataset_store.store = dataset_store.DatasetStore(root / "datasets", settings.DATASET_STORE_MEMORY_BYTES)
+    setup_test_environment()
+    with contextlib.redirect_stdout(io.StringIO()):
+        connection.creation.create_test_db(verbosity=0, serialize=False)
+
+
+# Workers are spawned: this module must stay importable before Django is
+# set up, so anything touching the api app is imported inside functions.
+def _init_worker() -> None:
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+    import django
+    django.setup()
+    prepare_environment()
+
+
+def _run_isolated(name: str, scale: float, repeat: int) -> Result:
+    from .cases import build_cases
+    return measure(build_cases(scale)[name], repeat)
+
+
+def run_cases(names: list[str], scale: float = 1.0, repeat: int = 5, isolated: bool = True):
+    """
+    Yield a Result per case. With `isolated`, every case runs in a fresh
+    process so its peak RSS is its own and no caches carry over.
+    """
+    if not isolated:
+        from .cases import build_cases
+        cases = build_cases(scale)
+        for name in names:
+            yield measure(cases[name], repeat)
+        return
+    ctx = get_context("spawn")
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx, initializer=_init_worker) as pool:
+            yield pool.submit(_run_isolated, name, scale, repeat).result()
+
+
+# -----------------------
+# Baseline
+# -----------------------
+def machine() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def save_baseline(results: list[Result], scale: float, path: Path = BASELINE_PATH) -> None:
+    """Merge `results` into the baseline at `path`; other cases keep their entries."""
+    baseline = load_baseline(path)
+    if baseline is None or baseline.get("scale") != scale:
+        baseline = {"scale": scale, "results": {}}
+    baseline["machine"] = machine()
+    baseline["results"].update({r.name: asdict(r) for r in results})
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def compare(results: list[Result], baseline: Optional[dict], scale: float, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """
+    Per-case comparison of median latency against the baseline. `change`
+    is the relative slowdown (negative: faster); cases missing from the
+    baseline, or a baseline taken at another scale, give change None.
+    """
+    known = (baseline or {}).get("results", {}) if (baseline or {}).get("scale") == scale else {}
+    rows = []
+    for r in results:
+        base = known.get(r.name)
+        change = None
+        if base and base.get("p50_ms"):
+            change = round(r.p50_ms / base["p50_ms"] - 1, 3)
+        rows.append({
+            "name": r.name,
+            "baseline_p50_ms": base["p50_ms"] if base else None,
+            "p50_ms": r.p50_ms,
+            "change": change,
+            "regressed": change is not None and change > threshold,
+        })
+    return rows
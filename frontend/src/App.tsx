@@ -30,6 +30,7 @@ export default function App() {
   const [stats, setStats] = useState<{updated_rows?: number; updated_cells?: number}>({})
 
   const [filename, setFilename] = useState('')
+  const [datasetId, setDatasetId] = useState<string>()
 
   const [loading, setLoading] = useState(false)
   const [errorMsg, setErrorMsg] = useState<string>('')
@@ -45,6 +46,7 @@ export default function App() {
       setColumns(cols)
       setRows(data)
       setFilename(res.filename || file.name)
+      setDatasetId(res.dataset_id)
 
       setPattern('')
       setStats({})
@@ -58,7 +60,7 @@ export default function App() {
   async function handlePromptTransform(prompt: string): Promise<TransformApiResp> {
     try {
       setLoading(true)
-      const resp = await apiTransform(prompt)
+      const resp = await apiTransform(prompt, datasetId)
 
       setColumns(resp.headers ?? [])
       setRows(resp.data ?? [])
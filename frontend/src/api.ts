@@ -1,8 +1,17 @@
 export type UploadApiResp = {
+    dataset_id?: string
     filename?: string
+    encoding?: string | null
+    encoding_confidence?: number | null
+    delimiter?: string | null
+    sheet?: string | null
     headers?: string[]
     columns?: string[]
     data?: any[][]
+    // column -> inferred kind, when uploaded with typed loading
+    dtypes?: Record<string, 'integer' | 'float' | 'boolean' | 'datetime' | 'category' | 'text'> | null
+    // the same file had been uploaded before; its parsed frame was reused
+    cached?: boolean
 }
 
 export async function apiUpload(file: File): Promise<UploadApiResp> {
@@ -15,6 +24,8 @@ export async function apiUpload(file: File): Promise<UploadApiResp> {
 
 
 export type TransformApiResp = {
+    dataset_id?: string
+    transformation_id?: number | null
     intent?: string
     pattern?: string
     flags?: string[]
@@ -22,17 +33,114 @@ export type TransformApiResp = {
     replacement?: string
     assumptions?: string[]
     stats?: { updated_rows?: number; updated_cells?: number }
+    // columns created by extract/split, already included in headers
+    added_columns?: string[]
     headers?: string[]
     data?: any[][]
 }
 
 
-export async function apiTransform(prompt: string): Promise<TransformApiResp> {
+export async function apiTransform(prompt: string, datasetId?: string): Promise<TransformApiResp> {
     const r = await fetch('/api/transform', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ prompt }),
+        body: JSON.stringify({ prompt, dataset_id: datasetId }),
     })
     if (!r.ok) throw new Error(await r.text())
     return r.json() as Promise<TransformApiResp>
-}
\ No newline at end of file
+}
+
+export type PipelineStep =
+    | string
+    | { prompt: string; columns?: string[] }
+    | { pattern: string; intent?: string; flags?: string[]; replacement?: string; format?: string; columns?: string[] }
+
+export type PipelineApiResp = {
+    dataset_id?: string
+    steps?: {
+        prompt: string
+        intent: string
+        pattern: string
+        flags: string[]
+        columns: string[]
+        replacement?: string | null
+        format?: string | null
+        stats: { updated_rows: number; updated_cells: number }
+    }[]
+    stats?: { updated_rows?: number; updated_cells?: number }
+    // columns created by extract/split, already included in headers
+    added_columns?: string[]
+    headers?: string[]
+    data?: any[][]
+}
+
+export async function apiPipeline(steps: PipelineStep[], datasetId?: string): Promise<PipelineApiResp> {
+    const r = await fetch('/api/pipeline', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ steps, dataset_id: datasetId }),
+    })
+    if (!r.ok) throw new Error(await r.text())
+    return r.json() as Promise<PipelineApiResp>
+}
+
+
+export type RowsApiResp = {
+    dataset_id: string
+    offset: number
+    limit: number
+    total_rows: number
+    changed_only: boolean
+    columns: string[]
+    row_ids: number[]
+    layout: 'rows' | 'columns'
+    data: any[][]
+}
+
+export async function apiRows(
+    datasetId: string,
+    opts: { offset?: number; limit?: number; columns?: string[]; changedOnly?: boolean } = {},
+): Promise<RowsApiResp> {
+    const q = new URLSearchParams({ dataset_id: datasetId })
+    if (opts.offset !== undefined) q.set('offset', String(opts.offset))
+    if (opts.limit !== undefined) q.set('limit', String(opts.limit))
+    if (opts.columns?.length) q.set('columns', opts.columns.join(','))
+    if (opts.changedOnly) q.set('changed_only', '1')
+    const r = await fetch(`/api/rows?${q}`)
+    if (!r.ok) throw new Error(await r.text())
+    return r.json() as Promise<RowsApiResp>
+}
+
+
+export type JobApiResp = {
+    job_id: string
+    kind: string
+    status: 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled'
+    dataset_id: string | null
+    progress: { stage: string; done: number; total: number | null }
+    cancel_requested: boolean
+    status_code?: number | null
+    result?: any
+    error?: string | null
+}
+
+export async function apiJob(jobId: string): Promise<JobApiResp> {
+    const r = await fetch(`/api/jobs/${jobId}`)
+    if (!r.ok) throw new Error(await r.text())
+    return r.json() as Promise<JobApiResp>
+}
+
+export async function apiCancelJob(jobId: string): Promise<JobApiResp> {
+    const r = await fetch(`/api/jobs/${jobId}/cancel`, { method: 'POST' })
+    if (!r.ok) throw new Error(await r.text())
+    return r.json() as Promise<JobApiResp>
+}
+
+export type ExportFormat = 'csv' | 'xlsx' | 'parquet' | 'jsonl'
+
+// A plain link to this URL downloads the full dataset; the server streams it.
+export function exportUrl(datasetId: string, format: ExportFormat = 'csv', gzip = false): string {
+    const q = new URLSearchParams({ dataset_id: datasetId, format })
+    if (gzip) q.set('gzip', '1')
+    return `/api/export?${q}`
+}